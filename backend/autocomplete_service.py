@@ -0,0 +1,164 @@
+"""
+Sistema Financeiro Finco - Serviço de Autocomplete
+Índice em memória dos itens/fornecedores para o formulário de lançamentos
+
+Os nomes de `itens_fornecedores` são carregados uma única vez num índice
+de bigramas e trigramas: a busca por trecho do nome (o antigo ILIKE '%q%')
+intersecta os conjuntos dos n-gramas da consulta e confere só os candidatos,
+sem ir ao banco. Consultas muito comuns (ex.: "LT") percorrem os nomes em
+ordem de uso e param no limite. O uso (vezes_usado/ultima_vez) é atualizado no índice
+depois de cada commit que o altera - criação de lançamento e importação.
+O nome da classificação sugerida vem do registro de classificações.
+"""
+import heapq
+import threading
+from collections import defaultdict
+from datetime import datetime
+
+from backend.classificacoes_service import registro_classificacoes
+from backend.database import ItemFornecedor
+
+TAMANHOS_NGRAMA = (2, 3)
+
+# Tamanho mínimo da consulta (mesmo limite da rota)
+MINIMO_CONSULTA = 2
+
+# Acima deste número de candidatos é mais rápido percorrer os nomes já
+# ordenados por uso e parar nos primeiros que contêm a consulta
+MAXIMO_CANDIDATOS = 256
+
+
+def _ngramas(texto, tamanho):
+    return {texto[i:i + tamanho] for i in range(len(texto) - tamanho + 1)}
+
+
+class IndiceAutocomplete:
+    """
+    Índice de n-gramas dos nomes de itens/fornecedores
+
+    Carregado sob demanda na primeira busca; `invalidar()` força uma nova
+    carga (ex.: após restaurar um backup). Nomes repetidos no banco viram
+    uma única entrada com o uso somado.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._carregado = False
+        self._itens = {}  # nome -> {"classificacao_id", "vezes_usado", "ultima_vez"}
+        self._ngramas = defaultdict(set)
+        self._ranking = None  # nomes em ordem de uso; None = precisa reordenar
+
+    def carregar(self, db):
+        """Lê os itens do banco e reconstrói o índice (uma consulta)"""
+        itens = db.query(
+            ItemFornecedor.nome, ItemFornecedor.classificacao_id,
+            ItemFornecedor.vezes_usado, ItemFornecedor.ultima_vez
+        ).order_by(ItemFornecedor.id).all()
+
+        with self._lock:
+            self._itens = {}
+            self._ngramas = defaultdict(set)
+            self._ranking = None
+            for nome, classificacao_id, vezes_usado, ultima_vez in itens:
+                self._registrar(nome, vezes_usado or 0, classificacao_id, ultima_vez)
+            self._carregado = True
+
+    def invalidar(self):
+        """Descarta o índice; a próxima busca recarrega do banco"""
+        with self._lock:
+            self._carregado = False
+
+    def _registrar(self, nome, vezes, classificacao_id, quando):
+        """Soma uso a um nome, criando a entrada se necessário (chamar com o lock)"""
+        item = self._itens.get(nome)
+        if item is None:
+            item = {"classificacao_id": None, "vezes_usado": 0, "ultima_vez": None}
+            self._itens[nome] = item
+            for tamanho in TAMANHOS_NGRAMA:
+                for ngrama in _ngramas(nome, tamanho):
+                    self._ngramas[ngrama].add(nome)
+
+        self._ranking = None
+        item["vezes_usado"] += vezes
+        if classificacao_id:
+            item["classificacao_id"] = classificacao_id
+        if quando and (item["ultima_vez"] is None or quando > item["ultima_vez"]):
+            item["ultima_vez"] = quando
+
+    def registrar_usos(self, usos, quando=None):
+        """
+        Aplica ao índice o uso já gravado em itens_fornecedores
+
+        Args:
+            usos: Iterável de (nome, vezes, classificacao_id)
+            quando: Momento do uso (padrão: agora, em UTC como no banco)
+        """
+        quando = quando or datetime.utcnow()
+        with self._lock:
+            if not self._carregado:
+                return
+            for nome, vezes, classificacao_id in usos:
+                self._registrar(nome, vezes, classificacao_id, quando)
+
+    @staticmethod
+    def _chave_ranking(par):
+        nome, item = par
+        return item["vezes_usado"], item["ultima_vez"] or datetime.min
+
+    def buscar(self, db, q, limite=10):
+        """
+        Itens cujo nome contém `q`, dos mais usados para os menos usados
+        (empate: usado mais recentemente primeiro)
+
+        Returns:
+            Lista de dicts {nome, classificacao_sugerida, vezes_usado}
+        """
+        termo = q.upper()
+        if len(termo) < MINIMO_CONSULTA:
+            return []
+
+        if not self._carregado:
+            self.carregar(db)
+
+        with self._lock:
+            tamanho = min(len(termo), max(TAMANHOS_NGRAMA))
+            conjuntos = sorted(
+                (self._ngramas.get(ngrama, set()) for ngrama in _ngramas(termo, tamanho)),
+                key=len
+            )
+            if len(conjuntos[0]) > MAXIMO_CANDIDATOS:
+                melhores = self._varrer_ranking(termo, limite)
+            else:
+                candidatos = conjuntos[0].intersection(*conjuntos[1:])
+                encontrados = [
+                    (nome, self._itens[nome]) for nome in candidatos
+                    if len(termo) <= tamanho or termo in nome
+                ]
+                melhores = heapq.nlargest(limite, encontrados, key=self._chave_ranking)
+
+            melhores = [(nome, item["classificacao_id"], item["vezes_usado"]) for nome, item in melhores]
+
+        resultado = []
+        for nome, classificacao_id, vezes_usado in melhores:
+            classificacao = registro_classificacoes.por_id(db, classificacao_id)
+            resultado.append({
+                "nome": nome,
+                "classificacao_sugerida": classificacao.nome if classificacao else None,
+                "vezes_usado": vezes_usado,
+            })
+        return resultado
+
+    def _varrer_ranking(self, termo, limite):
+        """Primeiros `limite` nomes que contêm `termo`, na ordem de uso (chamar com o lock)"""
+        if self._ranking is None:
+            self._ranking = sorted(self._itens.items(), key=self._chave_ranking, reverse=True)
+        melhores = []
+        for nome, item in self._ranking:
+            if termo in nome:
+                melhores.append((nome, item))
+                if len(melhores) >= limite:
+                    break
+        return melhores
+
+
+indice_autocomplete = IndiceAutocomplete()
@@ -9,6 +9,8 @@ import hashlib
 import base64
 import gzip
 import logging
+import sqlite3
+import tempfile
 from datetime import datetime
 from cryptography.fernet import Fernet
 from botocore.exceptions import ClientError
@@ -73,6 +75,41 @@ def decompress_data(compressed_data: bytes) -> bytes:
     return gzip.decompress(compressed_data)
 
 
+def copiar_banco(origem: str, destino: str):
+    """
+    Copia um banco SQLite para outro pela API de backup do SQLite
+
+    Diferente de copiar o arquivo, a cópia respeita os locks das conexões
+    abertas e inclui os commits que ainda estão só no -wal (journal WAL,
+    ver PERFIS_SQLITE em database.py).
+    """
+    conexao_origem = sqlite3.connect(origem)
+    conexao_destino = sqlite3.connect(destino)
+    try:
+        conexao_origem.backup(conexao_destino)
+    finally:
+        conexao_destino.close()
+        conexao_origem.close()
+
+
+def ler_banco() -> bytes:
+    """Conteúdo do banco num arquivo único (sem -wal), pronto para o backup"""
+    with tempfile.TemporaryDirectory() as pasta:
+        copia = os.path.join(pasta, "backup.db")
+        copiar_banco(DATABASE_PATH, copia)
+
+        # O backup herda o modo WAL; volta ao journal de rollback para que o
+        # arquivo enviado ao S3 não dependa de um -wal
+        conexao = sqlite3.connect(copia)
+        try:
+            conexao.execute("PRAGMA journal_mode = DELETE")
+        finally:
+            conexao.close()
+
+        with open(copia, 'rb') as f:
+            return f.read()
+
+
 def backup_to_s3() -> dict:
     """
     Faz backup do banco de dados para o S3
@@ -88,9 +125,8 @@ def backup_to_s3() -> dict:
                 "error": f"Banco de dados não encontrado: {DATABASE_PATH}"
             }
         
-        # Ler arquivo do banco
-        with open(DATABASE_PATH, 'rb') as f:
-            db_data = f.read()
+        # Ler o banco (cópia consistente, inclusive do que está no WAL)
+        db_data = ler_banco()
         
         # Comprimir e criptografar
         compressed = compress_data(db_data)
@@ -191,9 +227,13 @@ def restore_from_s3(s3_key: str = None) -> dict:
         # Garantir que o diretório existe
         os.makedirs(os.path.dirname(DATABASE_PATH), exist_ok=True)
         
-        # Salvar banco restaurado
-        with open(DATABASE_PATH, 'wb') as f:
-            f.write(db_data)
+        # Salvar banco restaurado: grava pelo SQLite em vez de sobrescrever o
+        # arquivo, para não misturar o banco novo com o -wal do anterior
+        with tempfile.TemporaryDirectory() as pasta:
+            baixado = os.path.join(pasta, "restaurar.db")
+            with open(baixado, 'wb') as f:
+                f.write(db_data)
+            copiar_banco(baixado, DATABASE_PATH)
         
         metadata = response.get('Metadata', {})
         logger.info(f"Banco restaurado do S3: {s3_key}")
@@ -0,0 +1,661 @@
+"""
+Sistema Financeiro Finco - Benchmarks
+Mede o desempenho das consultas principais em bancos sintéticos
+
+Uso:
+    python -m backend.benchmark dashboard --linhas 100000 1000000
+    python -m backend.benchmark importacao --linhas 2400 24000
+    python -m backend.benchmark autocomplete --linhas 500 20000
+    python -m backend.benchmark busca --linhas 100000 1000000
+    python -m backend.benchmark paginacao --linhas 100000 1000000
+    python -m backend.benchmark streaming --linhas 100000 1000000
+    python -m backend.benchmark excel --linhas 100000 500000
+    python -m backend.benchmark concorrencia --linhas 100000 1000000
+    python -m backend.benchmark nfe --linhas 200 2000
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import statistics
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+import pandas as pd
+from sqlalchemy import create_engine, func, insert
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from backend.busca_texto import criar_indice_texto, filtro_item
+from backend.database import (
+    Base, Lancamento, Configuracao, Classificacao, ItemFornecedor,
+    configurar_sqlite, inicializar_configuracoes, inicializar_classificacoes
+)
+
+
+def criar_banco_sintetico(linhas, anos=3, seed=42, indice_texto=False, perfil=None):
+    """
+    Cria um banco SQLite temporário com `linhas` lançamentos aleatórios
+
+    Com indice_texto=True também cria lancamentos_fts e seus triggers
+    (migração 004), depois de inserir os lançamentos. `perfil` aplica um dos
+    PERFIS_SQLITE às conexões (None = SQLite sem ajustes).
+
+    Returns:
+        (caminho, engine, SessionLocal)
+    """
+    fd, caminho = tempfile.mkstemp(suffix=".db", prefix="finco_bench_")
+    os.close(fd)
+    engine = create_engine(f"sqlite:///{caminho}", connect_args={"check_same_thread": False})
+    if perfil:
+        configurar_sqlite(engine, perfil)
+    Base.metadata.create_all(bind=engine)
+    Sessao = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    db = Sessao()
+    try:
+        inicializar_configuracoes(db)
+    finally:
+        db.close()
+
+    rnd = random.Random(seed)
+    hoje = date.today()
+    inicio = hoje - timedelta(days=365 * anos)
+    dias = (hoje - inicio).days
+    situacoes = ["BAIXADA"] * 8 + ["NAO_BAIXADA"] * 2 + ["OBSOLETO"]
+    categorias = ["OPERACIONAL"] * 8 + ["FINANCEIRO", "INVESTIMENTO"]
+
+    lote = []
+    with engine.begin() as conn:
+        for i in range(linhas):
+            data_lanc = inicio + timedelta(days=rnd.randint(0, dias))
+            tipo = "ENTRADA" if rnd.random() < 0.1 else "SAIDA"
+            lote.append({
+                "data": data_lanc,
+                "dia": data_lanc.day,
+                "mes": data_lanc.month,
+                "ano": data_lanc.year,
+                "tipo": tipo,
+                "categoria": rnd.choice(categorias),
+                "classificacao_nome": f"CLASSIF {rnd.randint(1, 70)}",
+                "item": f"FORNECEDOR {rnd.randint(1, 2000)}",
+                "valor": round(rnd.uniform(10, 50000 if tipo == "ENTRADA" else 5000), 2),
+                "situacao": rnd.choice(situacoes),
+            })
+            if len(lote) >= 50000:
+                conn.execute(insert(Lancamento), lote)
+                lote = []
+        if lote:
+            conn.execute(insert(Lancamento), lote)
+
+        if indice_texto:
+            criar_indice_texto(conn)
+
+    return caminho, engine, Sessao
+
+
+def medir(funcao, repeticoes=5):
+    """Executa `funcao` algumas vezes e retorna a mediana em milissegundos"""
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    return statistics.median(tempos)
+
+
+def dashboard_seis_consultas(db):
+    """Implementação anterior do /api/dashboard: 3 configs + 6 SUMs separados"""
+    hoje = date.today()
+    for chave in ("miller_orr_minimo", "miller_orr_retorno", "miller_orr_maximo"):
+        db.query(Configuracao).filter(Configuracao.chave == chave).first()
+
+    filtros = [
+        [Lancamento.tipo == "ENTRADA", Lancamento.situacao == "BAIXADA"],
+        [Lancamento.tipo == "SAIDA", Lancamento.situacao == "BAIXADA"],
+        [Lancamento.tipo == "ENTRADA", Lancamento.mes == hoje.month, Lancamento.ano == hoje.year,
+         Lancamento.situacao != "OBSOLETO"],
+        [Lancamento.tipo == "SAIDA", Lancamento.mes == hoje.month, Lancamento.ano == hoje.year,
+         Lancamento.situacao != "OBSOLETO"],
+        [Lancamento.tipo == "ENTRADA", Lancamento.data == hoje, Lancamento.situacao == "BAIXADA"],
+        [Lancamento.tipo == "SAIDA", Lancamento.data == hoje, Lancamento.situacao == "BAIXADA"],
+    ]
+    return [db.query(func.sum(Lancamento.valor)).filter(*f).scalar() or 0 for f in filtros]
+
+
+def benchmark_dashboard(linhas_lista, repeticoes):
+    """Compara o dashboard antigo (6 varreduras) com o de varredura única"""
+    from backend.configuracoes_service import cache_configuracoes
+    from backend.main import get_dashboard
+
+    print("📊 Benchmark /api/dashboard")
+    print(f"{'linhas':>10} | {'6 consultas (ms)':>17} | {'1 consulta (ms)':>16} | {'ganho':>6}")
+    for linhas in linhas_lista:
+        caminho, engine, Sessao = criar_banco_sintetico(linhas)
+        db = Sessao()
+        # Cada banco sintético carrega as próprias configurações
+        cache_configuracoes.invalidar()
+        try:
+            antigo = medir(lambda: dashboard_seis_consultas(db), repeticoes)
+            novo = medir(lambda: get_dashboard(db), repeticoes)
+            print(f"{linhas:>10} | {antigo:>17.1f} | {novo:>16.1f} | {antigo / novo:>5.1f}x")
+        finally:
+            db.close()
+            engine.dispose()
+            os.unlink(caminho)
+
+
+def abas_sinteticas(linhas, seed=42):
+    """Gera as 12 abas mensais (DataFrames com header=None) somando `linhas` linhas"""
+    rnd = random.Random(seed)
+    classificacoes = ["MATÉRIA-PRIMA", "ICMS", "FRETES", "SALÁRIOS FÁBRICA", "JUROS", "MÁQUINAS"]
+    cabecalho = [None, "DIA", "CATEGORIA", "CLASSIFICAÇÃO", "ITEM", "VALOR", "SITUAÇÃO",
+                 "DIA", "CATEGORIA", "CLASSIFICAÇÃO", "ITEM", "VALOR", "SITUAÇÃO"]
+    abas = []
+    for _ in range(12):
+        linhas_aba = [["CONTROLE DE ENTRADAS E SAÍDAS"] + [None] * 12, cabecalho]
+        for _ in range(linhas // 12):
+            linha = [None] * 13
+            if rnd.random() < 0.2:
+                linha[1:7] = [rnd.randint(1, 28), "OPERACIONAL", "VENDA DE PRODUTOS",
+                              f"CLIENTE {rnd.randint(1, 50)}", round(rnd.uniform(100, 9000), 2), "BAIXADA"]
+            linha[7:13] = [rnd.randint(1, 28), "OPERACIONAL", rnd.choice(classificacoes),
+                           f"FORNECEDOR {rnd.randint(1, 500)}", round(rnd.uniform(1, 5000), 2),
+                           rnd.choice(["BAIXADA", "NÃO BAIXADA"])]
+            linhas_aba.append(linha)
+        abas.append(pd.DataFrame(linhas_aba))
+    return abas
+
+
+def benchmark_importacao(linhas_lista, repeticoes):
+    """Mede a importação das 12 abas mensais (sem a leitura do Excel)"""
+    from backend.classificacoes_service import registro_classificacoes
+    from backend.importacao_service import importar_lancamentos_mes, hashes_existentes
+    from backend.resumos import AtualizadorResumos
+
+    print("📥 Benchmark importação de planilha (12 abas)")
+    print(f"{'linhas':>10} | {'incremental (ms)':>17} | {'merge (ms)':>11}")
+    for linhas in linhas_lista:
+        caminho, engine, Sessao = criar_banco_sintetico(0, indice_texto=True)
+        db = Sessao()
+        try:
+            inicializar_classificacoes(db)
+            db.commit()
+            registro_classificacoes.carregar(db)
+            abas = abas_sinteticas(linhas)
+
+            def importar(modo):
+                resumos = AtualizadorResumos(db)
+                classificacoes = registro_classificacoes.mapa_ids(db)
+                existentes = hashes_existentes(db, 2025)
+                for mes, df in enumerate(abas, start=1):
+                    importar_lancamentos_mes(db, df, mes, 2025, modo, resumos, classificacoes, existentes)
+                resumos.aplicar()
+                db.flush()
+
+            def incremental():
+                importar("incremental")
+                db.rollback()
+
+            # Banco vazio: tudo é novo; depois, com tudo gravado, o merge atualiza cada linha
+            tempo_incremental = medir(incremental, repeticoes)
+            importar("incremental")
+            db.commit()
+            tempo_merge = medir(lambda: importar("merge"), repeticoes)
+            print(f"{linhas:>10} | {tempo_incremental:>17.1f} | {tempo_merge:>11.1f}")
+        finally:
+            db.close()
+            engine.dispose()
+            os.unlink(caminho)
+
+
+def autocomplete_ilike(db, q, limite=10):
+    """Implementação anterior do /api/autocomplete/itens: ILIKE '%q%' + 1 consulta por resultado"""
+    itens = db.query(ItemFornecedor).filter(
+        ItemFornecedor.nome.ilike(f"%{q}%")
+    ).order_by(ItemFornecedor.vezes_usado.desc()).limit(limite).all()
+    for item in itens:
+        if item.classificacao_id:
+            db.query(Classificacao).filter(Classificacao.id == item.classificacao_id).first()
+    return itens
+
+
+def benchmark_autocomplete(linhas_lista, repeticoes):
+    """Compara o autocomplete por ILIKE com o índice em memória (`linhas` = itens cadastrados)"""
+    from backend.autocomplete_service import IndiceAutocomplete
+    from backend.classificacoes_service import registro_classificacoes
+
+    print("🔎 Benchmark /api/autocomplete/itens (tempo médio por consulta)")
+    print(f"{'itens':>10} | {'ILIKE (µs)':>11} | {'índice (µs)':>12} | {'carga (ms)':>11} | {'ganho':>6}")
+    palavras = ["COMERCIAL", "DISTRIBUIDORA", "TRANSPORTES", "INDUSTRIA", "SERVICOS",
+                "METAIS", "PAPEL", "ENERGIA", "ALIMENTOS", "QUIMICA", "LTDA", "ME"]
+    for linhas in linhas_lista:
+        caminho, engine, Sessao = criar_banco_sintetico(0)
+        db = Sessao()
+        try:
+            inicializar_classificacoes(db)
+            ids = [id_ for (id_,) in db.query(Classificacao.id)]
+            rnd = random.Random(42)
+            nomes = [
+                f"{' '.join(rnd.sample(palavras, 2))} {i}" for i in range(linhas)
+            ]
+            db.execute(insert(ItemFornecedor), [
+                {"nome": nome, "classificacao_id": rnd.choice(ids), "vezes_usado": rnd.randint(1, 200)}
+                for nome in nomes
+            ])
+            db.commit()
+
+            consultas = []
+            for nome in rnd.sample(nomes, min(200, linhas)):
+                tamanho = rnd.randint(2, 6)
+                inicio = rnd.randint(0, len(nome) - tamanho)
+                consultas.append(nome[inicio:inicio + tamanho])
+
+            registro_classificacoes.carregar(db)
+            indice = IndiceAutocomplete()
+            carga = medir(lambda: indice.carregar(db), 1)
+            antigo = medir(lambda: [autocomplete_ilike(db, q) for q in consultas], repeticoes)
+            novo = medir(lambda: [indice.buscar(db, q) for q in consultas], repeticoes)
+            por_consulta = 1000 / len(consultas)
+            print(
+                f"{linhas:>10} | {antigo * por_consulta:>11.1f} | {novo * por_consulta:>12.1f} | "
+                f"{carga:>11.1f} | {antigo / novo:>5.1f}x"
+            )
+        finally:
+            db.close()
+            engine.dispose()
+            os.unlink(caminho)
+
+
+def benchmark_busca(linhas_lista, repeticoes):
+    """Compara o filtro por item com ILIKE '%...%' (varredura) e pelo índice FTS5"""
+    print("🔤 Benchmark filtro por item (/api/lancamentos?item=)")
+    print(f"{'linhas':>10} | {'termo':>16} | {'achados':>8} | {'ILIKE (ms)':>11} | {'FTS5 (ms)':>10}")
+    for linhas in linhas_lista:
+        caminho, engine, Sessao = criar_banco_sintetico(linhas, indice_texto=True)
+        db = Sessao()
+        try:
+            for termo in ("FORNECEDOR 1234", "DOR 12", "FORNECEDOR"):
+                def consulta(filtro):
+                    return db.query(Lancamento.id).filter(filtro).order_by(
+                        Lancamento.data, Lancamento.id
+                    ).limit(500).all()
+
+                achados = db.query(func.count(Lancamento.id)).filter(filtro_item(f"%{termo}%")).scalar()
+                antigo = medir(lambda: consulta(Lancamento.item.ilike(f"%{termo}%")), repeticoes)
+                novo = medir(lambda: consulta(filtro_item(f"%{termo}%")), repeticoes)
+                print(f"{linhas:>10} | {termo:>16} | {achados:>8} | {antigo:>11.1f} | {novo:>10.1f}")
+        finally:
+            db.close()
+            engine.dispose()
+            os.unlink(caminho)
+
+
+def benchmark_paginacao(linhas_lista, repeticoes):
+    """Compara /api/lancamentos por offset (skip) e por cursor na 1ª e na 500ª página"""
+    from fastapi import Response
+    from backend.main import listar_lancamentos, codificar_cursor
+
+    print("📄 Benchmark paginação de /api/lancamentos (páginas de 500)")
+    print(f"{'linhas':>10} | {'página':>7} | {'offset (ms)':>12} | {'cursor (ms)':>12}")
+    for linhas in linhas_lista:
+        caminho, engine, Sessao = criar_banco_sintetico(linhas)
+        db = Sessao()
+        try:
+            for pagina in (1, 500):
+                skip = min((pagina - 1) * 500, linhas - 500)
+                cursor = None
+                if skip:
+                    data_lanc, id_ = db.query(Lancamento.data, Lancamento.id).order_by(
+                        Lancamento.data, Lancamento.id
+                    ).offset(skip - 1).first()
+                    cursor = codificar_cursor(data_lanc, id_)
+
+                offset = medir(lambda: listar_lancamentos(Response(), skip=skip, formato=None, db=db), repeticoes)
+                keyset = medir(lambda: listar_lancamentos(Response(), cursor=cursor, formato=None, db=db), repeticoes)
+                print(f"{linhas:>10} | {pagina:>7} | {offset:>12.1f} | {keyset:>12.1f}")
+        finally:
+            db.close()
+            engine.dispose()
+            os.unlink(caminho)
+
+
+def benchmark_streaming(linhas_lista, repeticoes):
+    """Compara a listagem JSON completa com o format=ndjson em fluxo (tempo e pico de memória)"""
+    import json
+    from fastapi import Response
+    from sqlalchemy import select
+    from backend.exportacao import COLUNAS_EXPORTACAO, gerar_ndjson
+    from backend.main import listar_lancamentos, LancamentoResponse
+
+    def lista_json(engine, db, linhas):
+        lancamentos = listar_lancamentos(Response(), limit=linhas, formato=None, db=db)
+        yield json.dumps([LancamentoResponse.model_validate(l).model_dump(mode="json") for l in lancamentos])
+
+    def ndjson(engine, db, linhas):
+        consulta = select(*COLUNAS_EXPORTACAO).order_by(Lancamento.data, Lancamento.id)
+        return gerar_ndjson(engine, consulta)
+
+    def executar(gerar, engine, db, linhas):
+        """(ms até o primeiro pedaço, ms total)"""
+        db.expunge_all()
+        inicio = time.perf_counter()
+        primeiro = None
+        for _ in gerar(engine, db, linhas):
+            if primeiro is None:
+                primeiro = (time.perf_counter() - inicio) * 1000
+        return primeiro, (time.perf_counter() - inicio) * 1000
+
+    print("🌊 Benchmark listagem completa de /api/lancamentos")
+    print(f"{'linhas':>10} | {'modo':>6} | {'1º byte (ms)':>13} | {'total (ms)':>11} | {'pico (MB)':>10}")
+    for linhas in linhas_lista:
+        caminho, engine, Sessao = criar_banco_sintetico(linhas)
+        db = Sessao()
+        try:
+            for nome, gerar in (("json", lista_json), ("ndjson", ndjson)):
+                primeiro, total = executar(gerar, engine, db, linhas)
+                # Memória numa execução à parte: o tracemalloc deixa tudo mais lento
+                tracemalloc.start()
+                executar(gerar, engine, db, linhas)
+                pico = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+                tracemalloc.stop()
+                print(f"{linhas:>10} | {nome:>6} | {primeiro:>13.1f} | {total:>11.1f} | {pico:>10.1f}")
+        finally:
+            db.close()
+            engine.dispose()
+            os.unlink(caminho)
+
+
+def exportar_excel_pandas(db):
+    """Implementação anterior do /api/lancamentos/exportar/excel: lista -> DataFrame -> BytesIO"""
+    import io
+    from backend.exportacao import COLUNAS_EXCEL, linha_excel
+
+    consulta = db.query(*(coluna for _, coluna in COLUNAS_EXCEL)).order_by(Lancamento.data, Lancamento.id)
+    df = pd.DataFrame([linha_excel(linha) for linha in consulta], columns=[nome for nome, _ in COLUNAS_EXCEL])
+    saida = io.BytesIO()
+    with pd.ExcelWriter(saida, engine="openpyxl") as writer:
+        df.to_excel(writer, sheet_name="Lançamentos", index=False)
+        planilha = writer.sheets["Lançamentos"]
+        for idx, col in enumerate(df.columns):
+            planilha.column_dimensions[chr(65 + idx)].width = min(max(df[col].astype(str).map(len).max(), len(col)) + 2, 50)
+    return saida.getvalue()
+
+
+def benchmark_excel(linhas_lista, repeticoes):
+    """Compara a exportação Excel por pandas (tudo em memória) com a de gerar_xlsx (tempo e pico de memória)"""
+    from sqlalchemy import select
+    from backend.exportacao import COLUNAS_EXCEL, gerar_xlsx
+
+    def executar(funcao):
+        """(ms total, bytes gerados)"""
+        inicio = time.perf_counter()
+        tamanho = funcao()
+        return (time.perf_counter() - inicio) * 1000, tamanho
+
+    print("📗 Benchmark exportação Excel")
+    print(f"{'linhas':>10} | {'modo':>7} | {'total (ms)':>11} | {'tamanho (MB)':>13} | {'pico (MB)':>10}")
+    for linhas in linhas_lista:
+        caminho, engine, Sessao = criar_banco_sintetico(linhas)
+        db = Sessao()
+        consulta = select(*(coluna for _, coluna in COLUNAS_EXCEL)).order_by(Lancamento.data, Lancamento.id)
+        modos = (
+            ("pandas", lambda: len(exportar_excel_pandas(db))),
+            ("fluxo", lambda: sum(len(pedaco) for pedaco in gerar_xlsx(engine, consulta))),
+        )
+        try:
+            for nome, funcao in modos:
+                total, tamanho = executar(funcao)
+                # Memória numa execução à parte: o tracemalloc deixa tudo mais lento
+                tracemalloc.start()
+                executar(funcao)
+                pico = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+                tracemalloc.stop()
+                print(f"{linhas:>10} | {nome:>7} | {total:>11.1f} | {tamanho / 1024 / 1024:>13.1f} | {pico:>10.1f}")
+        finally:
+            db.close()
+            engine.dispose()
+            os.unlink(caminho)
+
+
+# Ritmo do escritor concorrente (lançamentos gravados por segundo, no máximo)
+ESCRITAS_POR_SEGUNDO = 50
+
+
+def escrever_continuamente(caminho, perfil, parar, escritas, bloqueios):
+    """
+    Grava um lançamento por transação (como POST /api/lancamentos), no ritmo
+    de ESCRITAS_POR_SEGUNDO, até `parar`
+
+    Roda num processo à parte, como um segundo worker do servidor, para que
+    o GIL não misture a espera por CPU com a espera pelos locks do SQLite.
+    """
+    engine = configurar_sqlite(
+        create_engine(f"sqlite:///{caminho}", connect_args={"check_same_thread": False}), perfil
+    )
+    db = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    hoje = date.today()
+    try:
+        while not parar.is_set():
+            try:
+                db.add(Lancamento(
+                    data=hoje, dia=hoje.day, mes=hoje.month, ano=hoje.year,
+                    tipo="SAIDA", categoria="OPERACIONAL", classificacao_nome="CLASSIF 1",
+                    item="FORNECEDOR CONCORRENTE", valor=12.34, situacao="BAIXADA",
+                ))
+                db.commit()
+                escritas.value += 1
+                time.sleep(1 / ESCRITAS_POR_SEGUNDO)
+            except OperationalError:
+                db.rollback()
+                bloqueios.value += 1
+    finally:
+        db.close()
+        engine.dispose()
+
+
+def benchmark_concorrencia(linhas_lista, repeticoes):
+    """
+    Latência do /api/dashboard com escritas concorrentes, por perfil de conexão do SQLite
+
+    Com o journal de rollback o escritor espera cada leitura terminar (e a
+    leitura espera cada commit); com WAL os dois seguem em paralelo. A coluna
+    escritas/s mostra quanto do ritmo pedido o escritor conseguiu manter.
+    """
+    from backend.configuracoes_service import cache_configuracoes
+    from backend.main import get_dashboard
+
+    leituras = max(repeticoes, 20)
+    print("🔀 Benchmark /api/dashboard com escritas concorrentes")
+    print(f"{'linhas':>10} | {'perfil':>10} | {'mediana (ms)':>12} | {'p95 (ms)':>9} | "
+          f"{'máx. (ms)':>9} | {'escritas/s':>10} | {'bloqueios':>9}")
+    for linhas in linhas_lista:
+        for perfil in ("padrao", "desempenho"):
+            caminho, engine, Sessao = criar_banco_sintetico(linhas, perfil=perfil)
+            db = Sessao()
+            cache_configuracoes.invalidar()
+            parar = multiprocessing.Event()
+            escritas = multiprocessing.Value("i", 0)
+            bloqueios = multiprocessing.Value("i", 0)
+            escritor = multiprocessing.Process(
+                target=escrever_continuamente, args=(caminho, perfil, parar, escritas, bloqueios)
+            )
+            try:
+                get_dashboard(db)  # aquece o cache de páginas
+                db.rollback()
+                escritor.start()
+                time.sleep(0.5)
+                tempos = []
+                escritas_inicio = escritas.value
+                inicio = time.perf_counter()
+                for _ in range(leituras):
+                    t = time.perf_counter()
+                    get_dashboard(db)
+                    # Encerra a transação de leitura, como no fim de uma requisição
+                    db.rollback()
+                    tempos.append((time.perf_counter() - t) * 1000)
+                taxa = (escritas.value - escritas_inicio) / (time.perf_counter() - inicio)
+
+                tempos.sort()
+                p95 = tempos[min(len(tempos) - 1, int(len(tempos) * 0.95))]
+                print(f"{linhas:>10} | {perfil:>10} | {statistics.median(tempos):>12.1f} | {p95:>9.1f} | "
+                      f"{tempos[-1]:>9.1f} | {taxa:>10.0f} | {bloqueios.value:>9}")
+            finally:
+                parar.set()
+                if escritor.is_alive():
+                    escritor.join()
+                db.close()
+                engine.dispose()
+                os.unlink(caminho)
+
+def procnfe_sintetica(numero, itens, parcelas, rnd):
+    """procNFe 4.00 com `itens` produtos (impostos completos), `parcelas` duplicatas, assinatura e protocolo"""
+    from backend.sefaz_service import CNPJ_FINCO, NS_NFE
+
+    chave = f"4125{numero:040d}"[:44]
+    det = "".join(
+        f'<det nItem="{i}"><prod><cProd>{rnd.randint(1000, 99999)}</cProd><cEAN>SEM GTIN</cEAN>'
+        f'<xProd>PRODUTO SINTETICO {i} {"X" * rnd.randint(10, 60)}</xProd><NCM>84819090</NCM><CFOP>5102</CFOP>'
+        f'<uCom>UN</uCom><qCom>{rnd.randint(1, 500)}.0000</qCom><vUnCom>{rnd.uniform(1, 900):.10f}</vUnCom>'
+        f'<vProd>{rnd.uniform(10, 9000):.2f}</vProd><cEANTrib>SEM GTIN</cEANTrib><uTrib>UN</uTrib>'
+        f'<qTrib>1.0000</qTrib><vUnTrib>1.0000000000</vUnTrib><indTot>1</indTot><xPed>PED{i}</xPed></prod>'
+        f'<imposto><vTotTrib>12.34</vTotTrib><ICMS><ICMS00><orig>0</orig><CST>00</CST><modBC>3</modBC>'
+        f'<vBC>100.00</vBC><pICMS>18.0000</pICMS><vICMS>18.00</vICMS></ICMS00></ICMS>'
+        f'<IPI><cEnq>999</cEnq><IPITrib><CST>50</CST><vBC>100.00</vBC><pIPI>5.0000</pIPI><vIPI>5.00</vIPI></IPITrib></IPI>'
+        f'<PIS><PISAliq><CST>01</CST><vBC>100.00</vBC><pPIS>1.6500</pPIS><vPIS>1.65</vPIS></PISAliq></PIS>'
+        f'<COFINS><COFINSAliq><CST>01</CST><vBC>100.00</vBC><pCOFINS>7.6000</pCOFINS><vCOFINS>7.60</vCOFINS>'
+        f'</COFINSAliq></COFINS></imposto><infAdProd>LOTE {rnd.randint(1, 9999)}</infAdProd></det>'
+        for i in range(1, itens + 1)
+    )
+    dup = "".join(
+        f'<dup><nDup>{p:03d}</nDup><dVenc>2025-{p % 12 + 1:02d}-{rnd.randint(1, 28):02d}</dVenc>'
+        f'<vDup>{rnd.uniform(100, 5000):.2f}</vDup></dup>'
+        for p in range(1, parcelas + 1)
+    )
+    assinatura = "".join(rnd.choice("ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/") for _ in range(2400))
+    return (
+        f'<?xml version="1.0" encoding="UTF-8"?><nfeProc xmlns="{NS_NFE}" versao="4.00"><NFe xmlns="{NS_NFE}">'
+        f'<infNFe Id="NFe{chave}" versao="4.00"><ide><cUF>41</cUF><cNF>{numero % 10 ** 8:08d}</cNF>'
+        f'<natOp>VENDA DE MERCADORIA</natOp><mod>55</mod><serie>1</serie><nNF>{numero}</nNF>'
+        f'<dhEmi>2025-03-{rnd.randint(1, 28):02d}T10:15:00-03:00</dhEmi><tpNF>1</tpNF><idDest>1</idDest>'
+        f'<cMunFG>4106902</cMunFG><tpImp>1</tpImp><tpEmis>1</tpEmis><cDV>0</cDV><tpAmb>1</tpAmb><finNFe>1</finNFe>'
+        f'<indFinal>0</indFinal><indPres>9</indPres><procEmi>0</procEmi><verProc>ERP 1.0</verProc></ide>'
+        f'<emit><CNPJ>{rnd.randint(10 ** 13, 10 ** 14 - 1)}</CNPJ><xNome>FORNECEDOR SINTETICO {numero} LTDA</xNome>'
+        f'<xFant>FORNECEDOR {numero}</xFant><enderEmit><xLgr>RUA DAS INDUSTRIAS</xLgr><nro>100</nro>'
+        f'<xBairro>CIC</xBairro><cMun>4106902</cMun><xMun>CURITIBA</xMun><UF>PR</UF><CEP>81000000</CEP>'
+        f'</enderEmit><IE>1234567890</IE><CRT>3</CRT></emit>'
+        f'<dest><CNPJ>{CNPJ_FINCO}</CNPJ><xNome>FINCO</xNome><enderDest><xLgr>RUA</xLgr><nro>1</nro>'
+        f'<xBairro>CENTRO</xBairro><cMun>4106902</cMun><xMun>CURITIBA</xMun><UF>PR</UF></enderDest>'
+        f'<indIEDest>1</indIEDest><IE>9876543210</IE></dest>{det}'
+        f'<total><ICMSTot><vBC>0.00</vBC><vICMS>0.00</vICMS><vICMSDeson>0.00</vICMSDeson><vFCP>0.00</vFCP>'
+        f'<vBCST>0.00</vBCST><vST>0.00</vST><vFCPST>0.00</vFCPST><vFCPSTRet>0.00</vFCPSTRet>'
+        f'<vProd>{rnd.uniform(100, 90000):.2f}</vProd><vFrete>0.00</vFrete><vSeg>0.00</vSeg><vDesc>0.00</vDesc>'
+        f'<vII>0.00</vII><vIPI>0.00</vIPI><vIPIDevol>0.00</vIPIDevol><vPIS>0.00</vPIS><vCOFINS>0.00</vCOFINS>'
+        f'<vOutro>0.00</vOutro><vNF>{rnd.uniform(100, 90000):.2f}</vNF></ICMSTot></total>'
+        f'<transp><modFrete>0</modFrete></transp><cobr><fat><nFat>{numero}</nFat></fat>{dup}</cobr>'
+        f'<pag><detPag><tPag>15</tPag><vPag>0.00</vPag></detPag></pag>'
+        f'<infAdic><infCpl>{"INFORMACOES COMPLEMENTARES " * 8}</infCpl></infAdic></infNFe>'
+        f'<Signature xmlns="http://www.w3.org/2000/09/xmldsig#"><SignedInfo>'
+        f'<Reference URI="#NFe{chave}"><DigestValue>{assinatura[:28]}</DigestValue></Reference></SignedInfo>'
+        f'<SignatureValue>{assinatura[:344]}</SignatureValue><KeyInfo><X509Data>'
+        f'<X509Certificate>{assinatura}</X509Certificate></X509Data></KeyInfo></Signature></NFe>'
+        f'<protNFe versao="4.00"><infProt><tpAmb>1</tpAmb><verAplic>PR-v4</verAplic><chNFe>{chave}</chNFe>'
+        f'<dhRecbto>2025-03-01T10:16:00-03:00</dhRecbto><nProt>141250000000000</nProt>'
+        f'<digVal>{assinatura[:28]}</digVal><cStat>100</cStat><xMotivo>Autorizado o uso da NF-e</xMotivo>'
+        f'</infProt></protNFe></nfeProc>'
+    ).encode("utf-8")
+
+
+def extrair_dados_nfe_elementtree(xml_doc, nsu, schema):
+    """Implementação anterior de _extrair_dados_nfe: ElementTree + root.iter() com split de namespace"""
+    import xml.etree.ElementTree as ET
+
+    root = ET.fromstring(xml_doc)
+    is_nfe = 'procNFe' in xml_doc or 'NFe' in xml_doc
+    is_resumo = 'resNFe' in xml_doc
+    dados = {"nsu": nsu, "schema": schema, "xml": xml_doc,
+             "tipo_documento": "NFe" if is_nfe else ("Resumo" if is_resumo else "Evento")}
+    for elem in root.iter():
+        tag = elem.tag.split('}')[-1] if '}' in elem.tag else elem.tag
+        if tag == 'chNFe':
+            dados['chave'] = elem.text
+        elif tag == 'nNF':
+            dados['numero_nf'] = elem.text
+        elif tag == 'serie':
+            dados['serie'] = elem.text
+        elif tag == 'dhEmi':
+            dados['data_emissao'] = elem.text[:10] if elem.text else None
+        elif tag == 'vNF':
+            dados['valor_total'] = float(elem.text) if elem.text else 0
+        elif tag == 'tpNF':
+            dados['tipo_operacao'] = 'ENTRADA' if elem.text == '0' else 'SAIDA'
+        elif tag in ('emit', 'dest', 'dup'):
+            for child in elem.iter():
+                child_tag = child.tag.split('}')[-1] if '}' in child.tag else child.tag
+                if tag == 'emit' and child_tag in ('CNPJ', 'xNome', 'xFant'):
+                    dados[{'CNPJ': 'cnpj_emitente', 'xNome': 'nome_emitente', 'xFant': 'fantasia_emitente'}[child_tag]] = child.text
+                elif tag == 'dest' and child_tag in ('CNPJ', 'xNome'):
+                    dados[{'CNPJ': 'cnpj_destinatario', 'xNome': 'nome_destinatario'}[child_tag]] = child.text
+                elif tag == 'dup' and child_tag == 'dVenc':
+                    dados['data_vencimento'] = child.text
+                elif tag == 'dup' and child_tag == 'vDup':
+                    dados['valor_duplicata'] = float(child.text) if child.text else 0
+    return dados
+
+
+def benchmark_nfe(linhas_lista, repeticoes):
+    """
+    Compara a leitura de procNFe por ElementTree (varredura completa) e pelo
+    extrair_dados_nfe (lxml + XPath compilado); `linhas` = notas no corpus
+    """
+    from backend.sefaz_service import extrair_dados_nfe
+
+    print("🧾 Benchmark leitura de NFe")
+    print(f"{'notas':>10} | {'KB médio':>9} | {'modo':>12} | {'total (ms)':>11} | {'notas/s':>9} | {'MB/s':>7} | {'duplicatas':>10}")
+    for linhas in linhas_lista:
+        rnd = random.Random(42)
+        # Tamanhos reais: a maioria com poucos itens, algumas com centenas
+        corpus = [
+            procnfe_sintetica(numero, min(int(rnd.paretovariate(1.2) * 3), 400), rnd.randint(1, 6), rnd)
+            for numero in range(1, linhas + 1)
+        ]
+        textos = [xml.decode("utf-8") for xml in corpus]
+        megabytes = sum(len(xml) for xml in corpus) / 1024 / 1024
+        modos = (
+            # A implementação anterior recebia o XML já decodificado
+            ("elementtree", lambda: [extrair_dados_nfe_elementtree(xml, "", "procNFe") for xml in textos]),
+            ("lxml", lambda: [extrair_dados_nfe(xml, "", "procNFe") for xml in corpus]),
+        )
+        for nome, funcao in modos:
+            resultado = funcao()
+            duplicatas = sum(len(d.get("duplicatas", [])) or ("data_vencimento" in d) for d in resultado)
+            total = medir(funcao, repeticoes)
+            print(
+                f"{linhas:>10} | {megabytes * 1024 / linhas:>9.1f} | {nome:>12} | {total:>11.1f} | "
+                f"{linhas / total * 1000:>9.0f} | {megabytes / total * 1000:>7.1f} | {duplicatas:>10}"
+            )
+
+
+BENCHMARKS = {
+    "dashboard": benchmark_dashboard,
+    "importacao": benchmark_importacao,
+    "autocomplete": benchmark_autocomplete,
+    "busca": benchmark_busca,
+    "paginacao": benchmark_paginacao,
+    "streaming": benchmark_streaming,
+    "excel": benchmark_excel,
+    "concorrencia": benchmark_concorrencia,
+    "nfe": benchmark_nfe,
+}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks do Sistema Financeiro Finco")
+    parser.add_argument("benchmark", choices=sorted(BENCHMARKS))
+    parser.add_argument("--linhas", type=int, nargs="+", default=[100000, 1000000])
+    parser.add_argument("--repeticoes", type=int, default=5)
+    args = parser.parse_args()
+
+    BENCHMARKS[args.benchmark](args.linhas, args.repeticoes)
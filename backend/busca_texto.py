@@ -0,0 +1,171 @@
+"""
+Sistema Financeiro Finco - Busca Textual nos Lançamentos
+Índice FTS5 sobre lancamentos.item para filtros e busca por relevância
+
+A tabela virtual `lancamentos_fts` (tokenizador trigram) guarda, com o
+mesmo rowid do lançamento, o item sem acentos; triggers a mantêm em dia a
+cada INSERT, UPDATE e DELETE em lancamentos. O trigram atende LIKE '%...%'
+pelo índice (trechos de 3 ou mais caracteres), então o filtro por item
+continua sendo "contém", só que sem varrer a tabela.
+
+A remoção de acentos é feita pela mesma tabela MAPA_ACENTOS no SQL dos
+triggers e no Python da consulta (a opção remove_diacritics do trigram
+só existe a partir do SQLite 3.45).
+"""
+from sqlalchemy import column, literal_column, select, table, text
+
+from backend.database import Lancamento
+
+MAPA_ACENTOS = {
+    "Á": "A", "À": "A", "Â": "A", "Ã": "A", "Ä": "A",
+    "á": "a", "à": "a", "â": "a", "ã": "a", "ä": "a",
+    "É": "E", "È": "E", "Ê": "E", "Ë": "E",
+    "é": "e", "è": "e", "ê": "e", "ë": "e",
+    "Í": "I", "Ì": "I", "Î": "I", "Ï": "I",
+    "í": "i", "ì": "i", "î": "i", "ï": "i",
+    "Ó": "O", "Ò": "O", "Ô": "O", "Õ": "O", "Ö": "O",
+    "ó": "o", "ò": "o", "ô": "o", "õ": "o", "ö": "o",
+    "Ú": "U", "Ù": "U", "Û": "U", "Ü": "U",
+    "ú": "u", "ù": "u", "û": "u", "ü": "u",
+    "Ç": "C", "ç": "c", "Ñ": "N", "ñ": "n",
+}
+
+_TABELA_ACENTOS = str.maketrans(MAPA_ACENTOS)
+
+# Itens só com ASCII imprimível (a maioria) vão direto para o índice, sem os replace()
+_SQL_SO_ASCII = "{item} IS NULL OR {item} NOT GLOB '*[^ -~]*'"
+
+# Menor trecho que o trigram consegue procurar pelo índice
+MINIMO_TRIGRAMA = 3
+
+lancamentos_fts = table("lancamentos_fts", column("rowid"), column("item"), column("rank"))
+
+
+def remover_acentos(texto):
+    """Texto sem acentos, pela mesma regra usada nos triggers"""
+    return texto.translate(_TABELA_ACENTOS)
+
+
+def _sql_sem_acentos(id_, item, origem=""):
+    """
+    SELECT (id, texto) em que texto equivale a remover_acentos(item)
+
+    Os replace() são aninhados em blocos de subconsultas: aninhar todos
+    numa só expressão estoura a pilha do parser do SQLite.
+    """
+    trocas = list(MAPA_ACENTOS.items())
+    sql = None
+    for i in range(0, len(trocas), 16):
+        expressao = item if sql is None else "texto"
+        for acentuado, simples in trocas[i:i + 16]:
+            expressao = f"replace({expressao}, '{acentuado}', '{simples}')"
+        if sql is None:
+            sql = f"SELECT {id_} AS id, {expressao} AS texto {origem}"
+        else:
+            sql = f"SELECT id, {expressao} AS texto FROM ({sql})"
+    return sql
+
+
+def _sql_inserir_indice(id_, item, origem=""):
+    """Os dois INSERTs em lancamentos_fts: itens só ASCII como estão, os demais sem acentos"""
+    so_ascii = _SQL_SO_ASCII.format(item=item)
+    return [
+        f"INSERT INTO lancamentos_fts (rowid, item) SELECT {id_}, {item} {origem} WHERE {so_ascii}",
+        "INSERT INTO lancamentos_fts (rowid, item) "
+        + _sql_sem_acentos(id_, item, f"{origem} WHERE NOT ({so_ascii})"),
+    ]
+
+
+def criar_indice_texto(conn):
+    """
+    Cria (ou recria) lancamentos_fts, os triggers de sincronização e
+    carrega o índice com os lançamentos existentes
+    """
+    conn.execute(text("DROP TABLE IF EXISTS lancamentos_fts"))
+    conn.execute(text(
+        "CREATE VIRTUAL TABLE lancamentos_fts USING fts5(item, tokenize = 'trigram')"
+    ))
+
+    for trigger in ("lancamentos_fts_insert", "lancamentos_fts_update", "lancamentos_fts_delete"):
+        conn.execute(text(f"DROP TRIGGER IF EXISTS {trigger}"))
+    inserir_novo = "".join(f"{comando}; " for comando in _sql_inserir_indice("new.id", "new.item"))
+    conn.execute(text(
+        f"CREATE TRIGGER lancamentos_fts_insert AFTER INSERT ON lancamentos BEGIN {inserir_novo}END"
+    ))
+    conn.execute(text(
+        "CREATE TRIGGER lancamentos_fts_update AFTER UPDATE OF id, item ON lancamentos BEGIN "
+        f"DELETE FROM lancamentos_fts WHERE rowid = old.id; {inserir_novo}END"
+    ))
+    conn.execute(text(
+        "CREATE TRIGGER lancamentos_fts_delete AFTER DELETE ON lancamentos BEGIN "
+        "DELETE FROM lancamentos_fts WHERE rowid = old.id; "
+        "END"
+    ))
+
+    for comando in _sql_inserir_indice("id", "item", "FROM lancamentos"):
+        conn.execute(text(comando))
+
+
+def filtro_item(padrao):
+    """
+    Condição para Lancamento equivalente a `item LIKE padrao`, sem acentos
+    e resolvida pelo índice FTS
+
+    Ex.: filtro_item(f"%{item}%") para "contém"
+    """
+    ids = select(lancamentos_fts.c.rowid).where(
+        lancamentos_fts.c.item.like(remover_acentos(padrao))
+    )
+    return Lancamento.id.in_(ids)
+
+
+def consulta_fts(q):
+    """
+    Expressão MATCH do FTS5 para a busca: cada palavra vira uma frase
+    entre aspas e todas precisam aparecer. Palavras curtas demais para o
+    trigram se juntam à seguinte (ex.: "NF 123" fica numa frase só).
+
+    Returns:
+        A expressão, ou None se o texto estiver vazio ou tiver menos de 3 caracteres
+    """
+    frases, atual = [], ""
+    for palavra in remover_acentos(q).split():
+        atual = f"{atual} {palavra}".strip()
+        if len(atual) >= MINIMO_TRIGRAMA:
+            frases.append(atual)
+            atual = ""
+    if atual:
+        if not frases:
+            return None
+        frases[-1] = f"{frases[-1]} {atual}"
+    if not frases:
+        return None
+    return " ".join('"' + frase.replace('"', '""') + '"' for frase in frases)
+
+
+def buscar_lancamentos(db, q, limite=50):
+    """
+    Lançamentos cujo item contém as palavras de `q`, do mais relevante
+    (bm25) para o menos relevante; empates pela data mais recente
+
+    Consultas com menos de 3 caracteres caem no filtro "contém" comum.
+    """
+    expressao = consulta_fts(q)
+    if expressao is None:
+        if not q.strip():
+            return []
+        return db.query(Lancamento).filter(filtro_item(f"%{q.strip()}%")).order_by(
+            Lancamento.data.desc(), Lancamento.id.desc()
+        ).limit(limite).all()
+
+    relevancia = select(
+        lancamentos_fts.c.rowid, lancamentos_fts.c.rank
+    ).where(
+        literal_column("lancamentos_fts").op("MATCH")(expressao)
+    ).subquery()
+
+    return db.query(Lancamento).join(
+        relevancia, relevancia.c.rowid == Lancamento.id
+    ).order_by(
+        relevancia.c.rank, Lancamento.data.desc(), Lancamento.id.desc()
+    ).limit(limite).all()
@@ -0,0 +1,97 @@
+"""
+Sistema Financeiro Finco - Registro de Classificações
+Tabela de classificações em memória para as consultas por nome e por id
+
+São poucas classificações (cerca de 75) e elas quase não mudam: o registro
+lê a tabela uma vez (na inicialização ou na primeira consulta) e as rotas
+de lançamentos, a importação, os resumos e o autocomplete passam a resolver
+nome -> (id, tipo, categoria_padrao) e id -> nome num dicionário. As rotas
+de criar/atualizar/excluir classificação recarregam o registro depois do
+commit; a restauração de backup o descarta.
+
+Classificações inativas (excluídas) continuam no registro, como nas
+consultas que ele substitui.
+"""
+import threading
+from typing import NamedTuple
+
+from backend.database import Classificacao
+
+
+class InfoClassificacao(NamedTuple):
+    id: int
+    nome: str
+    tipo: str
+    categoria_padrao: str
+
+
+class RegistroClassificacoes:
+    """
+    Classificações indexadas por nome e por id
+
+    Cada carga monta dicionários novos e troca a referência de uma vez:
+    quem já pegou um mapa (ex.: uma importação em andamento) continua com
+    uma versão consistente.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._por_nome = None  # nome -> InfoClassificacao; None = precisa carregar
+        self._por_id = {}  # id -> InfoClassificacao
+
+    def carregar(self, db):
+        """Lê a tabela classificacoes (uma consulta) e substitui o registro"""
+        linhas = db.query(
+            Classificacao.id, Classificacao.nome, Classificacao.tipo, Classificacao.categoria_padrao
+        ).order_by(Classificacao.id.desc()).all()
+
+        # Em ordem decrescente de id: num nome repetido fica o de menor id
+        por_nome = {}
+        por_id = {}
+        for linha in linhas:
+            info = InfoClassificacao(*linha)
+            por_nome[info.nome] = info
+            por_id[info.id] = info
+
+        with self._lock:
+            self._por_nome = por_nome
+            self._por_id = por_id
+        return por_nome
+
+    def invalidar(self):
+        """Descarta o registro; a próxima consulta recarrega do banco"""
+        with self._lock:
+            self._por_nome = None
+
+    def _mapas(self, db):
+        with self._lock:
+            por_nome, por_id = self._por_nome, self._por_id
+        if por_nome is None:
+            por_nome = self.carregar(db)
+            with self._lock:
+                por_id = self._por_id
+        return por_nome, por_id
+
+    def por_nome(self, db, nome):
+        """InfoClassificacao de `nome` (None se não existir)"""
+        if not nome:
+            return None
+        return self._mapas(db)[0].get(nome)
+
+    def por_id(self, db, classificacao_id):
+        """InfoClassificacao do id (None se não existir)"""
+        if not classificacao_id:
+            return None
+        return self._mapas(db)[1].get(classificacao_id)
+
+    def id_por_nome(self, db, nome):
+        """Id da classificação `nome` (None se não existir)"""
+        info = self.por_nome(db, nome)
+        return info.id if info else None
+
+    def mapa_ids(self, db):
+        """Dicionário nome -> id de todas as classificações (para Series.map)"""
+        return {nome: info.id for nome, info in self._mapas(db)[0].items()}
+
+
+registro_classificacoes = RegistroClassificacoes()
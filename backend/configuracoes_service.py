@@ -0,0 +1,96 @@
+"""
+Sistema Financeiro Finco - Cache de Configurações
+Configurações do sistema (Miller-Orr, saldo inicial, ano vigente) já convertidas
+
+A tabela `configuracoes` guarda tudo como texto. O cache lê a tabela uma
+vez (na inicialização ou na primeira consulta), converte cada valor para o
+tipo declarado em Configuracoes e serve a mesma instância às rotas, sem ir
+ao banco. Quem grava uma configuração atualiza o cache depois do commit
+(atualizar) ou o descarta (invalidar) - ex.: importação da planilha de
+fluxo e restauração de backup.
+"""
+import threading
+
+from pydantic import BaseModel, ConfigDict
+
+from backend.database import Configuracao
+
+
+class Configuracoes(BaseModel):
+    """Valores tipados; os padrões são os mesmos de inicializar_configuracoes"""
+    model_config = ConfigDict(frozen=True)
+
+    miller_orr_minimo: float = 55000
+    miller_orr_retorno: float = 100000
+    miller_orr_maximo: float = 355000
+    saldo_inicial_ano: float = 0
+    ano_vigente: int = 2025
+
+
+def converter_configuracao(chave, valor):
+    """
+    Converte o texto gravado para o tipo da configuração
+
+    Chaves que não estão em Configuracoes voltam como estão.
+
+    Raises:
+        ValueError: se o valor não for do tipo esperado (ex.: "abc" para um float)
+    """
+    campo = Configuracoes.model_fields.get(chave)
+    if campo is None:
+        return valor
+    return campo.annotation(str(valor).strip())
+
+
+class CacheConfiguracoes:
+    """
+    Configurações carregadas uma única vez por processo
+
+    `obter(db)` só consulta o banco se o cache estiver vazio (primeira
+    chamada ou depois de `invalidar()`).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._atual = None
+
+    def carregar(self, db):
+        """Lê a tabela configuracoes (uma consulta) e substitui o cache"""
+        valores = {}
+        for chave, valor in db.query(Configuracao.chave, Configuracao.valor):
+            if chave not in Configuracoes.model_fields or valor in (None, ""):
+                continue
+            try:
+                valores[chave] = converter_configuracao(chave, valor)
+            except ValueError:
+                print(f"⚠️ Configuração {chave} inválida ({valor!r}), usando o padrão")
+
+        configuracoes = Configuracoes(**valores)
+        with self._lock:
+            self._atual = configuracoes
+        return configuracoes
+
+    def obter(self, db):
+        """Configurações atuais, carregando do banco se necessário"""
+        configuracoes = self._atual
+        if configuracoes is None:
+            configuracoes = self.carregar(db)
+        return configuracoes
+
+    def atualizar(self, chave, valor):
+        """Aplica ao cache um valor já gravado no banco"""
+        if chave not in Configuracoes.model_fields:
+            return
+        with self._lock:
+            if self._atual is not None:
+                self._atual = self._atual.model_copy(
+                    update={chave: converter_configuracao(chave, valor)}
+                )
+
+    def invalidar(self):
+        """Descarta o cache; a próxima leitura recarrega do banco"""
+        with self._lock:
+            self._atual = None
+
+
+cache_configuracoes = CacheConfiguracoes()
@@ -1,11 +1,14 @@
 """
 Sistema Financeiro Finco - Modelo de Banco de Dados
 """
-from sqlalchemy import create_engine, Column, Integer, String, Float, Date, DateTime, Boolean, Text, ForeignKey, Enum as SQLEnum
+from sqlalchemy import create_engine, event, text, Column, Integer, String, Date, DateTime, Boolean, Text, LargeBinary, ForeignKey, Index, Enum as SQLEnum
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
+from sqlalchemy.types import TypeDecorator
 from datetime import datetime, date
+from decimal import Decimal, ROUND_HALF_UP
 import enum
+import hashlib
 
 import os
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -13,11 +16,88 @@ DATA_DIR = os.path.join(os.path.dirname(BASE_DIR), "data")
 os.makedirs(DATA_DIR, exist_ok=True)
 DATABASE_URL = f"sqlite:///{os.path.join(DATA_DIR, 'financeiro_finco.db')}"
 
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+# Perfis de conexão do SQLite: PRAGMAs aplicados a cada conexão aberta pelo pool.
+# "desempenho" usa WAL (leitores não esperam o commit de quem escreve),
+# synchronous=NORMAL (seguro com WAL: uma queda de energia perde no máximo
+# os últimos commits, sem corromper o banco), mmap de 256 MiB, cache de
+# 64 MiB e tabelas temporárias em memória. "padrao" mantém o comportamento
+# do SQLite (journal de rollback, sem mmap).
+PERFIS_SQLITE = {
+    "desempenho": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "mmap_size": 256 * 1024 * 1024,
+        "cache_size": -64 * 1024,  # negativo = KiB
+        "temp_store": "MEMORY",
+        "busy_timeout": 5000,  # ms
+    },
+    "padrao": {
+        "busy_timeout": 5000,
+    },
+}
+PERFIL_SQLITE = os.getenv("SQLITE_PERFIL", "desempenho")
+
+
+def configurar_sqlite(engine_sqlite, perfil=PERFIL_SQLITE):
+    """
+    Aplica os PRAGMAs de `perfil` (chave de PERFIS_SQLITE) em cada conexão nova
+
+    Raises:
+        ValueError: se o perfil não existir
+    """
+    if perfil not in PERFIS_SQLITE:
+        raise ValueError(f"Perfil SQLite desconhecido: {perfil} (use {', '.join(PERFIS_SQLITE)})")
+    pragmas = PERFIS_SQLITE[perfil]
+
+    @event.listens_for(engine_sqlite, "connect")
+    def _aplicar_pragmas(conexao_dbapi, _registro):
+        cursor = conexao_dbapi.cursor()
+        for nome, valor in pragmas.items():
+            cursor.execute(f"PRAGMA {nome} = {valor}")
+        cursor.close()
+
+    return engine_sqlite
+
+
+engine = configurar_sqlite(create_engine(DATABASE_URL, connect_args={"check_same_thread": False}))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
 
+# Dinheiro
+CENTAVO = Decimal("0.01")
+
+
+def em_reais(valor):
+    """Valor (float, int, str ou Decimal) como Decimal com 2 casas, arredondado meio para cima"""
+    if valor is None:
+        return None
+    if not isinstance(valor, Decimal):
+        valor = Decimal(str(valor))
+    return valor.quantize(CENTAVO, rounding=ROUND_HALF_UP)
+
+
+class Centavos(TypeDecorator):
+    """
+    Valor em reais gravado como centavos inteiros (coluna INTEGER)
+
+    Grava `em_reais(valor) * 100` e lê Decimal com 2 casas: somas no SQLite
+    são de inteiros e nenhum centavo se perde em arredondamento de float.
+    """
+    impl = Integer
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return int(em_reais(value).scaleb(2))
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return Decimal(int(value)).scaleb(-2)
+
+
 # Enums
 class TipoLancamento(str, enum.Enum):
     ENTRADA = "ENTRADA"
@@ -75,6 +155,12 @@ class ItemFornecedor(Base):
     
     # Relacionamento
     classificacao_rel = relationship("Classificacao", back_populates="itens")
+    
+    # Um registro por nome: o uso é somado com INSERT ... ON CONFLICT(nome)
+    # (bancos já existentes recebem o índice via backend/migracoes.py)
+    __table_args__ = (
+        Index("ux_itens_fornecedores_nome", "nome", unique=True),
+    )
 
 
 class Lancamento(Base):
@@ -99,15 +185,56 @@ class Lancamento(Base):
     
     # Detalhes
     item = Column(String(200))  # Descrição ou fornecedor
-    valor = Column(Float, nullable=False)
+    valor = Column(Centavos, nullable=False)
     situacao = Column(String(20), default="BAIXADA")  # BAIXADA ou NAO_BAIXADA
     
     # Metadados
     criado_em = Column(DateTime, default=datetime.utcnow)
     atualizado_em = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    hash_conteudo = Column(String(40))  # SHA-1 de data|tipo|item|valor (detecção de duplicatas)
     
     # Relacionamento
     classificacao_rel = relationship("Classificacao", back_populates="lancamentos")
+    
+    # Índices escolhidos a partir das consultas de main.py
+    # (bancos já existentes recebem os mesmos índices via backend/migracoes.py)
+    __table_args__ = (
+        # Filtros por ano/mês + agregados por tipo/situação (cobre o SUM de valor)
+        Index("ix_lancamentos_ano_mes_tipo", "ano", "mes", "tipo", "situacao", "valor"),
+        # Intervalos de datas, lançamentos do dia e ordenação por data
+        Index("ix_lancamentos_data", "data", "tipo"),
+        # Paginação por cursor em ordem de (data, id)
+        Index("ix_lancamentos_data_id", "data", "id"),
+        # Contas pendentes (NAO_BAIXADA) e saldo por tipo/situação
+        Index("ix_lancamentos_situacao_tipo", "situacao", "tipo", "data"),
+        # Listagem de contas pendentes já na ordem (data, id), sem ordenar
+        Index("ix_lancamentos_situacao_data", "situacao", "data", "id"),
+        # Filtro por classificação
+        Index("ix_lancamentos_classificacao", "classificacao_nome", "ano", "mes"),
+        # Busca exata por item
+        Index("ix_lancamentos_item", "item", "data"),
+        # Detecção de duplicatas na importação
+        Index("ix_lancamentos_hash_conteudo", "hash_conteudo"),
+    )
+
+
+def calcular_hash_conteudo(data, tipo, item, valor):
+    """
+    Hash que identifica um lançamento pelo conteúdo (data, tipo, item, valor)
+
+    Dois lançamentos com o mesmo hash são considerados duplicados na importação.
+    """
+    chave = f"{data}|{tipo}|{item or ''}|{em_reais(valor or 0)}"
+    return hashlib.sha1(chave.encode("utf-8")).hexdigest()
+
+
+@event.listens_for(Lancamento, "before_insert")
+@event.listens_for(Lancamento, "before_update")
+def _atualizar_hash_conteudo(mapper, connection, lancamento):
+    """Mantém hash_conteudo em dia nas escritas pelo ORM (inserts em lote já trazem o hash)"""
+    lancamento.hash_conteudo = calcular_hash_conteudo(
+        lancamento.data, lancamento.tipo, lancamento.item, lancamento.valor
+    )
 
 
 class SaldoDiario(Base):
@@ -120,16 +247,16 @@ class SaldoDiario(Base):
     mes = Column(Integer, nullable=False)
     ano = Column(Integer, nullable=False)
     
-    saldo_inicial = Column(Float, default=0)
-    total_entradas = Column(Float, default=0)
-    total_saidas = Column(Float, default=0)
-    saldo_do_dia = Column(Float, default=0)
-    saldo_final = Column(Float, default=0)
+    saldo_inicial = Column(Centavos, default=0)
+    total_entradas = Column(Centavos, default=0)
+    total_saidas = Column(Centavos, default=0)
+    saldo_do_dia = Column(Centavos, default=0)
+    saldo_final = Column(Centavos, default=0)
     
     # Fluxos por categoria
-    fluxo_operacional = Column(Float, default=0)
-    fluxo_financeiro = Column(Float, default=0)
-    fluxo_investimento = Column(Float, default=0)
+    fluxo_operacional = Column(Centavos, default=0)
+    fluxo_financeiro = Column(Centavos, default=0)
+    fluxo_investimento = Column(Centavos, default=0)
     
     atualizado_em = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
@@ -143,22 +270,22 @@ class ResumoMensal(Base):
     ano = Column(Integer, nullable=False)
     
     # Totais
-    total_entradas = Column(Float, default=0)
-    total_saidas = Column(Float, default=0)
-    saldo_inicial = Column(Float, default=0)
-    saldo_final = Column(Float, default=0)
+    total_entradas = Column(Centavos, default=0)
+    total_saidas = Column(Centavos, default=0)
+    saldo_inicial = Column(Centavos, default=0)
+    saldo_final = Column(Centavos, default=0)
     
     # Por tipo de custo/despesa
-    custo_fixo = Column(Float, default=0)
-    custo_variavel = Column(Float, default=0)
-    despesa_fixa = Column(Float, default=0)
-    despesa_variavel = Column(Float, default=0)
-    impostos = Column(Float, default=0)
+    custo_fixo = Column(Centavos, default=0)
+    custo_variavel = Column(Centavos, default=0)
+    despesa_fixa = Column(Centavos, default=0)
+    despesa_variavel = Column(Centavos, default=0)
+    impostos = Column(Centavos, default=0)
     
     # Fluxos
-    fluxo_operacional = Column(Float, default=0)
-    fluxo_financeiro = Column(Float, default=0)
-    fluxo_investimento = Column(Float, default=0)
+    fluxo_operacional = Column(Centavos, default=0)
+    fluxo_financeiro = Column(Centavos, default=0)
+    fluxo_investimento = Column(Centavos, default=0)
     
     atualizado_em = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
@@ -189,6 +316,105 @@ class Usuario(Base):
     criado_em = Column(DateTime, default=datetime.utcnow)
 
 
+class SincronizacaoNFe(Base):
+    """
+    Cursor da Distribuição DFe (linha única)
+
+    Guarda o último NSU recebido da SEFAZ e quando a próxima consulta é
+    permitida: após cStat 137 (ou ultNSU == maxNSU) a SEFAZ exige 1 hora
+    de espera antes de consultar de novo.
+    """
+    __tablename__ = "nfe_sincronizacao"
+
+    id = Column(Integer, primary_key=True)
+    ult_nsu = Column(String(15), nullable=False, default="0")
+    max_nsu = Column(String(15))
+    ultimo_cstat = Column(String(3))
+    ultimo_motivo = Column(String(255))
+    ultima_consulta = Column(DateTime)
+    proxima_consulta = Column(DateTime)
+    documentos_recebidos = Column(Integer, nullable=False, default=0)
+    atualizado_em = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class DocumentoNFe(Base):
+    """
+    NFe armazenadas localmente (recebidas da SEFAZ ou por upload)
+
+    Uma linha por chave de acesso (o XML completo substitui o resumo quando
+    chega); eventos têm linha própria. O XML fica compactado em nfe_xml e
+    os vencimentos em nfe_duplicatas.
+    """
+    __tablename__ = "nfe_documentos"
+
+    id = Column(Integer, primary_key=True, index=True)
+    nsu = Column(String(15))  # nulo nos XML enviados por upload
+    chave = Column(String(44))
+    schema = Column(String(50))
+    tipo_documento = Column(String(20))  # NFe, Resumo ou Evento
+    origem = Column(String(10), nullable=False, default="sefaz")  # sefaz ou upload
+
+    # Dados da nota
+    numero_nf = Column(String(20))
+    serie = Column(String(5))
+    data_emissao = Column(Date)
+    valor_total = Column(Centavos)
+    tipo_operacao = Column(String(10))  # ENTRADA ou SAIDA (tpNF)
+    cnpj_emitente = Column(String(14))
+    nome_emitente = Column(String(200))
+    fantasia_emitente = Column(String(200))
+    cnpj_destinatario = Column(String(14))
+    nome_destinatario = Column(String(200))
+
+    # Do ponto de vista da Finco
+    tipo_lancamento = Column(String(20))  # ENTRADA, SAIDA ou INDEFINIDO
+    fornecedor_cliente = Column(String(200))
+
+    recebido_em = Column(DateTime, default=datetime.utcnow)
+
+    duplicatas = relationship(
+        "DuplicataNFe", back_populates="documento", lazy="selectin",
+        order_by="DuplicataNFe.vencimento", cascade="all, delete-orphan"
+    )
+    arquivo = relationship(
+        "XmlNFe", uselist=False, cascade="all, delete-orphan"
+    )
+
+    __table_args__ = (
+        Index("ux_nfe_documentos_nsu", "nsu", unique=True),
+        # Uma nota por chave; eventos (várias por nota) ficam de fora
+        Index(
+            "ux_nfe_documentos_chave", "chave", unique=True,
+            sqlite_where=text("tipo_documento != 'Evento'")
+        ),
+        Index("ix_nfe_documentos_chave", "chave"),
+        Index("ix_nfe_documentos_emitente", "cnpj_emitente", "data_emissao"),
+        Index("ix_nfe_documentos_data_emissao", "data_emissao"),
+        Index("ix_nfe_documentos_valor", "valor_total"),
+    )
+
+
+class DuplicataNFe(Base):
+    """Parcelas (duplicatas) da cobrança de uma NFe"""
+    __tablename__ = "nfe_duplicatas"
+
+    id = Column(Integer, primary_key=True)
+    documento_id = Column(Integer, ForeignKey("nfe_documentos.id", ondelete="CASCADE"), nullable=False, index=True)
+    numero = Column(String(60))
+    vencimento = Column(Date, index=True)
+    valor = Column(Centavos)
+
+    documento = relationship("DocumentoNFe", back_populates="duplicatas")
+
+
+class XmlNFe(Base):
+    """XML original de uma NFe, compactado com gzip (lido só sob demanda)"""
+    __tablename__ = "nfe_xml"
+
+    documento_id = Column(Integer, ForeignKey("nfe_documentos.id", ondelete="CASCADE"), primary_key=True)
+    conteudo = Column(LargeBinary, nullable=False)
+
+
 # Funções auxiliares
 def get_db():
     """Dependency para obter sessão do banco"""
@@ -200,8 +426,11 @@ def get_db():
 
 
 def criar_tabelas():
-    """Cria todas as tabelas no banco"""
+    """Cria todas as tabelas no banco e aplica as migrações pendentes"""
+    from backend.migracoes import aplicar_migracoes
+    
     Base.metadata.create_all(bind=engine)
+    aplicar_migracoes(engine)
 
 
 def inicializar_configuracoes(db):
@@ -0,0 +1,243 @@
+"""
+Sistema Financeiro Finco - Documentos NFe
+Armazena localmente as NFe recebidas da SEFAZ ou por upload
+
+Cada nota é gravada uma vez em nfe_documentos, pela chave de acesso (e
+pelo NSU, quando vem da SEFAZ), com os campos de busca indexados: CNPJ do
+emitente, data de emissão, valor e, em nfe_duplicatas, os vencimentos. O
+XML original fica compactado em nfe_xml e só é lido quando pedido: as
+respostas da API levam apenas os metadados e a importação recebe as chaves.
+"""
+import gzip
+from datetime import datetime
+
+from backend.database import SessionLocal, DocumentoNFe, DuplicataNFe, XmlNFe
+
+# Campos de _extrair_dados_nfe copiados para as colunas de mesmo nome
+CAMPOS_TEXTO = [
+    "numero_nf", "serie", "tipo_operacao",
+    "cnpj_emitente", "nome_emitente", "fantasia_emitente",
+    "cnpj_destinatario", "nome_destinatario",
+    "tipo_lancamento", "fornecedor_cliente",
+]
+
+# Uma nota recebida em versão mais completa substitui a gravada
+COMPLETUDE = {"Resumo": 1, "NFe": 2}
+
+NIVEL_COMPRESSAO = 6
+
+
+def tipo_documento(dados):
+    """NFe, Resumo ou Evento, pelo schema do docZip (ou pelo que o parser identificou)"""
+    schema = dados.get("schema") or ""
+    if schema.startswith("procNFe"):
+        return "NFe"
+    if schema.startswith("resNFe"):
+        return "Resumo"
+    if "Evento" in schema:
+        return "Evento"
+    return dados.get("tipo_documento") or "NFe"
+
+
+def _data(valor):
+    """'AAAA-MM-DD...' -> date (None se vazio ou inválido)"""
+    try:
+        return datetime.strptime(valor[:10], "%Y-%m-%d").date() if valor else None
+    except ValueError:
+        return None
+
+
+def _duplicatas(dados):
+    """Duplicatas do documento (ou a única informada em data_vencimento/valor_duplicata)"""
+    if dados.get("duplicatas"):
+        return dados["duplicatas"]
+    if dados.get("data_vencimento"):
+        return [{
+            "numero": None,
+            "vencimento": dados["data_vencimento"],
+            "valor": dados.get("valor_duplicata"),
+        }]
+    return []
+
+
+def _preencher(documento, dados, tipo):
+    """Copia os dados extraídos (e o XML compactado) para o documento"""
+    documento.tipo_documento = tipo
+    documento.schema = dados.get("schema") or None
+    documento.chave = dados.get("chave")
+    documento.data_emissao = _data(dados.get("data_emissao"))
+    documento.valor_total = dados.get("valor_total")
+    for campo in CAMPOS_TEXTO:
+        setattr(documento, campo, dados.get(campo))
+
+    documento.duplicatas = [
+        DuplicataNFe(numero=dup.get("numero"), vencimento=_data(dup.get("vencimento")), valor=dup.get("valor"))
+        for dup in _duplicatas(dados)
+    ]
+    if dados.get("xml"):
+        conteudo = gzip.compress(dados["xml"].encode("utf-8"), compresslevel=NIVEL_COMPRESSAO)
+        if documento.id is not None and documento.arquivo is not None:
+            documento.arquivo.conteudo = conteudo
+        else:
+            documento.arquivo = XmlNFe(conteudo=conteudo)
+
+
+def gravar_documentos(db, documentos, origem="sefaz"):
+    """
+    Grava os documentos extraídos por SefazService (não faz commit)
+
+    Um NSU já recebido é ignorado. Uma nota cuja chave já está gravada só é
+    atualizada quando chega mais completa (XML completo no lugar do resumo).
+
+    Returns:
+        (gravados, novos): o DocumentoNFe de cada item de `documentos`, na
+        mesma ordem, e quantos deles foram inseridos agora
+    """
+    nsus = [doc["nsu"].zfill(15) for doc in documentos if doc.get("nsu")]
+    chaves = [doc["chave"] for doc in documentos if doc.get("chave")]
+    por_nsu = {
+        d.nsu: d for d in db.query(DocumentoNFe).filter(DocumentoNFe.nsu.in_(nsus))
+    } if nsus else {}
+    por_chave = {
+        d.chave: d for d in db.query(DocumentoNFe).filter(
+            DocumentoNFe.chave.in_(chaves), DocumentoNFe.tipo_documento != "Evento"
+        )
+    } if chaves else {}
+
+    gravados = []
+    novos = 0
+    for dados in documentos:
+        nsu = dados["nsu"].zfill(15) if dados.get("nsu") else None
+        if nsu in por_nsu:
+            gravados.append(por_nsu[nsu])
+            continue
+
+        tipo = tipo_documento(dados)
+        existente = por_chave.get(dados.get("chave")) if tipo != "Evento" else None
+        if existente is not None:
+            if COMPLETUDE.get(tipo, 0) > COMPLETUDE.get(existente.tipo_documento, 0):
+                _preencher(existente, dados, tipo)
+                existente.nsu = nsu or existente.nsu
+                existente.origem = origem
+                existente.recebido_em = datetime.utcnow()
+            gravados.append(existente)
+            continue
+
+        documento = DocumentoNFe(nsu=nsu, origem=origem, recebido_em=datetime.utcnow())
+        _preencher(documento, dados, tipo)
+        db.add(documento)
+        if nsu:
+            por_nsu[nsu] = documento
+        if tipo != "Evento" and documento.chave:
+            por_chave[documento.chave] = documento
+        gravados.append(documento)
+        novos += 1
+
+    db.flush()
+    return gravados, novos
+
+
+def guardar_documentos(documentos, origem="sefaz"):
+    """
+    Grava os documentos numa sessão própria (para o pool de banco)
+
+    Returns:
+        Metadados dos documentos gravados (sem o XML)
+    """
+    db = SessionLocal()
+    try:
+        gravados, _ = gravar_documentos(db, documentos, origem)
+        db.commit()
+        return [documento_para_dict(documento) for documento in gravados]
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def documento_para_dict(documento):
+    """Metadados do documento (o XML sai apenas em ler_xml)"""
+    duplicatas = [
+        {
+            "numero": dup.numero,
+            "vencimento": dup.vencimento.isoformat() if dup.vencimento else None,
+            "valor": float(dup.valor) if dup.valor is not None else None,
+        }
+        for dup in documento.duplicatas
+    ]
+    dados = {
+        "id": documento.id,
+        "nsu": documento.nsu,
+        "chave": documento.chave,
+        "schema": documento.schema,
+        "tipo_documento": documento.tipo_documento,
+        "origem": documento.origem,
+        "data_emissao": documento.data_emissao.isoformat() if documento.data_emissao else None,
+        "valor_total": float(documento.valor_total) if documento.valor_total is not None else None,
+        "duplicatas": duplicatas,
+        # Primeiro vencimento, usado como data do lançamento na importação
+        "data_vencimento": next((dup["vencimento"] for dup in duplicatas if dup["vencimento"]), None),
+        "recebido_em": documento.recebido_em.isoformat() if documento.recebido_em else None,
+    }
+    for campo in CAMPOS_TEXTO:
+        dados[campo] = getattr(documento, campo)
+    return dados
+
+
+def buscar_por_chave(db, chave):
+    """A nota (NFe ou resumo) com a chave de acesso, ou None"""
+    return db.query(DocumentoNFe).filter(
+        DocumentoNFe.chave == chave, DocumentoNFe.tipo_documento != "Evento"
+    ).first()
+
+
+def ler_xml(db, documento):
+    """XML original do documento, descompactado (None se não houver)"""
+    arquivo = db.get(XmlNFe, documento.id)
+    if arquivo is None:
+        return None
+    return gzip.decompress(arquivo.conteudo).decode("utf-8")
+
+
+def listar_documentos(
+    db,
+    cnpj_emitente=None,
+    emissao_inicio=None,
+    emissao_fim=None,
+    vencimento_inicio=None,
+    vencimento_fim=None,
+    valor_min=None,
+    valor_max=None,
+    tipo=None,
+    desde_nsu=None,
+    limite=100,
+):
+    """Documentos filtrados pelos campos indexados, dos mais recentes para os mais antigos"""
+    consulta = db.query(DocumentoNFe)
+
+    if cnpj_emitente:
+        consulta = consulta.filter(DocumentoNFe.cnpj_emitente == cnpj_emitente)
+    if emissao_inicio:
+        consulta = consulta.filter(DocumentoNFe.data_emissao >= emissao_inicio)
+    if emissao_fim:
+        consulta = consulta.filter(DocumentoNFe.data_emissao <= emissao_fim)
+    if valor_min is not None:
+        consulta = consulta.filter(DocumentoNFe.valor_total >= valor_min)
+    if valor_max is not None:
+        consulta = consulta.filter(DocumentoNFe.valor_total <= valor_max)
+    if tipo:
+        consulta = consulta.filter(DocumentoNFe.tipo_documento == tipo)
+    if desde_nsu:
+        consulta = consulta.filter(DocumentoNFe.nsu > desde_nsu.zfill(15))
+    if vencimento_inicio or vencimento_fim:
+        vencimentos = db.query(DuplicataNFe.documento_id)
+        if vencimento_inicio:
+            vencimentos = vencimentos.filter(DuplicataNFe.vencimento >= vencimento_inicio)
+        if vencimento_fim:
+            vencimentos = vencimentos.filter(DuplicataNFe.vencimento <= vencimento_fim)
+        consulta = consulta.filter(DocumentoNFe.id.in_(vencimentos))
+
+    return consulta.order_by(
+        DocumentoNFe.data_emissao.desc(), DocumentoNFe.id.desc()
+    ).limit(limite).all()
@@ -0,0 +1,141 @@
+"""
+Sistema Financeiro Finco - Executores
+Pools de threads limitados para o trabalho bloqueante das rotas async
+
+As rotas `async def` rodam no event loop: uma chamada bloqueante ali (a
+consulta à SEFAZ com timeout de 60 s, um upload para o S3, um commit no
+SQLite) para todas as outras requisições. Essas rotas entregam o trabalho
+a um dos pools abaixo e aguardam o resultado, e o event loop só multiplexa
+I/O:
+
+- rede: SEFAZ e S3 (espera de rede, muitas threads)
+- cpu: leitura de XML e do certificado (poucas threads)
+- banco: escritas no SQLite (que aceita um escritor por vez)
+
+Cada pool tem um limite de tarefas esperando; com a fila cheia a tarefa é
+recusada com ExecutorSaturado (HTTP 503) em vez de acumular sem limite. As
+métricas (fila, em execução, espera) saem em GET /api/health/executores.
+"""
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Nome -> (threads, tarefas aguardando na fila)
+LIMITES_EXECUTORES = {
+    "rede": (8, 32),
+    "cpu": (2, 16),
+    "banco": (2, 64),
+}
+
+
+class ExecutorSaturado(Exception):
+    """Levantada quando a fila do pool está cheia"""
+
+    def __init__(self, nome):
+        super().__init__(f"Servidor ocupado ({nome}), tente novamente em instantes")
+        self.nome = nome
+
+
+class Executor:
+    """
+    ThreadPoolExecutor com fila limitada e contadores
+
+    Uso:
+        resultado = await executores.rede.executar(funcao, arg1, arg2)
+    """
+
+    def __init__(self, nome, threads, maximo_fila):
+        self.nome = nome
+        self.threads = threads
+        self.maximo_fila = maximo_fila
+        self._pool = ThreadPoolExecutor(max_workers=threads, thread_name_prefix=f"finco-{nome}")
+        self._lock = threading.Lock()
+        self._na_fila = 0
+        self._em_execucao = 0
+        self._concluidas = 0
+        self._erros = 0
+        self._recusadas = 0
+        self._espera_total = 0.0
+        self._espera_maxima = 0.0
+
+    def submeter(self, funcao, *args, **kwargs):
+        """
+        Enfileira `funcao(*args, **kwargs)` e retorna o Future
+
+        Raises:
+            ExecutorSaturado: se já houver `maximo_fila` tarefas esperando
+        """
+        with self._lock:
+            if self._na_fila >= self.maximo_fila:
+                self._recusadas += 1
+                raise ExecutorSaturado(self.nome)
+            self._na_fila += 1
+        enfileirada_em = time.perf_counter()
+
+        def tarefa():
+            espera = time.perf_counter() - enfileirada_em
+            with self._lock:
+                self._na_fila -= 1
+                self._em_execucao += 1
+                self._espera_total += espera
+                self._espera_maxima = max(self._espera_maxima, espera)
+            try:
+                return funcao(*args, **kwargs)
+            except Exception:
+                with self._lock:
+                    self._erros += 1
+                raise
+            finally:
+                with self._lock:
+                    self._em_execucao -= 1
+                    self._concluidas += 1
+
+        return self._pool.submit(tarefa)
+
+    async def executar(self, funcao, *args, **kwargs):
+        """Roda `funcao` no pool e aguarda o resultado sem bloquear o event loop"""
+        return await asyncio.wrap_future(self.submeter(funcao, *args, **kwargs))
+
+    def metricas(self):
+        """Contadores do pool (tempos em milissegundos)"""
+        with self._lock:
+            iniciadas = self._concluidas + self._em_execucao
+            return {
+                "threads": self.threads,
+                "maximo_fila": self.maximo_fila,
+                "na_fila": self._na_fila,
+                "em_execucao": self._em_execucao,
+                "concluidas": self._concluidas,
+                "erros": self._erros,
+                "recusadas": self._recusadas,
+                "espera_media_ms": round(self._espera_total / iniciadas * 1000, 1) if iniciadas else 0.0,
+                "espera_maxima_ms": round(self._espera_maxima * 1000, 1),
+            }
+
+    def encerrar(self):
+        """Descarta as tarefas na fila e libera as threads (desligamento do servidor)"""
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+class Executores:
+    """Os pools nomeados em LIMITES_EXECUTORES, como atributos (executores.rede...)"""
+
+    def __init__(self, limites=LIMITES_EXECUTORES):
+        self._executores = {
+            nome: Executor(nome, threads, maximo_fila)
+            for nome, (threads, maximo_fila) in limites.items()
+        }
+        for nome, executor in self._executores.items():
+            setattr(self, nome, executor)
+
+    def metricas(self):
+        """Métricas de todos os pools, por nome"""
+        return {nome: executor.metricas() for nome, executor in self._executores.items()}
+
+    def encerrar(self):
+        for executor in self._executores.values():
+            executor.encerrar()
+
+
+executores = Executores()
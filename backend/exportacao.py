@@ -0,0 +1,184 @@
+"""
+Sistema Financeiro Finco - Exportação em Fluxo
+Gera listagens de lançamentos linha a linha para StreamingResponse
+
+A consulta roda com yield_per numa conexão própria do gerador (a sessão da
+requisição pode ser fechada antes de a resposta terminar de ser enviada):
+as linhas são lidas do banco em lotes e cada lote é enviado assim que
+formatado, então a memória fica constante e o primeiro byte sai logo,
+mesmo para exportações de vários anos.
+
+O Excel (.xlsx) usa o modo somente escrita do openpyxl: as linhas vão
+direto para o XML da aba num arquivo temporário, e o .xlsx pronto é
+enviado em pedaços. As larguras das colunas são estimadas pelo primeiro
+lote, já que precisam ser gravadas antes da primeira linha.
+"""
+import csv
+import io
+import json
+import tempfile
+from decimal import Decimal
+
+from fastapi.responses import StreamingResponse
+from openpyxl import Workbook
+from openpyxl.utils import get_column_letter
+
+from backend.database import Lancamento
+
+# Colunas exportadas (as mesmas de LancamentoResponse)
+COLUNAS_EXPORTACAO = [
+    Lancamento.id, Lancamento.data, Lancamento.dia, Lancamento.mes, Lancamento.ano,
+    Lancamento.tipo, Lancamento.categoria, Lancamento.classificacao_nome,
+    Lancamento.item, Lancamento.valor, Lancamento.situacao,
+]
+
+NOMES_COLUNAS = [coluna.key for coluna in COLUNAS_EXPORTACAO]
+
+# Linhas lidas do banco (e enviadas) por vez
+LOTE_EXPORTACAO = 1000
+
+# Colunas da planilha exportada: (cabeçalho, coluna)
+COLUNAS_EXCEL = [
+    ("Data", Lancamento.data),
+    ("Tipo", Lancamento.tipo),
+    ("Categoria", Lancamento.categoria),
+    ("Classificação", Lancamento.classificacao_nome),
+    ("Item/Fornecedor", Lancamento.item),
+    ("Valor", Lancamento.valor),
+    ("Situação", Lancamento.situacao),
+]
+
+LARGURA_MAXIMA_EXCEL = 50
+
+# Tamanho dos pedaços do .xlsx enviados ao cliente
+PEDACO_EXCEL = 64 * 1024
+
+MEDIA_TYPE_EXCEL = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+FORMATOS_STREAMING = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+
+def lotes_lancamentos(engine, consulta, lote=LOTE_EXPORTACAO):
+    """
+    Executa `consulta` (select das COLUNAS_EXPORTACAO) e gera as linhas em lotes
+
+    Abre e fecha a própria conexão; a leitura só começa na primeira iteração.
+    """
+    with engine.connect() as conn:
+        resultado = conn.execution_options(yield_per=lote).execute(consulta)
+        for linhas in resultado.partitions():
+            yield linhas
+
+
+def _json_padrao(valor):
+    """Valor como número no JSON (igual à API); datas e demais tipos como texto"""
+    if isinstance(valor, Decimal):
+        return float(valor)
+    return str(valor)
+
+
+def gerar_ndjson(engine, consulta):
+    """Um objeto JSON por linha, com as chaves de LancamentoResponse"""
+    for linhas in lotes_lancamentos(engine, consulta):
+        yield "".join(
+            json.dumps(dict(zip(NOMES_COLUNAS, linha)), default=_json_padrao, ensure_ascii=False) + "\n"
+            for linha in linhas
+        )
+
+
+def gerar_csv(engine, consulta):
+    """CSV com cabeçalho; datas em ISO (AAAA-MM-DD) e valor com ponto decimal"""
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    escritor.writerow(NOMES_COLUNAS)
+    for linhas in lotes_lancamentos(engine, consulta):
+        escritor.writerows(linhas)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    # Consulta vazia: só o cabeçalho
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def linha_excel(linha):
+    """Valores de uma linha (select das COLUNAS_EXCEL) como aparecem na planilha"""
+    data, tipo, categoria, classificacao, item, valor, situacao = linha
+    return [
+        data.strftime("%d/%m/%Y") if data else "",
+        "Entrada" if tipo == "ENTRADA" else "Saída",
+        categoria,
+        classificacao or "",
+        item or "",
+        valor,
+        "Baixado" if situacao == "BAIXADA" else "Não Baixado",
+    ]
+
+
+def larguras_excel(amostra):
+    """Largura de cada coluna pelo maior texto entre o cabeçalho e a amostra (até 50)"""
+    larguras = []
+    for i, (cabecalho, _) in enumerate(COLUNAS_EXCEL):
+        maior = max((len(str(valores[i])) for valores in amostra), default=0)
+        larguras.append(min(max(maior, len(cabecalho)) + 2, LARGURA_MAXIMA_EXCEL))
+    return larguras
+
+
+def gerar_xlsx(engine, consulta, aba="Lançamentos"):
+    """
+    Planilha .xlsx da consulta (select das COLUNAS_EXCEL), em pedaços de bytes
+
+    O .xlsx é um zip, que só fica completo depois da última linha: os bytes
+    saem ao fim da leitura, mas a memória não cresce com o número de linhas.
+    """
+    lotes = lotes_lancamentos(engine, consulta)
+    amostra = [linha_excel(linha) for linha in next(lotes, [])]
+
+    livro = Workbook(write_only=True)
+    planilha = livro.create_sheet(aba)
+    for i, largura in enumerate(larguras_excel(amostra), start=1):
+        planilha.column_dimensions[get_column_letter(i)].width = largura
+
+    planilha.append([nome for nome, _ in COLUNAS_EXCEL])
+
+    for valores in amostra:
+        planilha.append(valores)
+    for linhas in lotes:
+        for linha in linhas:
+            planilha.append(linha_excel(linha))
+
+    with tempfile.TemporaryFile() as arquivo:
+        livro.save(arquivo)
+        arquivo.seek(0)
+        while pedaco := arquivo.read(PEDACO_EXCEL):
+            yield pedaco
+
+
+def resposta_excel(engine, consulta, nome_arquivo):
+    """StreamingResponse do .xlsx da consulta (ver gerar_xlsx)"""
+    return StreamingResponse(
+        gerar_xlsx(engine, consulta),
+        media_type=MEDIA_TYPE_EXCEL,
+        headers={"Content-Disposition": f"attachment; filename={nome_arquivo}"},
+    )
+
+
+GERADORES = {
+    "ndjson": gerar_ndjson,
+    "csv": gerar_csv,
+}
+
+
+def resposta_streaming(engine, consulta, formato, headers=None):
+    """StreamingResponse da consulta no formato pedido (ndjson ou csv)"""
+    headers = dict(headers or {})
+    if formato == "csv":
+        headers["Content-Disposition"] = "attachment; filename=lancamentos.csv"
+    return StreamingResponse(
+        GERADORES[formato](engine, consulta),
+        media_type=FORMATOS_STREAMING[formato],
+        headers=headers,
+    )
@@ -0,0 +1,302 @@
+"""
+Sistema Financeiro Finco - Serviço de Importação de Planilhas
+Executa as importações em segundo plano, com progresso e cancelamento
+
+A rota /api/importar só recebe o conteúdo do arquivo e enfileira um job; a
+leitura do Excel e a escrita no banco rodam numa thread do pool, com sessão própria,
+sem bloquear o event loop. Há um único worker porque o SQLite aceita um
+escritor por vez: jobs enviados juntos esperam na fila.
+"""
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from backend.autocomplete_service import indice_autocomplete
+from backend.classificacoes_service import registro_classificacoes
+from backend.database import SessionLocal, Lancamento
+from backend.planilha import (
+    MESES_ABAS, LeitorPlanilha,
+    extrair_lancamentos, para_registros, inserir_lancamentos,
+    usos_itens, gravar_usos_itens
+)
+from backend.resumos import AtualizadorResumos
+
+# Quantos jobs finalizados ficam disponíveis para consulta
+MAXIMO_JOBS_FINALIZADOS = 50
+
+STATUS_FINALIZADOS = ("concluido", "erro", "cancelado")
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="importacao")
+_jobs = {}
+_jobs_lock = threading.Lock()
+
+
+class ImportacaoCancelada(Exception):
+    """Levantada dentro do job quando o cancelamento é solicitado"""
+
+
+class JobImportacao:
+    """Estado de uma importação enfileirada"""
+
+    def __init__(self, nome_arquivo, modo, ano):
+        self.id = uuid.uuid4().hex
+        self.nome_arquivo = nome_arquivo
+        self.modo = modo
+        self.ano = ano
+        self.status = "pendente"  # pendente, processando, concluido, erro, cancelado
+        self.aba_atual = None
+        self.abas_processadas = 0
+        self.total_abas = len(MESES_ABAS)  # ajustado às abas mensais presentes no arquivo
+        self.linhas_processadas = 0
+        self.lancamentos_novos = 0
+        self.lancamentos_atualizados = 0
+        self.lancamentos_ignorados = 0
+        self.meses_processados = []
+        self.mensagem = None
+        self.criado_em = datetime.now()
+        self.iniciado_em = None
+        self.finalizado_em = None
+        self._cancelar = threading.Event()
+
+    @property
+    def cancelamento_solicitado(self):
+        return self._cancelar.is_set()
+
+    def para_dict(self):
+        return {
+            "job_id": self.id,
+            "arquivo": self.nome_arquivo,
+            "modo": self.modo,
+            "ano": self.ano,
+            "status": self.status,
+            "sucesso": self.status == "concluido",
+            "aba_atual": self.aba_atual,
+            "abas_processadas": self.abas_processadas,
+            "total_abas": self.total_abas,
+            "linhas_processadas": self.linhas_processadas,
+            "lancamentos_novos": self.lancamentos_novos,
+            "lancamentos_atualizados": self.lancamentos_atualizados,
+            "lancamentos_ignorados": self.lancamentos_ignorados,
+            "meses_processados": self.meses_processados,
+            "mensagem": self.mensagem,
+            "criado_em": self.criado_em.isoformat(),
+            "iniciado_em": self.iniciado_em.isoformat() if self.iniciado_em else None,
+            "finalizado_em": self.finalizado_em.isoformat() if self.finalizado_em else None,
+        }
+
+
+# ============== IMPORTAÇÃO ==============
+
+def hashes_existentes(db, ano):
+    """Dicionário hash_conteudo -> id dos lançamentos já gravados no ano (uma consulta)"""
+    return {
+        hash_: id_ for hash_, id_ in
+        db.query(Lancamento.hash_conteudo, Lancamento.id)
+        .filter(Lancamento.ano == ano)
+        .order_by(Lancamento.id.desc())
+    }
+
+
+def importar_lancamentos_mes(db, df, mes_num, ano, modo, resumos, classificacoes, existentes, usos=None):
+    """
+    Importa lançamentos de um mês específico
+
+    Cada linha é classificada como nova, atualizada (merge) ou ignorada
+    pelo hash de conteúdo, contra os hashes do ano carregados uma vez
+    (ver hashes_existentes). O uso dos itens/fornecedores é acrescentado
+    a `usos`, gravado de uma vez no fim da importação (gravar_usos_itens) e
+    aplicado ao autocomplete só depois do commit; sem `usos`, é gravado aqui.
+    """
+    lancamentos = extrair_lancamentos(df, mes_num, ano, classificacoes)
+    if lancamentos is None or lancamentos.empty:
+        return 0, 0, 0
+
+    ids_existentes = lancamentos["hash_conteudo"].map(existentes)
+    novos = para_registros(lancamentos[ids_existentes.isna()])
+    repetidos = lancamentos[ids_existentes.notna()]
+    lancamentos_atualizados = 0
+    lancamentos_ignorados = 0
+
+    if modo == "merge" and not repetidos.empty:
+        ids = [int(id_) for id_ in ids_existentes.dropna().unique()]
+        gravados = {}
+        for i in range(0, len(ids), 500):
+            for l in db.query(Lancamento).filter(Lancamento.id.in_(ids[i:i + 500])):
+                gravados[l.id] = l
+
+        for registro, id_ in zip(para_registros(repetidos), ids_existentes.dropna()):
+            existente = gravados[int(id_)]
+            resumos.remover(existente)
+            existente.categoria = registro["categoria"]
+            existente.classificacao_id = registro["classificacao_id"]
+            existente.classificacao_nome = registro["classificacao_nome"]
+            existente.situacao = registro["situacao"]
+            resumos.adicionar(existente)
+            lancamentos_atualizados += 1
+    else:
+        lancamentos_ignorados = len(repetidos)
+
+    if novos:
+        inserir_lancamentos(db, novos)
+        resumos.adicionar_registros(novos)
+
+    if usos is None:
+        gravar_usos_itens(db, usos_itens(lancamentos))
+    else:
+        usos.extend(usos_itens(lancamentos))
+
+    return len(novos), lancamentos_atualizados, lancamentos_ignorados
+
+
+def _verificar_cancelamento(job):
+    if job.cancelamento_solicitado:
+        raise ImportacaoCancelada()
+
+
+def executar_importacao(job, arquivo):
+    """
+    Roda a importação de um job (na thread do pool)
+
+    A pasta de trabalho é aberta uma única vez (ver LeitorPlanilha) e só as
+    abas mensais presentes são lidas. Tudo acontece numa única transação:
+    cancelamento ou erro desfazem a importação inteira, inclusive a limpeza
+    do modo substituir. Uma aba com erro interrompe o job (a mensagem indica
+    qual), em vez de gravar as demais pela metade.
+    """
+    job.status = "processando"
+    job.iniciado_em = datetime.now()
+    db = SessionLocal()
+    leitor = None
+
+    try:
+        _verificar_cancelamento(job)
+        leitor = LeitorPlanilha(arquivo, job.nome_arquivo)
+        abas = leitor.abas_mensais()
+        job.total_abas = len(abas)
+
+        resumos = AtualizadorResumos(db)
+
+        # Se modo substituir, apagar tudo primeiro
+        if job.modo == "substituir":
+            db.query(Lancamento).filter(Lancamento.ano == job.ano).delete()
+            resumos.descartar_ano(job.ano)
+
+        classificacoes = registro_classificacoes.mapa_ids(db)
+        existentes = hashes_existentes(db, job.ano)
+        usos = []
+
+        # Processar cada aba (mês)
+        for mes_nome in abas:
+            _verificar_cancelamento(job)
+            job.aba_atual = mes_nome
+
+            df = leitor.ler(mes_nome)
+            mes_num = MESES_ABAS.index(mes_nome) + 1
+
+            novos, atualizados, ignorados = importar_lancamentos_mes(
+                db, df, mes_num, job.ano, job.modo, resumos, classificacoes, existentes, usos
+            )
+
+            if novos > 0 or atualizados > 0:
+                job.meses_processados.append(mes_nome)
+
+            job.lancamentos_novos += novos
+            job.lancamentos_atualizados += atualizados
+            job.lancamentos_ignorados += ignorados
+            job.linhas_processadas += novos + atualizados + ignorados
+            job.abas_processadas += 1
+
+        _verificar_cancelamento(job)
+        job.aba_atual = None
+        resumos.aplicar()
+        gravar_usos_itens(db, usos)
+        db.commit()
+        indice_autocomplete.registrar_usos(usos)
+
+        job.status = "concluido"
+        job.mensagem = (
+            f"Importação concluída! {job.lancamentos_novos} novos, "
+            f"{job.lancamentos_atualizados} atualizados, {job.lancamentos_ignorados} ignorados."
+        )
+
+    except ImportacaoCancelada:
+        db.rollback()
+        job.status = "cancelado"
+        job.mensagem = "Importação cancelada; nenhuma alteração foi gravada."
+
+    except Exception as e:
+        db.rollback()
+        job.status = "erro"
+        aba = f" (aba {job.aba_atual})" if job.aba_atual else ""
+        job.mensagem = f"Erro na importação{aba}: {str(e)}; nenhuma alteração foi gravada."
+        print(f"❌ {job.mensagem}")
+
+    finally:
+        db.close()
+        if leitor is not None:
+            leitor.fechar()
+        job.finalizado_em = datetime.now()
+
+
+# ============== FILA DE JOBS ==============
+
+def _descartar_jobs_antigos():
+    """Mantém apenas os MAXIMO_JOBS_FINALIZADOS jobs finalizados mais recentes"""
+    finalizados = sorted(
+        (job for job in _jobs.values() if job.status in STATUS_FINALIZADOS),
+        key=lambda job: job.finalizado_em
+    )
+    for job in finalizados[:-MAXIMO_JOBS_FINALIZADOS]:
+        del _jobs[job.id]
+
+
+def submeter_importacao(arquivo, nome_arquivo, modo, ano):
+    """
+    Enfileira a importação de `arquivo` (caminho ou objeto binário, ex.: BytesIO)
+
+    A extensão de `nome_arquivo` decide o leitor (.xls ou .xlsx).
+
+    Returns:
+        JobImportacao recém-criado (status pendente)
+    """
+    job = JobImportacao(nome_arquivo, modo, ano)
+    with _jobs_lock:
+        _descartar_jobs_antigos()
+        _jobs[job.id] = job
+    _executor.submit(executar_importacao, job, arquivo)
+    return job
+
+
+def obter_job(job_id):
+    """Retorna o job pelo id (None se não existir)"""
+    return _jobs.get(job_id)
+
+
+def listar_jobs():
+    """Jobs conhecidos, do mais recente para o mais antigo"""
+    return sorted(_jobs.values(), key=lambda job: job.criado_em, reverse=True)
+
+
+def cancelar_importacao(job_id):
+    """
+    Solicita o cancelamento de um job
+
+    Um job pendente é cancelado antes de começar; um job em andamento
+    para antes da próxima aba e desfaz o que já foi feito.
+
+    Returns:
+        O job, ou None se não existir
+    """
+    job = _jobs.get(job_id)
+    if job is not None and job.status not in STATUS_FINALIZADOS:
+        job._cancelar.set()
+    return job
+
+
+def encerrar():
+    """Cancela os jobs pendentes e encerra o pool (desligamento do servidor)"""
+    for job in list(_jobs.values()):
+        if job.status not in STATUS_FINALIZADOS:
+            job._cancelar.set()
+    _executor.shutdown(wait=False, cancel_futures=True)
@@ -9,6 +9,14 @@ from backend.database import (
     inicializar_classificacoes, Lancamento, Classificacao,
     ItemFornecedor, SaldoDiario, ResumoMensal, Configuracao
 )
+from backend.classificacoes_service import registro_classificacoes
+from backend.configuracoes_service import cache_configuracoes
+from backend.resumos import reconstruir_saldos_diarios
+from backend.planilha import (
+    LeitorPlanilha,
+    extrair_lancamentos, para_registros, inserir_lancamentos,
+    usos_itens, gravar_usos_itens
+)
 import os
 
 # Mapeamento de meses
@@ -18,194 +26,65 @@ MESES = {
     'SETEMBRO': 9, 'OUTUBRO': 10, 'NOVEMBRO': 11, 'DEZEMBRO': 12
 }
 
-MESES_ABAS = ['JANEIRO', 'FEVEREIRO', 'MARÇO', 'ABRIL', 'MAIO', 'JUNHO',
-              'JULHO', 'AGOSTO', 'SETEMBRO', 'OUTUBRO', 'NOVEMBRO', 'DEZEMBRO']
-
 
-def limpar_valor(valor):
-    """Converte valor para float, tratando casos especiais"""
-    if pd.isna(valor) or valor == '' or valor == 0:
-        return 0.0
-    try:
-        return float(valor)
-    except:
-        return 0.0
+def importar_lancamentos_mes(db, df, mes_num, ano=2025, classificacoes=None, usos=None):
+    """
+    Importa lançamentos de um mês específico
 
+    O uso dos itens/fornecedores é acrescentado a `usos` (gravado depois
+    com gravar_usos_itens) ou, sem `usos`, gravado aqui.
+    """
+    if classificacoes is None:
+        classificacoes = registro_classificacoes.mapa_ids(db)
 
-def limpar_texto(texto):
-    """Limpa texto removendo espaços extras"""
-    if pd.isna(texto) or texto is None:
-        return None
-    return str(texto).strip()
-
+    # Blocos ENTRADA (colunas B-G) e SAÍDA (colunas H-M) a partir do cabeçalho 'DIA'
+    lancamentos = extrair_lancamentos(df, mes_num, ano, classificacoes)
+    if lancamentos is None:
+        print(f"  ⚠️ Cabeçalho não encontrado para mês {mes_num}")
+        return 0
 
-def obter_classificacao_id(db, nome_classificacao):
-    """Obtém o ID da classificação pelo nome"""
-    if not nome_classificacao or pd.isna(nome_classificacao):
-        return None, None
-    
-    nome = limpar_texto(nome_classificacao)
-    classif = db.query(Classificacao).filter(Classificacao.nome == nome).first()
-    
-    if classif:
-        return classif.id, nome
-    return None, nome
+    if lancamentos.empty:
+        return 0
 
+    inserir_lancamentos(db, para_registros(lancamentos))
 
-def registrar_item_fornecedor(db, nome_item, classificacao_id):
-    """Registra item/fornecedor para autocomplete futuro"""
-    if not nome_item or pd.isna(nome_item):
-        return
-    
-    nome = limpar_texto(nome_item).upper()
-    if not nome or nome == '0' or nome == 'NAN':
-        return
-    
-    item_existente = db.query(ItemFornecedor).filter(ItemFornecedor.nome == nome).first()
-    
-    if item_existente:
-        item_existente.vezes_usado += 1
-        item_existente.ultima_vez = datetime.utcnow()
-        if classificacao_id:
-            item_existente.classificacao_id = classificacao_id
+    # Registrar itens para autocomplete
+    if usos is None:
+        gravar_usos_itens(db, usos_itens(lancamentos))
     else:
-        novo_item = ItemFornecedor(
-            nome=nome,
-            classificacao_id=classificacao_id,
-            vezes_usado=1
-        )
-        db.add(novo_item)
-
-
-def importar_lancamentos_mes(db, df, mes_num, ano=2025):
-    """Importa lançamentos de um mês específico"""
-    lancamentos_importados = 0
-    
-    # Encontrar linha de cabeçalho (onde tem 'DIA')
-    header_row = None
-    for idx, row in df.iterrows():
-        if 'DIA' in str(row.values):
-            header_row = idx
-            break
-    
-    if header_row is None:
-        print(f"  ⚠️ Cabeçalho não encontrado para mês {mes_num}")
-        return 0
-    
-    # Processar ENTRADAS (colunas B-G, índices 1-6)
-    # Estrutura: DIA | CATEGORIA | CLASSIFICAÇÃO | ITEM | VALOR | SITUAÇÃO
-    for idx in range(header_row + 1, len(df)):
-        row = df.iloc[idx]
-        
-        # Verificar se há entrada (coluna E - VALOR de entrada)
-        valor_entrada = limpar_valor(row.iloc[5]) if len(row) > 5 else 0
-        
-        if valor_entrada > 0:
-            dia = int(row.iloc[1]) if not pd.isna(row.iloc[1]) else None
-            
-            # Se não tem dia, pegar o último dia válido
-            if dia is None:
-                continue
-                
-            categoria = limpar_texto(row.iloc[2]) or "OPERACIONAL"
-            classificacao_nome = limpar_texto(row.iloc[3])
-            item = limpar_texto(row.iloc[4])
-            situacao = limpar_texto(row.iloc[6]) or "BAIXADA"
-            
-            classif_id, classif_nome = obter_classificacao_id(db, classificacao_nome)
-            
-            # Registrar item para autocomplete
-            registrar_item_fornecedor(db, item, classif_id)
-            
-            lancamento = Lancamento(
-                data=date(ano, mes_num, dia),
-                dia=dia,
-                mes=mes_num,
-                ano=ano,
-                tipo="ENTRADA",
-                categoria=categoria,
-                classificacao_id=classif_id,
-                classificacao_nome=classif_nome,
-                item=item,
-                valor=valor_entrada,
-                situacao=situacao.replace(" ", "_").upper() if situacao else "BAIXADA"
-            )
-            db.add(lancamento)
-            lancamentos_importados += 1
-        
-        # Verificar se há saída (colunas H-M, índices 7-12)
-        # Estrutura: DIA | CATEGORIA | CLASSIFICAÇÃO | ITEM | VALOR | SITUAÇÃO
-        if len(row) > 11:
-            valor_saida = limpar_valor(row.iloc[11]) if len(row) > 11 else 0
-            
-            if valor_saida > 0:
-                dia_saida = row.iloc[7] if not pd.isna(row.iloc[7]) else None
-                
-                if dia_saida is not None:
-                    try:
-                        dia_saida = int(dia_saida)
-                    except:
-                        continue
-                    
-                    categoria_saida = limpar_texto(row.iloc[8]) or "OPERACIONAL"
-                    classificacao_saida = limpar_texto(row.iloc[9])
-                    item_saida = limpar_texto(row.iloc[10])
-                    situacao_saida = limpar_texto(row.iloc[12]) if len(row) > 12 else "BAIXADA"
-                    
-                    classif_id_saida, classif_nome_saida = obter_classificacao_id(db, classificacao_saida)
-                    
-                    # Registrar item para autocomplete
-                    registrar_item_fornecedor(db, item_saida, classif_id_saida)
-                    
-                    lancamento_saida = Lancamento(
-                        data=date(ano, mes_num, dia_saida),
-                        dia=dia_saida,
-                        mes=mes_num,
-                        ano=ano,
-                        tipo="SAIDA",
-                        categoria=categoria_saida,
-                        classificacao_id=classif_id_saida,
-                        classificacao_nome=classif_nome_saida,
-                        item=item_saida,
-                        valor=valor_saida,
-                        situacao=situacao_saida.replace(" ", "_").upper() if situacao_saida else "BAIXADA"
-                    )
-                    db.add(lancamento_saida)
-                    lancamentos_importados += 1
-    
-    return lancamentos_importados
+        usos.extend(usos_itens(lancamentos))
+    return len(lancamentos)
 
 
 def importar_configuracoes_miller_orr(db, df_cabecalho):
     """Importa configurações do Miller-Orr da planilha FLUXO DE CAIXA"""
+    # (chave, rótulos que a identificam na planilha)
+    rotulos = [
+        ("miller_orr_minimo", ("MÍNIMO", "MINIMO")),
+        ("miller_orr_retorno", ("RETORNO",)),
+        ("miller_orr_maximo", ("MÁXIMO", "MAXIMO")),
+    ]
     try:
+        # As três configurações numa única consulta
+        configs = {
+            config.chave: config for config in
+            db.query(Configuracao).filter(Configuracao.chave.in_([chave for chave, _ in rotulos]))
+        }
+        
         # Procurar valores na planilha de cabeçalho
         for idx, row in df_cabecalho.iterrows():
             for col_idx, cell in enumerate(row):
                 cell_str = str(cell).strip().upper()
                 
-                if 'MÍNIMO' in cell_str or 'MINIMO' in cell_str:
-                    valor = df_cabecalho.iloc[idx, col_idx + 1] if col_idx + 1 < len(row) else None
-                    if valor and not pd.isna(valor):
-                        config = db.query(Configuracao).filter(Configuracao.chave == "miller_orr_minimo").first()
-                        if config:
-                            config.valor = str(int(float(valor)))
-                
-                if 'RETORNO' in cell_str:
-                    valor = df_cabecalho.iloc[idx, col_idx + 1] if col_idx + 1 < len(row) else None
-                    if valor and not pd.isna(valor):
-                        config = db.query(Configuracao).filter(Configuracao.chave == "miller_orr_retorno").first()
-                        if config:
-                            config.valor = str(int(float(valor)))
-                
-                if 'MÁXIMO' in cell_str or 'MAXIMO' in cell_str:
+                for chave, textos in rotulos:
+                    if not any(texto in cell_str for texto in textos):
+                        continue
                     valor = df_cabecalho.iloc[idx, col_idx + 1] if col_idx + 1 < len(row) else None
-                    if valor and not pd.isna(valor):
-                        config = db.query(Configuracao).filter(Configuracao.chave == "miller_orr_maximo").first()
-                        if config:
-                            config.valor = str(int(float(valor)))
+                    if valor and not pd.isna(valor) and chave in configs:
+                        configs[chave].valor = str(int(float(valor)))
         
         db.commit()
+        cache_configuracoes.invalidar()
         print("  ✅ Configurações Miller-Orr importadas")
     except Exception as e:
         print(f"  ⚠️ Erro ao importar Miller-Orr: {e}")
@@ -215,6 +94,10 @@ def calcular_resumos_mensais(db, ano=2025):
     """Calcula e salva resumos mensais baseado nos lançamentos"""
     print("\n📊 Calculando resumos mensais...")
     
+    # Saldo final do último mês calculado (o resumo recém-criado não é
+    # visível à consulta antes do flush, com autoflush=False)
+    saldo_anterior = 0
+    
     for mes in range(1, 13):
         # Buscar lançamentos do mês
         lancamentos = db.query(Lancamento).filter(
@@ -250,16 +133,9 @@ def calcular_resumos_mensais(db, ano=2025):
                       if l.tipo == "SAIDA" and l.classificacao_rel and l.classificacao_rel.tipo == "IMPOSTO")
         
         # Saldo inicial (do mês anterior)
-        saldo_inicial = 0
-        if mes > 1:
-            resumo_anterior = db.query(ResumoMensal).filter(
-                ResumoMensal.mes == mes - 1,
-                ResumoMensal.ano == ano
-            ).first()
-            if resumo_anterior:
-                saldo_inicial = resumo_anterior.saldo_final
-        
+        saldo_inicial = saldo_anterior
         saldo_final = saldo_inicial + total_entradas - total_saidas
+        saldo_anterior = saldo_final
         
         # Salvar ou atualizar
         resumo = db.query(ResumoMensal).filter(
@@ -295,19 +171,21 @@ def importar_planilha_controle(caminho_arquivo, db, ano=2025):
     print(f"\n📥 Importando: {caminho_arquivo}")
     
     try:
-        xlsx = pd.ExcelFile(caminho_arquivo)
         total_importados = 0
+        classificacoes = registro_classificacoes.mapa_ids(db)
+        usos = []
         
-        for mes_nome in MESES_ABAS:
-            if mes_nome in xlsx.sheet_names:
+        with LeitorPlanilha(caminho_arquivo, caminho_arquivo) as leitor:
+            for mes_nome in leitor.abas_mensais():
                 print(f"  📅 Processando {mes_nome}...")
-                df = pd.read_excel(xlsx, sheet_name=mes_nome, header=None)
+                df = leitor.ler(mes_nome)
                 mes_num = MESES[mes_nome]
                 
-                importados = importar_lancamentos_mes(db, df, mes_num, ano)
+                importados = importar_lancamentos_mes(db, df, mes_num, ano, classificacoes, usos)
                 total_importados += importados
                 print(f"     ✅ {importados} lançamentos importados")
         
+        gravar_usos_itens(db, usos)
         db.commit()
         print(f"\n✅ Total importado da planilha Controle: {total_importados} lançamentos")
         return total_importados
@@ -365,6 +243,11 @@ def executar_importacao_completa(caminho_controle, caminho_fluxo):
         # Calcular resumos
         calcular_resumos_mensais(db)
         
+        # Saldos diários do fluxo de caixa
+        reconstruir_saldos_diarios(db, 2025)
+        db.commit()
+        print("  ✅ Saldos diários calculados!")
+        
         # Estatísticas finais
         print("\n" + "=" * 60)
         print("📊 ESTATÍSTICAS DA IMPORTAÇÃO")
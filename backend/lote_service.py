@@ -0,0 +1,219 @@
+"""
+Sistema Financeiro Finco - Operações em Lote nos Lançamentos
+Cria, atualiza, exclui e baixa vários lançamentos numa única transação
+
+As rotas /api/lancamentos/lote* recebem listas de operações. Os lançamentos
+envolvidos são lidos em consultas de até 500 ids, as escritas saem em
+comandos de várias linhas (INSERT com RETURNING, UPDATE por chave primária,
+DELETE ... IN) e os resumos mensais e saldos diários são atualizados uma
+única vez no fim do lote. Cada operação tem o seu resultado: ids que não
+existem viram erro daquela operação, sem desfazer as demais.
+"""
+from datetime import datetime
+from types import SimpleNamespace
+
+from sqlalchemy import delete, select, update
+
+from backend.autocomplete_service import indice_autocomplete
+from backend.classificacoes_service import registro_classificacoes
+from backend.database import Lancamento, calcular_hash_conteudo
+from backend.planilha import inserir_lancamentos, gravar_usos_itens
+from backend.resumos import AtualizadorResumos
+
+# Maior número de operações aceito por requisição
+MAXIMO_LOTE = 1000
+
+# Ids por consulta (limite de parâmetros do SQLite)
+IDS_POR_CONSULTA = 500
+
+# Colunas lidas e regravadas nas atualizações
+COLUNAS_LOTE = [
+    "id", "data", "dia", "mes", "ano", "tipo", "categoria",
+    "classificacao_id", "classificacao_nome", "item", "valor", "situacao",
+]
+
+
+def _resultado(indice, id_, erro=None):
+    if erro:
+        return {"indice": indice, "id": id_, "sucesso": False, "erro": erro}
+    return {"indice": indice, "id": id_, "sucesso": True}
+
+
+class LoteLancamentos:
+    """
+    Acumula as operações de uma requisição e grava tudo num commit
+
+    Uso:
+        lote = LoteLancamentos(db)
+        resultados = lote.baixar(ids)
+        lote.concluir()
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self.resumos = AtualizadorResumos(db)
+        self.usos = []
+
+    def _carregar(self, ids):
+        """Dicionário id -> dict com as COLUNAS_LOTE dos lançamentos existentes"""
+        colunas = [getattr(Lancamento, coluna) for coluna in COLUNAS_LOTE]
+        ids = list(dict.fromkeys(ids))
+        linhas = {}
+        for i in range(0, len(ids), IDS_POR_CONSULTA):
+            consulta = select(*colunas).where(Lancamento.id.in_(ids[i:i + IDS_POR_CONSULTA]))
+            for linha in self.db.execute(consulta):
+                linhas[linha.id] = dict(linha._mapping)
+        return linhas
+
+    def criar(self, lancamentos):
+        """
+        Insere os lançamentos (dicts no formato de LancamentoCreate)
+
+        Returns:
+            Lista de resultados {indice, id, sucesso}, na ordem recebida
+        """
+        registros = []
+        for dados in lancamentos:
+            classificacao_id = registro_classificacoes.id_por_nome(self.db, dados["classificacao_nome"])
+            data = dados["data"]
+            registros.append({
+                "data": data,
+                "dia": data.day,
+                "mes": data.month,
+                "ano": data.year,
+                "tipo": dados["tipo"],
+                "categoria": dados["categoria"],
+                "classificacao_id": classificacao_id,
+                "classificacao_nome": dados["classificacao_nome"],
+                "item": dados["item"],
+                "valor": dados["valor"],
+                "situacao": dados["situacao"],
+                "hash_conteudo": calcular_hash_conteudo(data, dados["tipo"], dados["item"], dados["valor"]),
+            })
+            if dados["item"]:
+                self.usos.append((dados["item"].upper(), 1, classificacao_id))
+
+        ids = inserir_lancamentos(self.db, registros)
+        self.resumos.adicionar_registros(registros)
+        return [_resultado(indice, id_) for indice, id_ in enumerate(ids)]
+
+    def atualizar(self, alteracoes):
+        """
+        Aplica alterações parciais (dicts com id + campos de LancamentoUpdate),
+        com as mesmas regras de PUT /api/lancamentos/{id}
+
+        Várias alterações do mesmo id são aplicadas em ordem.
+        """
+        atuais = self._carregar([alteracao["id"] for alteracao in alteracoes])
+        resultados = []
+        alterados = {}
+        for indice, dados in enumerate(alteracoes):
+            lancamento = atuais.get(dados["id"])
+            if lancamento is None:
+                resultados.append(_resultado(indice, dados["id"], "Lançamento não encontrado"))
+                continue
+
+            self.resumos.remover(SimpleNamespace(**lancamento))
+            if dados.get("data"):
+                lancamento["data"] = dados["data"]
+                lancamento["dia"] = dados["data"].day
+                lancamento["mes"] = dados["data"].month
+                lancamento["ano"] = dados["data"].year
+            for campo in ("tipo", "categoria", "situacao"):
+                if dados.get(campo):
+                    lancamento[campo] = dados[campo]
+            if dados.get("classificacao_nome"):
+                lancamento["classificacao_nome"] = dados["classificacao_nome"]
+                lancamento["classificacao_id"] = registro_classificacoes.id_por_nome(
+                    self.db, dados["classificacao_nome"]
+                )
+            for campo in ("item", "valor"):
+                if dados.get(campo) is not None:
+                    lancamento[campo] = dados[campo]
+            self.resumos.adicionar(SimpleNamespace(**lancamento))
+
+            alterados[lancamento["id"]] = lancamento
+            resultados.append(_resultado(indice, lancamento["id"]))
+
+        if alterados:
+            agora = datetime.utcnow()
+            self.db.execute(update(Lancamento), [
+                {
+                    **lancamento,
+                    "hash_conteudo": calcular_hash_conteudo(
+                        lancamento["data"], lancamento["tipo"], lancamento["item"], lancamento["valor"]
+                    ),
+                    "atualizado_em": agora,
+                }
+                for lancamento in alterados.values()
+            ])
+        return resultados
+
+    def excluir(self, ids):
+        """Exclui os lançamentos; ids repetidos contam uma vez"""
+        atuais = self._carregar(ids)
+        resultados = []
+        excluidos = set()
+        for indice, id_ in enumerate(ids):
+            if id_ not in atuais or id_ in excluidos:
+                resultados.append(_resultado(indice, id_, "Lançamento não encontrado"))
+                continue
+            self.resumos.remover(SimpleNamespace(**atuais[id_]))
+            excluidos.add(id_)
+            resultados.append(_resultado(indice, id_))
+
+        excluidos = list(excluidos)
+        for i in range(0, len(excluidos), IDS_POR_CONSULTA):
+            self.db.execute(delete(Lancamento).where(Lancamento.id.in_(excluidos[i:i + IDS_POR_CONSULTA])))
+        return resultados
+
+    def baixar(self, ids, situacao=None):
+        """
+        Define a situação dos lançamentos (BAIXADA ou NAO_BAIXADA); sem
+        `situacao`, alterna cada um como PATCH /api/lancamentos/{id}/baixar
+        """
+        atuais = self._carregar(ids)
+        resultados = []
+        for indice, id_ in enumerate(ids):
+            lancamento = atuais.get(id_)
+            if lancamento is None:
+                resultados.append(_resultado(indice, id_, "Lançamento não encontrado"))
+                continue
+            self.resumos.remover(SimpleNamespace(**lancamento))
+            if situacao:
+                lancamento["situacao"] = situacao
+            else:
+                lancamento["situacao"] = "NAO_BAIXADA" if lancamento["situacao"] == "BAIXADA" else "BAIXADA"
+            self.resumos.adicionar(SimpleNamespace(**lancamento))
+            resultados.append({**_resultado(indice, id_), "situacao": lancamento["situacao"]})
+
+        # Um UPDATE ... IN por situação final
+        por_situacao = {}
+        for lancamento in atuais.values():
+            por_situacao.setdefault(lancamento["situacao"], []).append(lancamento["id"])
+        agora = datetime.utcnow()
+        for nova_situacao, ids_situacao in por_situacao.items():
+            for i in range(0, len(ids_situacao), IDS_POR_CONSULTA):
+                self.db.execute(
+                    update(Lancamento)
+                    .where(Lancamento.id.in_(ids_situacao[i:i + IDS_POR_CONSULTA]))
+                    .values(situacao=nova_situacao, atualizado_em=agora)
+                )
+        return resultados
+
+    def concluir(self):
+        """Aplica os resumos, grava o uso dos itens e faz o commit do lote"""
+        self.resumos.aplicar()
+        gravar_usos_itens(self.db, self.usos)
+        self.db.commit()
+        indice_autocomplete.registrar_usos(self.usos)
+
+
+def resumo_resultados(resultados):
+    """Corpo da resposta das rotas de lote"""
+    erros = sum(1 for resultado in resultados if not resultado["sucesso"])
+    return {
+        "processados": len(resultados) - erros,
+        "erros": erros,
+        "resultados": resultados,
+    }
@@ -2,23 +2,47 @@
 Sistema Financeiro Finco - Backend FastAPI
 API completa para gerenciamento financeiro
 """
-from fastapi import FastAPI, Depends, HTTPException, Query, UploadFile, File, Form
+from fastapi import FastAPI, Depends, HTTPException, Query, UploadFile, File, Form, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from fastapi.staticfiles import StaticFiles
 from sqlalchemy.orm import Session
-from sqlalchemy import func, and_, extract
-from pydantic import BaseModel
-from typing import Optional, List
+from sqlalchemy import func, and_, case, extract, tuple_
+from pydantic import BaseModel, PlainSerializer
+from typing import Annotated, Optional, List
 from datetime import date, datetime
+from decimal import Decimal
 from backend.database import (
     get_db, criar_tabelas, inicializar_configuracoes, inicializar_classificacoes,
-    Lancamento, Classificacao, ItemFornecedor, SaldoDiario, ResumoMensal, 
+    Lancamento, Classificacao, SaldoDiario, ResumoMensal, 
     Configuracao, Usuario, SessionLocal
 )
+from backend.resumos import AtualizadorResumos
+from backend.autocomplete_service import indice_autocomplete
+from backend.classificacoes_service import registro_classificacoes
+from backend.configuracoes_service import cache_configuracoes, converter_configuracao
+from backend.busca_texto import filtro_item, buscar_lancamentos
+from backend.planilha import gravar_usos_itens
+from backend.lote_service import LoteLancamentos, MAXIMO_LOTE, resumo_resultados
+from backend.exportacao import (
+    COLUNAS_EXPORTACAO, COLUNAS_EXCEL, FORMATOS_STREAMING, resposta_excel, resposta_streaming
+)
+from backend.importacao_service import (
+    submeter_importacao, obter_job, listar_jobs, cancelar_importacao,
+    encerrar as encerrar_fila_importacao
+)
+from backend.documentos_nfe import (
+    guardar_documentos, documento_para_dict, listar_documentos, buscar_por_chave, ler_xml
+)
+from backend.sincronizacao_nfe_service import (
+    iniciar_sincronizacao, status_sincronizacao, cancelar_sincronizacao,
+    segundos_ate_proxima_sincronizacao, INTERVALO_SEFAZ, encerrar as encerrar_sincronizacao_nfe
+)
+from backend.executores_service import executores, ExecutorSaturado
+import base64
+import calendar
 import hashlib
-import pandas as pd
-import tempfile
-import shutil
+import io
 import secrets
 import os
 
@@ -32,6 +56,9 @@ try:
 except ImportError:
     BACKUP_ENABLED = False
 
+# Sincronização de NFe em segundo plano (desativar com NFE_SINCRONIZACAO_AUTOMATICA=false)
+SINCRONIZACAO_NFE_AUTOMATICA = os.getenv("NFE_SINCRONIZACAO_AUTOMATICA", "true").lower() == "true"
+
 
 # ============== APP ==============
 app = FastAPI(
@@ -47,6 +74,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Total-Count"],
 )
 
 # Servir arquivos estáticos do frontend
@@ -57,13 +85,19 @@ if os.path.exists(FRONTEND_DIR):
     app.mount("/assets", StaticFiles(directory=os.path.join(FRONTEND_DIR, "assets")), name="assets")
 
 
+@app.exception_handler(ExecutorSaturado)
+async def executor_saturado(request, exc):
+    """Fila de um pool de executores cheia: o cliente deve tentar de novo"""
+    return JSONResponse(status_code=503, content={"detail": str(exc)})
+
+
 # ============== STARTUP EVENT ==============
 @app.on_event("startup")
 async def startup_event():
     """Restaura backup automaticamente se banco não existir"""
     if BACKUP_ENABLED:
         print("🔄 Verificando backup S3...")
-        result = auto_restore_on_startup()
+        result = await executores.rede.executar(auto_restore_on_startup)
         if result.get("success"):
             if "restored_size" in result:
                 print(f"✅ Banco restaurado do S3: {result['restored_size']} bytes")
@@ -80,6 +114,8 @@ async def startup_event():
     try:
         inicializar_configuracoes(db)
         inicializar_classificacoes(db)
+        cache_configuracoes.carregar(db)
+        registro_classificacoes.carregar(db)
     finally:
         db.close()
     
@@ -94,6 +130,12 @@ async def startup_event():
         asyncio.create_task(backup_periodico())
         print("⏰ Backup automático ativado (a cada 1 hora)")
     
+    # Sincronização automática de NFe, se o certificado estiver configurado
+    if SINCRONIZACAO_NFE_AUTOMATICA:
+        import asyncio
+        
+        asyncio.create_task(sincronizacao_nfe_periodica())
+    
     print("✅ Sistema Financeiro Finco iniciado!")
 
 
@@ -105,7 +147,7 @@ async def backup_inicial():
     
     try:
         print("💾 Realizando backup inicial...")
-        result = backup_to_s3()
+        result = await executores.rede.executar(backup_to_s3)
         
         if result.get("success"):
             print(f"✅ Backup inicial realizado: {result.get('s3_key')}")
@@ -125,13 +167,13 @@ async def backup_periodico():
         
         try:
             print("⏰ Iniciando backup automático...")
-            result = backup_to_s3()
+            result = await executores.rede.executar(backup_to_s3)
             
             if result.get("success"):
                 print(f"✅ Backup automático realizado: {result.get('s3_key')}")
                 
                 # Limpar backups antigos, mantendo apenas 1
-                cleanup_result = cleanup_old_backups(keep_count=1)
+                cleanup_result = await executores.rede.executar(cleanup_old_backups, keep_count=1)
                 if cleanup_result.get("success"):
                     print(f"🗑️ Backups antigos removidos: {cleanup_result.get('deleted', 0)}")
             else:
@@ -141,14 +183,48 @@ async def backup_periodico():
             print(f"❌ Erro no backup automático: {e}")
 
 
+async def sincronizacao_nfe_periodica():
+    """Sincroniza as NFe sempre que a SEFAZ libera uma nova consulta"""
+    import asyncio
+    from backend.sefaz_service import SefazService
+    
+    status = await executores.cpu.executar(lambda: SefazService().get_status())
+    if not (status["certificado_configurado"] and status["senha_configurada"]):
+        return
+    print("⏰ Sincronização automática de NFe ativada")
+    
+    await asyncio.sleep(60)  # Aguardar 1 minuto para o sistema estabilizar
+    
+    while True:
+        try:
+            espera = await executores.banco.executar(segundos_ate_proxima_sincronizacao)
+            if espera <= 0:
+                iniciar_sincronizacao()
+                espera = 60
+        except Exception as e:
+            print(f"⚠️ Erro na sincronização automática de NFe: {e}")
+            espera = INTERVALO_SEFAZ.total_seconds()
+        
+        await asyncio.sleep(espera)
+
+
 # ============== SCHEMAS ==============
+# Dinheiro: Decimal na API (gravado em centavos, ver database.Centavos),
+# enviado no JSON como número
+Dinheiro = Annotated[Decimal, PlainSerializer(float, return_type=float, when_used="json")]
+
+# Zero com 2 casas, como os valores lidos do banco: somas sem lançamentos
+# saem no JSON como 0.0 (Decimal("0") sairia como inteiro)
+ZERO_REAIS = Decimal("0.00")
+
+
 class LancamentoCreate(BaseModel):
     data: date
     tipo: str  # ENTRADA ou SAIDA
     categoria: str  # OPERACIONAL, FINANCEIRO, INVESTIMENTO
     classificacao_nome: str
     item: Optional[str] = None
-    valor: float
+    valor: Dinheiro
     situacao: str = "BAIXADA"
 
 
@@ -158,10 +234,31 @@ class LancamentoUpdate(BaseModel):
     categoria: Optional[str] = None
     classificacao_nome: Optional[str] = None
     item: Optional[str] = None
-    valor: Optional[float] = None
+    valor: Optional[Dinheiro] = None
     situacao: Optional[str] = None
 
 
+class LancamentoLoteUpdate(LancamentoUpdate):
+    id: int
+
+
+class LoteCriar(BaseModel):
+    lancamentos: List[LancamentoCreate]
+
+
+class LoteAtualizar(BaseModel):
+    lancamentos: List[LancamentoLoteUpdate]
+
+
+class LoteIds(BaseModel):
+    ids: List[int]
+
+
+class LoteBaixar(BaseModel):
+    ids: List[int]
+    situacao: Optional[str] = None  # BAIXADA, NAO_BAIXADA ou None para alternar
+
+
 class LancamentoResponse(BaseModel):
     id: int
     data: date
@@ -172,7 +269,7 @@ class LancamentoResponse(BaseModel):
     categoria: str
     classificacao_nome: Optional[str]
     item: Optional[str]
-    valor: float
+    valor: Dinheiro
     situacao: str
     
     class Config:
@@ -184,16 +281,16 @@ class ConfiguracaoUpdate(BaseModel):
 
 
 class DashboardResponse(BaseModel):
-    saldo_atual: float
+    saldo_atual: Dinheiro
     miller_orr_status: str  # BAIXO, NORMAL, ALTO
     miller_orr_minimo: float
     miller_orr_retorno: float
     miller_orr_maximo: float
-    entradas_mes: float
-    saidas_mes: float
-    resultado_mes: float
-    entradas_dia: float
-    saidas_dia: float
+    entradas_mes: Dinheiro
+    saidas_mes: Dinheiro
+    resultado_mes: Dinheiro
+    entradas_dia: Dinheiro
+    saidas_dia: Dinheiro
 
 
 # ============== INICIALIZAÇÃO ==============
@@ -300,25 +397,41 @@ def get_dashboard(db: Session = Depends(get_db)):
     mes_atual = hoje.month
     ano_atual = hoje.year
     
-    # Buscar configurações Miller-Orr
-    config_min = db.query(Configuracao).filter(Configuracao.chave == "miller_orr_minimo").first()
-    config_ret = db.query(Configuracao).filter(Configuracao.chave == "miller_orr_retorno").first()
-    config_max = db.query(Configuracao).filter(Configuracao.chave == "miller_orr_maximo").first()
+    # Configurações Miller-Orr (cache em memória, ver configuracoes_service)
+    configs = cache_configuracoes.obter(db)
+    miller_min = configs.miller_orr_minimo
+    miller_ret = configs.miller_orr_retorno
+    miller_max = configs.miller_orr_maximo
     
-    miller_min = float(config_min.valor) if config_min else 55000
-    miller_ret = float(config_ret.valor) if config_ret else 100000
-    miller_max = float(config_max.valor) if config_max else 355000
+    # Todos os totais em uma única varredura (SUM CASE por tipo/situação/mês/dia)
+    def soma_se(condicao):
+        return func.coalesce(func.sum(case((condicao, Lancamento.valor), else_=0)), 0)
     
-    # Calcular saldo atual (soma de todas entradas - soma de todas saídas BAIXADAS)
-    total_entradas = db.query(func.sum(Lancamento.valor)).filter(
-        Lancamento.tipo == "ENTRADA",
-        Lancamento.situacao == "BAIXADA"
-    ).scalar() or 0
-    
-    total_saidas = db.query(func.sum(Lancamento.valor)).filter(
-        Lancamento.tipo == "SAIDA",
-        Lancamento.situacao == "BAIXADA"
-    ).scalar() or 0
+    entrada = Lancamento.tipo == "ENTRADA"
+    saida = Lancamento.tipo == "SAIDA"
+    baixada = Lancamento.situacao == "BAIXADA"
+    do_mes = and_(
+        Lancamento.mes == mes_atual,
+        Lancamento.ano == ano_atual,
+        Lancamento.situacao != "OBSOLETO"
+    )
+    do_dia = and_(Lancamento.data == hoje, baixada)
+    
+    (
+        total_entradas, total_saidas,
+        entradas_mes, saidas_mes,
+        entradas_dia, saidas_dia
+    ) = db.query(
+        # Saldo atual (soma de todas entradas - soma de todas saídas BAIXADAS)
+        soma_se(and_(entrada, baixada)),
+        soma_se(and_(saida, baixada)),
+        # Entradas e saídas do mês atual (excluindo OBSOLETO)
+        soma_se(and_(entrada, do_mes)),
+        soma_se(and_(saida, do_mes)),
+        # Entradas e saídas do dia (apenas BAIXADAS)
+        soma_se(and_(entrada, do_dia)),
+        soma_se(and_(saida, do_dia))
+    ).one()
     
     saldo_atual = total_entradas - total_saidas
     
@@ -330,34 +443,6 @@ def get_dashboard(db: Session = Depends(get_db)):
     else:
         miller_status = "NORMAL"
     
-    # Entradas e saídas do mês atual (excluindo OBSOLETO)
-    entradas_mes = db.query(func.sum(Lancamento.valor)).filter(
-        Lancamento.tipo == "ENTRADA",
-        Lancamento.mes == mes_atual,
-        Lancamento.ano == ano_atual,
-        Lancamento.situacao != "OBSOLETO"
-    ).scalar() or 0
-    
-    saidas_mes = db.query(func.sum(Lancamento.valor)).filter(
-        Lancamento.tipo == "SAIDA",
-        Lancamento.mes == mes_atual,
-        Lancamento.ano == ano_atual,
-        Lancamento.situacao != "OBSOLETO"
-    ).scalar() or 0
-    
-    # Entradas e saídas do dia (apenas BAIXADAS)
-    entradas_dia = db.query(func.sum(Lancamento.valor)).filter(
-        Lancamento.tipo == "ENTRADA",
-        Lancamento.data == hoje,
-        Lancamento.situacao == "BAIXADA"
-    ).scalar() or 0
-    
-    saidas_dia = db.query(func.sum(Lancamento.valor)).filter(
-        Lancamento.tipo == "SAIDA",
-        Lancamento.data == hoje,
-        Lancamento.situacao == "BAIXADA"
-    ).scalar() or 0
-    
     return DashboardResponse(
         saldo_atual=saldo_atual,
         miller_orr_status=miller_status,
@@ -407,9 +492,330 @@ def get_top_despesas(mes: int = None, ano: int = 2025, limite: int = 10, db: Ses
     return [{"classificacao": r[0] or "Sem classificação", "valor": r[1]} for r in resultado]
 
 
+# ============== ROTAS - AGREGADOS ==============
+def filtrar_agregados(
+    query,
+    ano: Optional[int] = None,
+    mes: Optional[int] = None,
+    tipo: Optional[str] = None,
+    categoria: Optional[str] = None,
+    situacao: Optional[str] = None,
+    data_inicio: Optional[date] = None,
+    data_fim: Optional[date] = None,
+    incluir_obsoletos: bool = False
+):
+    """Aplica os filtros comuns dos endpoints de agregados"""
+    if ano:
+        query = query.filter(Lancamento.ano == ano)
+    if mes:
+        query = query.filter(Lancamento.mes == mes)
+    if tipo:
+        query = query.filter(Lancamento.tipo == tipo)
+    if categoria:
+        query = query.filter(Lancamento.categoria == categoria)
+    if situacao:
+        query = query.filter(Lancamento.situacao == situacao)
+    elif not incluir_obsoletos:
+        query = query.filter(Lancamento.situacao != "OBSOLETO")
+    if data_inicio:
+        query = query.filter(Lancamento.data >= data_inicio)
+    if data_fim:
+        query = query.filter(Lancamento.data <= data_fim)
+    return query
+
+
+def agrupar_lancamentos(db: Session, coluna, limite: Optional[int] = None, apenas_com_item: bool = False, **filtros):
+    """
+    Agrupa lançamentos por uma coluna somando os valores no SQLite
+
+    Retorna (total_geral, linhas) onde cada linha é (chave, total, quantidade).
+    O total geral considera todos os grupos, mesmo quando há limite.
+    """
+    total = func.sum(Lancamento.valor)
+    query = db.query(
+        coluna.label("chave"),
+        total.label("total"),
+        func.count(Lancamento.id).label("quantidade"),
+        func.sum(total).over().label("total_geral")
+    )
+    if apenas_com_item:
+        query = query.filter(Lancamento.item.isnot(None), Lancamento.item != "")
+    query = filtrar_agregados(query, **filtros).group_by(coluna).order_by(total.desc())
+    if limite:
+        query = query.limit(limite)
+
+    linhas = query.all()
+    total_geral = linhas[0].total_geral if linhas else None
+    return total_geral or ZERO_REAIS, [(l.chave, l.total or ZERO_REAIS, l.quantidade) for l in linhas]
+
+
+@app.get("/api/agregados/mensal")
+def agregados_mensal(
+    ano: int = 2025,
+    categoria: Optional[str] = None,
+    situacao: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """Totais de entradas e saídas por mês do ano"""
+    query = db.query(
+        Lancamento.mes,
+        Lancamento.tipo,
+        func.sum(Lancamento.valor),
+        func.count(Lancamento.id)
+    )
+    query = filtrar_agregados(query, ano=ano, categoria=categoria, situacao=situacao)
+
+    entradas = [ZERO_REAIS] * 12
+    saidas = [ZERO_REAIS] * 12
+    quantidades = [0] * 12
+    for mes, tipo, total, quantidade in query.group_by(Lancamento.mes, Lancamento.tipo).all():
+        if tipo == "ENTRADA":
+            entradas[mes - 1] += total or ZERO_REAIS
+        else:
+            saidas[mes - 1] += total or ZERO_REAIS
+        quantidades[mes - 1] += quantidade
+
+    resultado = [e - s for e, s in zip(entradas, saidas)]
+    acumulado = []
+    saldo = ZERO_REAIS
+    for r in resultado:
+        saldo += r
+        acumulado.append(saldo)
+
+    return {
+        "ano": ano,
+        "meses": list(range(1, 13)),
+        "entradas": entradas,
+        "saidas": saidas,
+        "resultado": resultado,
+        "acumulado": acumulado,
+        "quantidades": quantidades,
+        "total_entradas": sum(entradas, ZERO_REAIS),
+        "total_saidas": sum(saidas, ZERO_REAIS),
+        "meses_com_movimentacao": sum(1 for q in quantidades if q > 0)
+    }
+
+
+@app.get("/api/agregados/diario")
+def agregados_diario(
+    ano: Optional[int] = None,
+    mes: Optional[int] = None,
+    categoria: Optional[str] = None,
+    situacao: Optional[str] = None,
+    data_inicio: Optional[date] = None,
+    data_fim: Optional[date] = None,
+    db: Session = Depends(get_db)
+):
+    """Totais de entradas e saídas por dia"""
+    query = db.query(
+        Lancamento.data,
+        func.sum(case((Lancamento.tipo == "ENTRADA", Lancamento.valor), else_=0)),
+        func.sum(case((Lancamento.tipo != "ENTRADA", Lancamento.valor), else_=0)),
+        func.count(Lancamento.id)
+    )
+    query = filtrar_agregados(
+        query, ano=ano, mes=mes, categoria=categoria, situacao=situacao,
+        data_inicio=data_inicio, data_fim=data_fim
+    )
+
+    return [
+        {
+            "data": data_dia,
+            "entradas": entradas or ZERO_REAIS,
+            "saidas": saidas or ZERO_REAIS,
+            "saldo_dia": (entradas or ZERO_REAIS) - (saidas or ZERO_REAIS),
+            "quantidade": quantidade
+        }
+        for data_dia, entradas, saidas, quantidade in query.group_by(Lancamento.data).order_by(Lancamento.data).all()
+    ]
+
+
+@app.get("/api/agregados/classificacao")
+def agregados_classificacao(
+    ano: Optional[int] = None,
+    mes: Optional[int] = None,
+    tipo: Optional[str] = "SAIDA",
+    categoria: Optional[str] = None,
+    situacao: Optional[str] = None,
+    limite: Optional[int] = None,
+    db: Session = Depends(get_db)
+):
+    """Totais por classificação, com o tipo da classificação"""
+    total = func.sum(Lancamento.valor)
+    query = db.query(
+        Lancamento.classificacao_nome,
+        func.max(Classificacao.tipo),
+        total,
+        func.count(Lancamento.id),
+        func.sum(total).over()
+    ).outerjoin(Classificacao, and_(
+        Classificacao.nome == Lancamento.classificacao_nome,
+        Classificacao.ativo == True
+    ))
+    query = filtrar_agregados(query, ano=ano, mes=mes, tipo=tipo, categoria=categoria, situacao=situacao)
+    query = query.group_by(Lancamento.classificacao_nome).order_by(total.desc())
+    if limite:
+        query = query.limit(limite)
+
+    linhas = query.all()
+    return {
+        "total_geral": (linhas[0][4] if linhas else None) or ZERO_REAIS,
+        "grupos": [
+            {
+                "classificacao": nome or "Sem classificação",
+                "tipo_classificacao": tipo_classif,
+                "total": valor or ZERO_REAIS,
+                "quantidade": quantidade
+            }
+            for nome, tipo_classif, valor, quantidade, _ in linhas
+        ]
+    }
+
+
+@app.get("/api/agregados/tipo-classificacao")
+def agregados_tipo_classificacao(
+    ano: Optional[int] = None,
+    mes: Optional[int] = None,
+    tipo: Optional[str] = "SAIDA",
+    categoria: Optional[str] = None,
+    situacao: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """Totais por tipo de classificação (CUSTO_FIXO, IMPOSTO...), com a evolução mensal"""
+    query = db.query(
+        Classificacao.tipo,
+        Lancamento.mes,
+        func.sum(Lancamento.valor),
+        func.count(Lancamento.id)
+    ).outerjoin(Classificacao, and_(
+        Classificacao.nome == Lancamento.classificacao_nome,
+        Classificacao.ativo == True
+    ))
+    query = filtrar_agregados(query, ano=ano, mes=mes, tipo=tipo, categoria=categoria, situacao=situacao)
+
+    grupos = {}
+    for tipo_classif, mes_lanc, valor, quantidade in query.group_by(Classificacao.tipo, Lancamento.mes).all():
+        chave = tipo_classif or "Outros"
+        if chave not in grupos:
+            grupos[chave] = {"tipo_classificacao": chave, "total": ZERO_REAIS, "quantidade": 0, "meses": [ZERO_REAIS] * 12}
+        grupos[chave]["total"] += valor or ZERO_REAIS
+        grupos[chave]["quantidade"] += quantidade
+        grupos[chave]["meses"][mes_lanc - 1] += valor or ZERO_REAIS
+
+    ordenados = sorted(grupos.values(), key=lambda g: g["total"], reverse=True)
+    return {
+        "total_geral": sum((g["total"] for g in ordenados), ZERO_REAIS),
+        "grupos": ordenados
+    }
+
+
+@app.get("/api/agregados/categoria")
+def agregados_categoria(
+    ano: Optional[int] = None,
+    mes: Optional[int] = None,
+    tipo: Optional[str] = None,
+    situacao: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """Totais por categoria (OPERACIONAL, FINANCEIRO, INVESTIMENTO)"""
+    total_geral, linhas = agrupar_lancamentos(
+        db, Lancamento.categoria, ano=ano, mes=mes, tipo=tipo, situacao=situacao
+    )
+    return {
+        "total_geral": total_geral,
+        "grupos": [
+            {"categoria": categoria or "Outros", "total": valor, "quantidade": quantidade}
+            for categoria, valor, quantidade in linhas
+        ]
+    }
+
+
+@app.get("/api/agregados/tipo")
+def agregados_tipo(
+    ano: Optional[int] = None,
+    mes: Optional[int] = None,
+    categoria: Optional[str] = None,
+    situacao: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """Totais por tipo de lançamento (ENTRADA/SAIDA)"""
+    total_geral, linhas = agrupar_lancamentos(
+        db, Lancamento.tipo, ano=ano, mes=mes, categoria=categoria, situacao=situacao
+    )
+    return {
+        "total_geral": total_geral,
+        "grupos": [
+            {"tipo": tipo, "total": valor, "quantidade": quantidade}
+            for tipo, valor, quantidade in linhas
+        ]
+    }
+
+
+@app.get("/api/agregados/situacao")
+def agregados_situacao(
+    ano: Optional[int] = None,
+    mes: Optional[int] = None,
+    tipo: Optional[str] = None,
+    categoria: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """Totais por situação (BAIXADA, NAO_BAIXADA, OBSOLETO)"""
+    total_geral, linhas = agrupar_lancamentos(
+        db, Lancamento.situacao, ano=ano, mes=mes, tipo=tipo, categoria=categoria,
+        incluir_obsoletos=True
+    )
+    return {
+        "total_geral": total_geral,
+        "grupos": [
+            {"situacao": situacao, "total": valor, "quantidade": quantidade}
+            for situacao, valor, quantidade in linhas
+        ]
+    }
+
+
+@app.get("/api/agregados/item")
+def agregados_item(
+    ano: Optional[int] = None,
+    mes: Optional[int] = None,
+    tipo: Optional[str] = "SAIDA",
+    categoria: Optional[str] = None,
+    situacao: Optional[str] = None,
+    limite: int = 10,
+    db: Session = Depends(get_db)
+):
+    """Ranking de itens/fornecedores (SAIDA) ou clientes (ENTRADA) por valor"""
+    total_geral, linhas = agrupar_lancamentos(
+        db, Lancamento.item, limite=limite,
+        ano=ano, mes=mes, tipo=tipo, categoria=categoria, situacao=situacao,
+        apenas_com_item=True
+    )
+    return {
+        "total_geral": total_geral,
+        "grupos": [
+            {"item": item, "total": valor, "quantidade": quantidade}
+            for item, valor, quantidade in linhas
+        ]
+    }
+
+
 # ============== ROTAS - LANÇAMENTOS ==============
+def codificar_cursor(data_lanc, lancamento_id):
+    """Cursor opaco com a posição (data, id) do último lançamento da página"""
+    return base64.urlsafe_b64encode(f"{data_lanc.isoformat()}|{lancamento_id}".encode()).decode()
+
+
+def decodificar_cursor(cursor):
+    """(data, id) de um cursor gerado por codificar_cursor"""
+    try:
+        data_str, id_str = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return date.fromisoformat(data_str), int(id_str)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Cursor de paginação inválido")
+
+
 @app.get("/api/lancamentos", response_model=List[LancamentoResponse])
 def listar_lancamentos(
+    response: Response,
     tipo: Optional[str] = None,
     categoria: Optional[str] = None,
     classificacao: Optional[str] = None,
@@ -420,11 +826,27 @@ def listar_lancamentos(
     item: Optional[str] = None,
     data_inicio: Optional[date] = None,
     data_fim: Optional[date] = None,
+    cursor: Optional[str] = None,
+    contar: bool = False,
     skip: int = 0,
     limit: int = 500,
+    formato: Optional[str] = Query(None, alias="format"),
     db: Session = Depends(get_db)
 ):
-    """Lista lançamentos com filtros"""
+    """
+    Lista lançamentos com filtros, em ordem de (data, id)
+
+    Paginação por cursor: quando há mais páginas, o cabeçalho X-Next-Cursor
+    traz o cursor a enviar em `cursor` para buscar a próxima; cada página
+    custa o mesmo, seja a primeira ou a quingentésima. Com contar=true o
+    total filtrado vem em X-Total-Count. `skip` é mantido por compatibilidade.
+
+    Com format=ndjson ou format=csv a resposta é enviada em fluxo, com todos
+    os lançamentos filtrados (a partir do `cursor`, se houver; sem limit).
+    """
+    if formato and formato not in FORMATOS_STREAMING:
+        raise HTTPException(status_code=400, detail="Formato deve ser ndjson ou csv")
+    
     query = db.query(Lancamento)
     
     if tipo:
@@ -442,13 +864,37 @@ def listar_lancamentos(
     if ano:
         query = query.filter(Lancamento.ano == ano)
     if item:
-        query = query.filter(Lancamento.item.ilike(f"%{item}%"))
+        query = query.filter(filtro_item(f"%{item}%"))
     if data_inicio:
         query = query.filter(Lancamento.data >= data_inicio)
     if data_fim:
         query = query.filter(Lancamento.data <= data_fim)
     
-    return query.order_by(Lancamento.data.asc(), Lancamento.id.asc()).offset(skip).limit(limit).all()
+    cabecalhos = {}
+    if contar:
+        cabecalhos["X-Total-Count"] = str(query.with_entities(func.count(Lancamento.id)).scalar())
+    
+    query = query.order_by(Lancamento.data.asc(), Lancamento.id.asc())
+    if cursor:
+        query = query.filter(tuple_(Lancamento.data, Lancamento.id) > decodificar_cursor(cursor))
+    elif skip:
+        query = query.offset(skip)
+    
+    if formato:
+        consulta = query.with_entities(*COLUNAS_EXPORTACAO).statement
+        return resposta_streaming(db.get_bind(), consulta, formato, cabecalhos)
+    
+    response.headers.update(cabecalhos)
+    # Um a mais para saber se existe próxima página
+    lancamentos = query.limit(limit + 1).all()
+    if len(lancamentos) > limit:
+        lancamentos = lancamentos[:limit]
+        # Página vazia (limit=0) não tem de onde continuar
+        if lancamentos:
+            ultimo = lancamentos[-1]
+            response.headers["X-Next-Cursor"] = codificar_cursor(ultimo.data, ultimo.id)
+    
+    return lancamentos
 
 
 @app.get("/api/lancamentos/exportar/excel")
@@ -462,10 +908,7 @@ def exportar_lancamentos_excel(
     item: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
-    """Exporta lançamentos para Excel"""
-    from fastapi.responses import StreamingResponse
-    import io
-    
+    """Exporta lançamentos para Excel (gerado em fluxo, ver exportacao.gerar_xlsx)"""
     query = db.query(Lancamento)
     
     if tipo:
@@ -481,46 +924,75 @@ def exportar_lancamentos_excel(
     if ano:
         query = query.filter(Lancamento.ano == ano)
     if item:
-        query = query.filter(Lancamento.item.ilike(f"%{item}%"))
-    
-    lancamentos = query.order_by(Lancamento.data.asc()).all()
-    
-    # Criar DataFrame
-    dados = []
-    for l in lancamentos:
-        dados.append({
-            'Data': l.data.strftime('%d/%m/%Y') if l.data else '',
-            'Tipo': 'Entrada' if l.tipo == 'ENTRADA' else 'Saída',
-            'Categoria': l.categoria,
-            'Classificação': l.classificacao_nome or '',
-            'Item/Fornecedor': l.item or '',
-            'Valor': l.valor,
-            'Situação': 'Baixado' if l.situacao == 'BAIXADA' else 'Não Baixado'
-        })
-    
-    df = pd.DataFrame(dados)
-    
-    # Criar arquivo Excel
-    output = io.BytesIO()
-    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-        df.to_excel(writer, sheet_name='Lançamentos', index=False)
-        
-        # Ajustar largura das colunas
-        worksheet = writer.sheets['Lançamentos']
-        for idx, col in enumerate(df.columns):
-            max_length = max(df[col].astype(str).map(len).max(), len(col)) + 2
-            worksheet.column_dimensions[chr(65 + idx)].width = min(max_length, 50)
+        query = query.filter(filtro_item(f"%{item}%"))
     
-    output.seek(0)
+    consulta = query.with_entities(
+        *(coluna for _, coluna in COLUNAS_EXCEL)
+    ).order_by(Lancamento.data.asc(), Lancamento.id.asc()).statement
     
     # Nome do arquivo
     nome_arquivo = f"lancamentos_{ano or 'todos'}_{mes or 'todos'}.xlsx"
     
-    return StreamingResponse(
-        output,
-        media_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-        headers={'Content-Disposition': f'attachment; filename={nome_arquivo}'}
-    )
+    return resposta_excel(db.get_bind(), consulta, nome_arquivo)
+
+
+# Operações em lote (declaradas antes das rotas /api/lancamentos/{lancamento_id})
+def _validar_tamanho_lote(quantidade):
+    if quantidade == 0:
+        raise HTTPException(status_code=400, detail="Lote vazio")
+    if quantidade > MAXIMO_LOTE:
+        raise HTTPException(status_code=400, detail=f"Lote deve ter no máximo {MAXIMO_LOTE} operações")
+
+
+@app.post("/api/lancamentos/lote")
+def criar_lancamentos_lote(dados: LoteCriar, db: Session = Depends(get_db)):
+    """Cria vários lançamentos numa única transação (ver lote_service)"""
+    _validar_tamanho_lote(len(dados.lancamentos))
+    lote = LoteLancamentos(db)
+    resultados = lote.criar([l.model_dump() for l in dados.lancamentos])
+    lote.concluir()
+    return resumo_resultados(resultados)
+
+
+@app.put("/api/lancamentos/lote")
+def atualizar_lancamentos_lote(dados: LoteAtualizar, db: Session = Depends(get_db)):
+    """Atualiza vários lançamentos numa única transação"""
+    _validar_tamanho_lote(len(dados.lancamentos))
+    lote = LoteLancamentos(db)
+    resultados = lote.atualizar([l.model_dump() for l in dados.lancamentos])
+    lote.concluir()
+    return resumo_resultados(resultados)
+
+
+@app.post("/api/lancamentos/lote/excluir")
+def excluir_lancamentos_lote(dados: LoteIds, db: Session = Depends(get_db)):
+    """Exclui vários lançamentos numa única transação"""
+    _validar_tamanho_lote(len(dados.ids))
+    lote = LoteLancamentos(db)
+    resultados = lote.excluir(dados.ids)
+    lote.concluir()
+    return resumo_resultados(resultados)
+
+
+@app.patch("/api/lancamentos/lote/baixar")
+def baixar_lancamentos_lote(dados: LoteBaixar, db: Session = Depends(get_db)):
+    """Baixa (ou alterna a situação de) vários lançamentos numa única transação"""
+    _validar_tamanho_lote(len(dados.ids))
+    if dados.situacao not in (None, "BAIXADA", "NAO_BAIXADA"):
+        raise HTTPException(status_code=400, detail="Situação deve ser BAIXADA ou NAO_BAIXADA")
+    lote = LoteLancamentos(db)
+    resultados = lote.baixar(dados.ids, dados.situacao)
+    lote.concluir()
+    return resumo_resultados(resultados)
+
+
+@app.get("/api/lancamentos/busca", response_model=List[LancamentoResponse])
+def buscar_lancamentos_texto(q: str = Query(..., min_length=1), limite: int = 50, db: Session = Depends(get_db)):
+    """Busca lançamentos pelo item, ordenados por relevância (ver busca_texto)"""
+    q = q.strip()
+    if not q:
+        raise HTTPException(status_code=400, detail="Informe o texto da busca")
+    return buscar_lancamentos(db, q, min(limite, 500))
 
 
 @app.get("/api/lancamentos/{lancamento_id}", response_model=LancamentoResponse)
@@ -536,20 +1008,11 @@ def obter_lancamento(lancamento_id: int, db: Session = Depends(get_db)):
 def criar_lancamento(lancamento: LancamentoCreate, db: Session = Depends(get_db)):
     """Cria novo lançamento"""
     # Obter classificação
-    classif = db.query(Classificacao).filter(Classificacao.nome == lancamento.classificacao_nome).first()
-    classif_id = classif.id if classif else None
+    classif_id = registro_classificacoes.id_por_nome(db, lancamento.classificacao_nome)
     
     # Registrar item para autocomplete
-    if lancamento.item:
-        item_existente = db.query(ItemFornecedor).filter(ItemFornecedor.nome == lancamento.item.upper()).first()
-        if item_existente:
-            item_existente.vezes_usado += 1
-            item_existente.ultima_vez = datetime.utcnow()
-            if classif_id:
-                item_existente.classificacao_id = classif_id
-        else:
-            novo_item = ItemFornecedor(nome=lancamento.item.upper(), classificacao_id=classif_id)
-            db.add(novo_item)
+    usos = [(lancamento.item.upper(), 1, classif_id)] if lancamento.item else []
+    gravar_usos_itens(db, usos)
     
     # Criar lançamento
     novo = Lancamento(
@@ -567,9 +1030,17 @@ def criar_lancamento(lancamento: LancamentoCreate, db: Session = Depends(get_db)
     )
     
     db.add(novo)
+    
+    # Atualizar resumo mensal na mesma transação
+    resumos = AtualizadorResumos(db)
+    resumos.adicionar(novo)
+    resumos.aplicar()
+    
     db.commit()
     db.refresh(novo)
     
+    indice_autocomplete.registrar_usos(usos)
+    
     return novo
 
 
@@ -580,6 +1051,9 @@ def atualizar_lancamento(lancamento_id: int, dados: LancamentoUpdate, db: Sessio
     if not lancamento:
         raise HTTPException(status_code=404, detail="Lançamento não encontrado")
     
+    resumos = AtualizadorResumos(db)
+    resumos.remover(lancamento)
+    
     if dados.data:
         lancamento.data = dados.data
         lancamento.dia = dados.data.day
@@ -591,8 +1065,7 @@ def atualizar_lancamento(lancamento_id: int, dados: LancamentoUpdate, db: Sessio
         lancamento.categoria = dados.categoria
     if dados.classificacao_nome:
         lancamento.classificacao_nome = dados.classificacao_nome
-        classif = db.query(Classificacao).filter(Classificacao.nome == dados.classificacao_nome).first()
-        lancamento.classificacao_id = classif.id if classif else None
+        lancamento.classificacao_id = registro_classificacoes.id_por_nome(db, dados.classificacao_nome)
     if dados.item is not None:
         lancamento.item = dados.item
     if dados.valor is not None:
@@ -600,6 +1073,9 @@ def atualizar_lancamento(lancamento_id: int, dados: LancamentoUpdate, db: Sessio
     if dados.situacao:
         lancamento.situacao = dados.situacao
     
+    resumos.adicionar(lancamento)
+    resumos.aplicar()
+    
     db.commit()
     db.refresh(lancamento)
     
@@ -613,6 +1089,10 @@ def excluir_lancamento(lancamento_id: int, db: Session = Depends(get_db)):
     if not lancamento:
         raise HTTPException(status_code=404, detail="Lançamento não encontrado")
     
+    resumos = AtualizadorResumos(db)
+    resumos.remover(lancamento)
+    resumos.aplicar()
+    
     db.delete(lancamento)
     db.commit()
     
@@ -626,11 +1106,17 @@ def baixar_lancamento(lancamento_id: int, db: Session = Depends(get_db)):
     if not lancamento:
         raise HTTPException(status_code=404, detail="Lançamento não encontrado")
     
+    resumos = AtualizadorResumos(db)
+    resumos.remover(lancamento)
+    
     if lancamento.situacao == "BAIXADA":
         lancamento.situacao = "NAO_BAIXADA"
     else:
         lancamento.situacao = "BAIXADA"
     
+    resumos.adicionar(lancamento)
+    resumos.aplicar()
+    
     db.commit()
     
     return {"message": f"Situação alterada para {lancamento.situacao}"}
@@ -676,6 +1162,7 @@ def criar_classificacao(dados: ClassificacaoCreate, db: Session = Depends(get_db
     db.add(classificacao)
     db.commit()
     db.refresh(classificacao)
+    registro_classificacoes.carregar(db)
     
     return classificacao
 
@@ -705,6 +1192,7 @@ def atualizar_classificacao(classificacao_id: int, dados: ClassificacaoUpdate, d
     
     db.commit()
     db.refresh(classificacao)
+    registro_classificacoes.carregar(db)
     
     return classificacao
 
@@ -719,6 +1207,7 @@ def excluir_classificacao(classificacao_id: int, db: Session = Depends(get_db)):
     # Soft delete - apenas marca como inativo
     classificacao.ativo = False
     db.commit()
+    registro_classificacoes.carregar(db)
     
     return {"message": f"Classificação '{classificacao.nome}' excluída com sucesso"}
 
@@ -741,30 +1230,8 @@ def listar_tipos_classificacao():
 # ============== ROTAS - AUTOCOMPLETE ==============
 @app.get("/api/autocomplete/itens")
 def autocomplete_itens(q: str = "", limite: int = 10, db: Session = Depends(get_db)):
-    """Autocomplete de itens/fornecedores"""
-    if len(q) < 2:
-        return []
-    
-    itens = db.query(ItemFornecedor).filter(
-        ItemFornecedor.nome.ilike(f"%{q}%")
-    ).order_by(
-        ItemFornecedor.vezes_usado.desc()
-    ).limit(limite).all()
-    
-    resultado = []
-    for item in itens:
-        classif = None
-        if item.classificacao_id:
-            classif_obj = db.query(Classificacao).filter(Classificacao.id == item.classificacao_id).first()
-            classif = classif_obj.nome if classif_obj else None
-        
-        resultado.append({
-            "nome": item.nome,
-            "classificacao_sugerida": classif,
-            "vezes_usado": item.vezes_usado
-        })
-    
-    return resultado
+    """Autocomplete de itens/fornecedores (índice em memória, ver autocomplete_service)"""
+    return indice_autocomplete.buscar(db, q, limite)
 
 
 # ============== ROTAS - CONFIGURAÇÕES ==============
@@ -781,67 +1248,78 @@ def atualizar_configuracao(chave: str, dados: ConfiguracaoUpdate, db: Session =
     if not config:
         raise HTTPException(status_code=404, detail="Configuração não encontrada")
     
+    try:
+        converter_configuracao(chave, dados.valor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Valor inválido para a configuração {chave}")
+    
     config.valor = dados.valor
     db.commit()
+    cache_configuracoes.atualizar(chave, dados.valor)
     
     return {"message": "Configuração atualizada", "chave": chave, "valor": dados.valor}
 
 
 # ============== ROTAS - FLUXO DE CAIXA ==============
 @app.get("/api/fluxo-caixa")
-def get_fluxo_caixa(mes: int = None, ano: int = 2025, db: Session = Depends(get_db)):
-    """Retorna fluxo de caixa diário do mês"""
-    if mes is None:
-        mes = date.today().month
-    
-    # Buscar saldo inicial do mês
-    saldo_inicial = 0
-    if mes > 1:
-        resumo_anterior = db.query(ResumoMensal).filter(
-            ResumoMensal.mes == mes - 1,
-            ResumoMensal.ano == ano
-        ).first()
-        if resumo_anterior:
-            saldo_inicial = resumo_anterior.saldo_final
-    
-    # Buscar lançamentos do mês agrupados por dia
-    lancamentos = db.query(Lancamento).filter(
-        Lancamento.mes == mes,
-        Lancamento.ano == ano
-    ).order_by(Lancamento.dia).all()
-    
-    # Agrupar por dia
-    dias = {}
-    for l in lancamentos:
-        if l.dia not in dias:
-            dias[l.dia] = {"entradas": 0, "saidas": 0}
-        
-        if l.tipo == "ENTRADA":
-            dias[l.dia]["entradas"] += l.valor
-        else:
-            dias[l.dia]["saidas"] += l.valor
-    
-    # Calcular saldos
+def get_fluxo_caixa(
+    mes: Optional[int] = Query(None, ge=1, le=12),
+    ano: int = 2025,
+    data_inicio: date = None,
+    data_fim: date = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Retorna fluxo de caixa diário do mês (ou do intervalo data_inicio..data_fim,
+    que exige as duas datas)
+
+    Lê a tabela materializada saldos_diarios, mantida a cada escrita pelo
+    AtualizadorResumos: uma varredura por intervalo de datas, sem somar
+    lançamentos.
+    """
+    if (data_inicio is None) != (data_fim is None):
+        raise HTTPException(status_code=400, detail="Informe data_inicio e data_fim juntas")
+    
+    if data_inicio is None:
+        if mes is None:
+            mes = date.today().month
+        data_inicio = date(ano, mes, 1)
+        data_fim = date(ano, mes, calendar.monthrange(ano, mes)[1])
+    elif data_inicio > data_fim:
+        raise HTTPException(status_code=400, detail="data_inicio deve ser anterior a data_fim")
+
+    # Saldo inicial: saldo final do último dia com movimento antes do intervalo, no mesmo ano
+    anterior = db.query(SaldoDiario.saldo_final).filter(
+        SaldoDiario.data < data_inicio,
+        SaldoDiario.data >= date(data_inicio.year, 1, 1)
+    ).order_by(SaldoDiario.data.desc()).first()
+    saldo_inicial = anterior[0] if anterior else 0
+
+    saldos = db.query(SaldoDiario).filter(
+        SaldoDiario.data >= data_inicio,
+        SaldoDiario.data <= data_fim
+    ).order_by(SaldoDiario.data).all()
+
     fluxo = []
     saldo_acumulado = saldo_inicial
-    
-    for dia in sorted(dias.keys()):
-        entradas = dias[dia]["entradas"]
-        saidas = dias[dia]["saidas"]
-        saldo_dia = entradas - saidas
-        saldo_acumulado += saldo_dia
-        
+
+    for saldo in saldos:
+        saldo_acumulado += saldo.saldo_do_dia
+
         fluxo.append({
-            "dia": dia,
-            "entradas": entradas,
-            "saidas": saidas,
-            "saldo_dia": saldo_dia,
+            "data": saldo.data.isoformat(),
+            "dia": saldo.dia,
+            "entradas": saldo.total_entradas,
+            "saidas": saldo.total_saidas,
+            "saldo_dia": saldo.saldo_do_dia,
             "saldo_acumulado": saldo_acumulado
         })
-    
+
     return {
         "mes": mes,
-        "ano": ano,
+        "ano": ano if mes else data_inicio.year,
+        "data_inicio": data_inicio.isoformat(),
+        "data_fim": data_fim.isoformat(),
         "saldo_inicial": saldo_inicial,
         "fluxo_diario": fluxo,
         "saldo_final": saldo_acumulado
@@ -899,6 +1377,12 @@ def health_check():
     return {"status": "ok", "timestamp": datetime.now().isoformat()}
 
 
+@app.get("/api/health/executores")
+def metricas_executores():
+    """Fila, tarefas em execução e tempo de espera de cada pool de executores"""
+    return executores.metricas()
+
+
 # ============== ROTAS PARA SERVIR HTML ==============
 from fastapi.responses import FileResponse
 
@@ -918,254 +1402,69 @@ async def serve_page(page: str):
 
 # ============== ROTAS - IMPORTAÇÃO ==============
 
-# Mapeamento de meses
-MESES_ABAS = ['JANEIRO', 'FEVEREIRO', 'MARÇO', 'ABRIL', 'MAIO', 'JUNHO',
-              'JULHO', 'AGOSTO', 'SETEMBRO', 'OUTUBRO', 'NOVEMBRO', 'DEZEMBRO']
-
-def limpar_valor(valor):
-    """Converte valor para float"""
-    if pd.isna(valor) or valor == '' or valor == 0:
-        return 0.0
-    try:
-        return float(valor)
-    except:
-        return 0.0
-
-def limpar_texto(texto):
-    """Limpa texto removendo espaços extras"""
-    if pd.isna(texto) or texto is None:
-        return None
-    return str(texto).strip()
-
-def obter_classificacao_id(db, nome_classificacao):
-    """Obtém o ID da classificação pelo nome"""
-    if not nome_classificacao or pd.isna(nome_classificacao):
-        return None, None
-    nome = limpar_texto(nome_classificacao)
-    classif = db.query(Classificacao).filter(Classificacao.nome == nome).first()
-    if classif:
-        return classif.id, nome
-    return None, nome
-
-def registrar_item_fornecedor(db, nome_item, classificacao_id):
-    """Registra item/fornecedor para autocomplete"""
-    if not nome_item or pd.isna(nome_item):
-        return
-    nome = limpar_texto(nome_item).upper()
-    if not nome or nome == '0' or nome == 'NAN':
-        return
-    item_existente = db.query(ItemFornecedor).filter(ItemFornecedor.nome == nome).first()
-    if item_existente:
-        item_existente.vezes_usado += 1
-        item_existente.ultima_vez = datetime.utcnow()
-        if classificacao_id:
-            item_existente.classificacao_id = classificacao_id
-    else:
-        novo_item = ItemFornecedor(
-            nome=nome,
-            classificacao_id=classificacao_id,
-            vezes_usado=1
-        )
-        db.add(novo_item)
-
-def lancamento_existe(db, data, tipo, item, valor):
-    """Verifica se um lançamento já existe (para evitar duplicatas)"""
-    return db.query(Lancamento).filter(
-        Lancamento.data == data,
-        Lancamento.tipo == tipo,
-        Lancamento.item == item,
-        Lancamento.valor == valor
-    ).first()
-
-def importar_lancamentos_mes(db, df, mes_num, ano, modo):
-    """Importa lançamentos de um mês específico"""
-    lancamentos_novos = 0
-    lancamentos_atualizados = 0
-    lancamentos_ignorados = 0
-    
-    # Encontrar linha de cabeçalho
-    header_row = None
-    for idx, row in df.iterrows():
-        if 'DIA' in str(row.values):
-            header_row = idx
-            break
-    
-    if header_row is None:
-        return 0, 0, 0
-    
-    # Processar ENTRADAS
-    for idx in range(header_row + 1, len(df)):
-        row = df.iloc[idx]
-        valor_entrada = limpar_valor(row.iloc[5]) if len(row) > 5 else 0
-        
-        if valor_entrada > 0:
-            dia = int(row.iloc[1]) if not pd.isna(row.iloc[1]) else None
-            if dia is None:
-                continue
-            
-            categoria = limpar_texto(row.iloc[2]) or "OPERACIONAL"
-            classificacao_nome = limpar_texto(row.iloc[3])
-            item = limpar_texto(row.iloc[4])
-            situacao = limpar_texto(row.iloc[6]) or "BAIXADA"
-            situacao = situacao.replace(" ", "_").replace("Ã", "A").upper()
-            
-            classif_id, classif_nome = obter_classificacao_id(db, classificacao_nome)
-            registrar_item_fornecedor(db, item, classif_id)
-            
-            data_lanc = date(ano, mes_num, dia)
-            existente = lancamento_existe(db, data_lanc, "ENTRADA", item, valor_entrada)
-            
-            if existente:
-                if modo == "merge":
-                    existente.categoria = categoria
-                    existente.classificacao_id = classif_id
-                    existente.classificacao_nome = classif_nome
-                    existente.situacao = situacao
-                    lancamentos_atualizados += 1
-                else:
-                    lancamentos_ignorados += 1
-            else:
-                lancamento = Lancamento(
-                    data=data_lanc,
-                    dia=dia,
-                    mes=mes_num,
-                    ano=ano,
-                    tipo="ENTRADA",
-                    categoria=categoria,
-                    classificacao_id=classif_id,
-                    classificacao_nome=classif_nome,
-                    item=item,
-                    valor=valor_entrada,
-                    situacao=situacao
-                )
-                db.add(lancamento)
-                lancamentos_novos += 1
-        
-        # Processar SAÍDAS
-        if len(row) > 11:
-            valor_saida = limpar_valor(row.iloc[11]) if len(row) > 11 else 0
-            
-            if valor_saida > 0:
-                dia_saida = row.iloc[7] if not pd.isna(row.iloc[7]) else None
-                if dia_saida is not None:
-                    try:
-                        dia_saida = int(dia_saida)
-                    except:
-                        continue
-                    
-                    categoria_saida = limpar_texto(row.iloc[8]) or "OPERACIONAL"
-                    classificacao_saida = limpar_texto(row.iloc[9])
-                    item_saida = limpar_texto(row.iloc[10])
-                    situacao_saida = limpar_texto(row.iloc[12]) if len(row) > 12 else "BAIXADA"
-                    situacao_saida = situacao_saida.replace(" ", "_").replace("Ã", "A").upper() if situacao_saida else "BAIXADA"
-                    
-                    classif_id_saida, classif_nome_saida = obter_classificacao_id(db, classificacao_saida)
-                    registrar_item_fornecedor(db, item_saida, classif_id_saida)
-                    
-                    data_lanc_saida = date(ano, mes_num, dia_saida)
-                    existente_saida = lancamento_existe(db, data_lanc_saida, "SAIDA", item_saida, valor_saida)
-                    
-                    if existente_saida:
-                        if modo == "merge":
-                            existente_saida.categoria = categoria_saida
-                            existente_saida.classificacao_id = classif_id_saida
-                            existente_saida.classificacao_nome = classif_nome_saida
-                            existente_saida.situacao = situacao_saida
-                            lancamentos_atualizados += 1
-                        else:
-                            lancamentos_ignorados += 1
-                    else:
-                        lancamento_saida = Lancamento(
-                            data=data_lanc_saida,
-                            dia=dia_saida,
-                            mes=mes_num,
-                            ano=ano,
-                            tipo="SAIDA",
-                            categoria=categoria_saida,
-                            classificacao_id=classif_id_saida,
-                            classificacao_nome=classif_nome_saida,
-                            item=item_saida,
-                            valor=valor_saida,
-                            situacao=situacao_saida
-                        )
-                        db.add(lancamento_saida)
-                        lancamentos_novos += 1
-    
-    return lancamentos_novos, lancamentos_atualizados, lancamentos_ignorados
-
-
-@app.post("/api/importar")
-async def importar_planilha(
+@app.post("/api/importar", status_code=202)
+def importar_planilha(
     arquivo: UploadFile = File(...),
     modo: str = Form("incremental"),
-    ano: int = Form(2025),
-    db: Session = Depends(get_db)
+    ano: int = Form(2025)
 ):
     """
-    Importa planilha Excel
+    Enfileira a importação de uma planilha Excel
     Modos:
     - incremental: apenas adiciona novos (não duplica)
     - merge: atualiza existentes e adiciona novos
     - substituir: apaga tudo e reimporta
+
+    Retorna o job_id; o progresso é consultado em GET /api/importar/{job_id}
     """
     
     if not arquivo.filename.endswith(('.xlsx', '.xls')):
         raise HTTPException(status_code=400, detail="Arquivo deve ser Excel (.xlsx ou .xls)")
     
-    # Salvar arquivo temporariamente
-    with tempfile.NamedTemporaryFile(delete=False, suffix='.xlsx') as tmp:
-        shutil.copyfileobj(arquivo.file, tmp)
-        tmp_path = tmp.name
+    if modo not in ("incremental", "merge", "substituir"):
+        raise HTTPException(status_code=400, detail="Modo deve ser incremental, merge ou substituir")
     
-    try:
-        total_novos = 0
-        total_atualizados = 0
-        total_ignorados = 0
-        meses_processados = []
-        
-        # Se modo substituir, apagar tudo primeiro
-        if modo == "substituir":
-            db.query(Lancamento).filter(Lancamento.ano == ano).delete()
-            db.commit()
-        
-        # Processar cada aba (mês)
-        for mes_idx, mes_nome in enumerate(MESES_ABAS):
-            try:
-                df = pd.read_excel(tmp_path, sheet_name=mes_nome, header=None)
-                mes_num = mes_idx + 1
-                
-                novos, atualizados, ignorados = importar_lancamentos_mes(db, df, mes_num, ano, modo)
-                
-                if novos > 0 or atualizados > 0:
-                    meses_processados.append(mes_nome)
-                
-                total_novos += novos
-                total_atualizados += atualizados
-                total_ignorados += ignorados
-                
-            except Exception as e:
-                print(f"Erro ao processar {mes_nome}: {e}")
-                continue
-        
-        db.commit()
-        
-        # Limpar arquivo temporário
-        os.unlink(tmp_path)
-        
-        return {
-            "sucesso": True,
-            "modo": modo,
-            "ano": ano,
-            "lancamentos_novos": total_novos,
-            "lancamentos_atualizados": total_atualizados,
-            "lancamentos_ignorados": total_ignorados,
-            "meses_processados": meses_processados,
-            "mensagem": f"Importação concluída! {total_novos} novos, {total_atualizados} atualizados, {total_ignorados} ignorados."
-        }
-        
-    except Exception as e:
-        os.unlink(tmp_path)
-        raise HTTPException(status_code=500, detail=f"Erro na importação: {str(e)}")
+    # O upload é fechado ao fim da requisição; o job recebe o conteúdo em memória
+    conteudo = io.BytesIO(arquivo.file.read())
+    
+    job = submeter_importacao(conteudo, arquivo.filename, modo, ano)
+    return job.para_dict()
+
+
+@app.get("/api/importar")
+def listar_importacoes():
+    """Lista as importações recentes (em andamento e finalizadas)"""
+    return [job.para_dict() for job in listar_jobs()]
+
+
+@app.get("/api/importar/{job_id}")
+def status_importacao(job_id: str):
+    """Progresso de uma importação: aba atual, linhas processadas e contagens"""
+    job = obter_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Importação não encontrada")
+    return job.para_dict()
+
+
+@app.post("/api/importar/{job_id}/cancelar")
+def cancelar_importacao_job(job_id: str):
+    """Cancela uma importação pendente ou em andamento (nada é gravado)"""
+    job = cancelar_importacao(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Importação não encontrada")
+    return job.para_dict()
+
+
+@app.on_event("shutdown")
+def encerrar_importacoes():
+    """Cancela importações pendentes ao desligar o servidor"""
+    encerrar_fila_importacao()
+
+
+@app.on_event("shutdown")
+def encerrar_executores():
+    """Descarta as tarefas ainda na fila dos executores ao desligar o servidor"""
+    executores.encerrar()
 
 
 # ============== NFE - INTEGRAÇÃO SEFAZ ==============
@@ -1176,9 +1475,11 @@ async def nfe_status():
     try:
         from backend.sefaz_service import SefazService
         
-        service = SefazService()
-        return service.get_status()
+        # Carrega o certificado (arquivo + PKCS#12) fora do event loop
+        return await executores.cpu.executar(lambda: SefazService().get_status())
         
+    except ExecutorSaturado:
+        raise
     except Exception as e:
         return {
             "certificado_configurado": False,
@@ -1199,11 +1500,17 @@ async def nfe_consultar(ultimo_nsu: str = "0"):
     try:
         from backend.sefaz_service import SefazService
         
-        service = SefazService()
-        resultado = service.consultar_nfe(ultimo_nsu)
+        # Chamada à SEFAZ (até 60 s) no pool de rede
+        resultado = await executores.rede.executar(lambda: SefazService().consultar_nfe(ultimo_nsu))
+        
+        # Grava os documentos (com o XML) e responde só com os metadados
+        if resultado.get("success") and resultado.get("documentos"):
+            resultado["documentos"] = await executores.banco.executar(guardar_documentos, resultado["documentos"])
         
         return resultado
         
+    except ExecutorSaturado:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro na consulta: {str(e)}")
 
@@ -1222,11 +1529,15 @@ async def nfe_consultar_chave(chave: str):
     try:
         from backend.sefaz_service import SefazService
         
-        service = SefazService()
-        resultado = service.consultar_por_chave(chave)
+        resultado = await executores.rede.executar(lambda: SefazService().consultar_por_chave(chave))
+        
+        if resultado.get("success") and resultado.get("documentos"):
+            resultado["documentos"] = await executores.banco.executar(guardar_documentos, resultado["documentos"])
         
         return resultado
         
+    except ExecutorSaturado:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro na consulta: {str(e)}")
 
@@ -1242,19 +1553,32 @@ async def nfe_upload_xml(files: List[UploadFile] = File(...)):
     try:
         from backend.sefaz_service import processar_xml_upload
         
-        resultados = []
+        arquivos = []
         
         for file in files:
             if not file.filename.endswith('.xml'):
                 continue
                 
             content = await file.read()
-            xml_content = content.decode('utf-8')
-            
-            dados = processar_xml_upload(xml_content)
-            if dados:
-                dados['arquivo'] = file.filename
-                resultados.append(dados)
+            arquivos.append((file.filename, content.decode('utf-8')))
+        
+        # Parse dos XMLs no pool de CPU
+        def processar_arquivos():
+            resultados = []
+            for nome_arquivo, xml_content in arquivos:
+                dados = processar_xml_upload(xml_content)
+                if dados:
+                    dados['arquivo'] = nome_arquivo
+                    resultados.append(dados)
+            return resultados
+        
+        resultados = await executores.cpu.executar(processar_arquivos)
+        
+        # Grava os documentos (com o XML) e responde só com os metadados
+        documentos = await executores.banco.executar(guardar_documentos, resultados, "upload")
+        for dados, documento in zip(resultados, documentos):
+            documento['arquivo'] = dados['arquivo']
+        resultados = documentos
         
         return {
             "success": True,
@@ -1262,37 +1586,44 @@ async def nfe_upload_xml(files: List[UploadFile] = File(...)):
             "documentos": resultados
         }
         
+    except ExecutorSaturado:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro no upload: {str(e)}")
 
 
 class ImportarNFeRequest(BaseModel):
-    documentos: List[dict]
+    chaves: List[str] = []  # notas já gravadas em nfe_documentos
+    documentos: List[dict] = []
     categoria: str = "OPERACIONAL"
     classificacao: Optional[str] = None
 
 
-@app.post("/api/nfe/importar")
-async def nfe_importar(request: ImportarNFeRequest, db: Session = Depends(get_db)):
-    """
-    Importa documentos NFe como lançamentos
-    
-    Args:
-        request: Lista de documentos para importar
-    """
+def importar_documentos_nfe(request: ImportarNFeRequest):
+    """Grava os documentos NFe como lançamentos (no pool de banco, com sessão própria)"""
+    db = SessionLocal()
     try:
         importados = 0
         duplicados = []
         erros = []
+        resumos = AtualizadorResumos(db)
+        
+        documentos = list(request.documentos)
+        for chave in request.chaves:
+            documento = buscar_por_chave(db, chave)
+            if documento is None:
+                erros.append({"documento": chave, "erro": "NFe não encontrada"})
+            else:
+                documentos.append(documento_para_dict(documento))
         
-        for doc in request.documentos:
+        for doc in documentos:
             try:
                 numero_nf = doc.get('numero_nf', '')
                 
                 # Verificar se já existe lançamento com esta NF
                 if numero_nf:
                     existe = db.query(Lancamento).filter(
-                        Lancamento.item.like(f"% - NF {numero_nf}")
+                        filtro_item(f"% - NF {numero_nf}")
                     ).first()
                     
                     if existe:
@@ -1319,9 +1650,7 @@ async def nfe_importar(request: ImportarNFeRequest, db: Session = Depends(get_db
                     classificacao_nome = "FORNECEDORES" if tipo == "SAIDA" else "CLIENTES"
                 
                 # Verificar se classificação existe
-                classif = db.query(Classificacao).filter(
-                    Classificacao.nome == classificacao_nome
-                ).first()
+                classif = registro_classificacoes.por_nome(db, classificacao_nome)
                 
                 # Criar lançamento
                 lancamento = Lancamento(
@@ -1338,6 +1667,7 @@ async def nfe_importar(request: ImportarNFeRequest, db: Session = Depends(get_db
                 )
                 
                 db.add(lancamento)
+                resumos.adicionar(lancamento)
                 importados += 1
                 
             except Exception as e:
@@ -1346,6 +1676,7 @@ async def nfe_importar(request: ImportarNFeRequest, db: Session = Depends(get_db
                     "erro": str(e)
                 })
         
+        resumos.aplicar()
         db.commit()
         
         return {
@@ -1355,11 +1686,131 @@ async def nfe_importar(request: ImportarNFeRequest, db: Session = Depends(get_db
             "erros": erros
         }
         
-    except Exception as e:
+    except Exception:
         db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+@app.post("/api/nfe/importar")
+async def nfe_importar(request: ImportarNFeRequest):
+    """
+    Importa documentos NFe como lançamentos
+    
+    Args:
+        request: Lista de documentos para importar
+    """
+    try:
+        return await executores.banco.executar(importar_documentos_nfe, request)
+    except ExecutorSaturado:
+        raise
+    except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro na importação: {str(e)}")
 
 
+@app.post("/api/nfe/sincronizar", status_code=202)
+def nfe_sincronizar():
+    """
+    Inicia a sincronização em segundo plano (todos os lotes até o maxNSU)
+
+    Se já houver uma sincronização em andamento, retorna a atual.
+    """
+    job, criado = iniciar_sincronizacao()
+    return {**job.para_dict(), "iniciado": criado}
+
+
+@app.get("/api/nfe/sincronizacao")
+async def nfe_sincronizacao():
+    """Cursor (último NSU, próxima consulta permitida) e progresso do job"""
+    return await executores.banco.executar(status_sincronizacao)
+
+
+@app.post("/api/nfe/sincronizacao/cancelar")
+def nfe_cancelar_sincronizacao():
+    """Para a sincronização após o lote em andamento (o que já foi baixado fica gravado)"""
+    job = cancelar_sincronizacao()
+    if job is None:
+        raise HTTPException(status_code=404, detail="Nenhuma sincronização em andamento")
+    return job.para_dict()
+
+
+@app.get("/api/nfe/documentos")
+def nfe_documentos(
+    cnpj_emitente: Optional[str] = None,
+    emissao_inicio: Optional[date] = None,
+    emissao_fim: Optional[date] = None,
+    vencimento_inicio: Optional[date] = None,
+    vencimento_fim: Optional[date] = None,
+    valor_min: Optional[Decimal] = None,
+    valor_max: Optional[Decimal] = None,
+    tipo: Optional[str] = None,
+    desde_nsu: Optional[str] = None,
+    limite: int = Query(100, ge=1, le=500),
+    db: Session = Depends(get_db)
+):
+    """
+    NFe armazenadas (recebidas da SEFAZ ou por upload), só metadados
+
+    Filtros pelos campos indexados: CNPJ do emitente, data de emissão,
+    vencimento das duplicatas e valor total. O XML sai em
+    /api/nfe/documentos/{chave}/xml.
+    """
+    documentos = listar_documentos(
+        db,
+        cnpj_emitente=cnpj_emitente,
+        emissao_inicio=emissao_inicio,
+        emissao_fim=emissao_fim,
+        vencimento_inicio=vencimento_inicio,
+        vencimento_fim=vencimento_fim,
+        valor_min=valor_min,
+        valor_max=valor_max,
+        tipo=tipo,
+        desde_nsu=desde_nsu,
+        limite=limite,
+    )
+    
+    return {
+        "success": True,
+        "total": len(documentos),
+        "documentos": [documento_para_dict(doc) for doc in documentos]
+    }
+
+
+def _obter_documento_nfe(db: Session, chave: str):
+    if len(chave) != 44:
+        raise HTTPException(status_code=400, detail="Chave de acesso deve ter 44 dígitos")
+    documento = buscar_por_chave(db, chave)
+    if documento is None:
+        raise HTTPException(status_code=404, detail="NFe não encontrada")
+    return documento
+
+
+@app.get("/api/nfe/documentos/{chave}")
+def nfe_documento(chave: str, db: Session = Depends(get_db)):
+    """Metadados de uma NFe armazenada"""
+    return documento_para_dict(_obter_documento_nfe(db, chave))
+
+
+@app.get("/api/nfe/documentos/{chave}/xml")
+def nfe_documento_xml(chave: str, db: Session = Depends(get_db)):
+    """XML original de uma NFe armazenada (descompactado sob demanda)"""
+    xml = ler_xml(db, _obter_documento_nfe(db, chave))
+    if xml is None:
+        raise HTTPException(status_code=404, detail="XML não disponível para esta NFe")
+    return Response(
+        content=xml,
+        media_type="application/xml",
+        headers={"Content-Disposition": f'inline; filename="{chave}.xml"'}
+    )
+
+
+@app.on_event("shutdown")
+def encerrar_sincronizacao():
+    """Interrompe a sincronização de NFe ao desligar o servidor"""
+    encerrar_sincronizacao_nfe()
+
+
 # ============== BACKUP S3 ==============
 
 @app.get("/api/backup/status")
@@ -1390,7 +1841,7 @@ async def criar_backup():
     if not BACKUP_ENABLED:
         raise HTTPException(status_code=400, detail="Sistema de backup não configurado")
     
-    result = backup_to_s3()
+    result = await executores.rede.executar(backup_to_s3)
     
     if not result["success"]:
         raise HTTPException(status_code=500, detail=result.get("error", "Erro no backup"))
@@ -1404,11 +1855,16 @@ async def restaurar_backup(s3_key: str = None):
     if not BACKUP_ENABLED:
         raise HTTPException(status_code=400, detail="Sistema de backup não configurado")
     
-    result = restore_from_s3(s3_key)
+    result = await executores.rede.executar(restore_from_s3, s3_key)
     
     if not result["success"]:
         raise HTTPException(status_code=500, detail=result.get("error", "Erro na restauração"))
     
+    # O backup pode ser anterior a migrações já aplicadas neste servidor
+    await executores.banco.executar(criar_tabelas)
+    indice_autocomplete.invalidar()
+    cache_configuracoes.invalidar()
+    registro_classificacoes.invalidar()
     return result
 
 
@@ -1418,7 +1874,7 @@ async def listar_backups(limit: int = 10):
     if not BACKUP_ENABLED:
         raise HTTPException(status_code=400, detail="Sistema de backup não configurado")
     
-    result = list_backups(limit)
+    result = await executores.rede.executar(list_backups, limit)
     
     if not result["success"]:
         raise HTTPException(status_code=500, detail=result.get("error", "Erro ao listar"))
@@ -1432,7 +1888,7 @@ async def limpar_backups_antigos(manter: int = 30):
     if not BACKUP_ENABLED:
         raise HTTPException(status_code=400, detail="Sistema de backup não configurado")
     
-    result = cleanup_old_backups(manter)
+    result = await executores.rede.executar(cleanup_old_backups, manter)
     
     if not result["success"]:
         raise HTTPException(status_code=500, detail=result.get("error", "Erro na limpeza"))
@@ -0,0 +1,451 @@
+"""
+Sistema Financeiro Finco - Migrações do Banco de Dados
+Aplica alterações versionadas em bancos já existentes
+
+`create_all` só cria tabelas novas; índices e colunas adicionados depois
+chegam aos bancos já implantados por aqui. Cada migração roda uma única vez,
+em ordem, e fica registrada na tabela `schema_versao`.
+
+Uso:
+    python -m backend.migracoes              # aplica as migrações pendentes
+    python -m backend.migracoes --verificar  # confere os planos das consultas principais (num banco temporário)
+"""
+import re
+import sys
+from datetime import datetime
+
+from sqlalchemy import text
+
+
+def _m001_indices_lancamentos(conn):
+    """Índices compostos da tabela lancamentos"""
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_lancamentos_ano_mes_tipo "
+        "ON lancamentos (ano, mes, tipo, situacao, valor)"
+    ))
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_lancamentos_data "
+        "ON lancamentos (data, tipo)"
+    ))
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_lancamentos_situacao_tipo "
+        "ON lancamentos (situacao, tipo, data)"
+    ))
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_lancamentos_classificacao "
+        "ON lancamentos (classificacao_nome, ano, mes)"
+    ))
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_lancamentos_item "
+        "ON lancamentos (item, data)"
+    ))
+    conn.execute(text("ANALYZE lancamentos"))
+
+
+def _m002_saldos_diarios(conn):
+    """Preenche saldos_diarios a partir dos lançamentos existentes"""
+    from backend.resumos import reconstruir_saldos_diarios
+    reconstruir_saldos_diarios(conn)
+
+
+def _m003_hash_conteudo(conn):
+    """Coluna hash_conteudo em lancamentos, preenchida e indexada"""
+    from backend.database import calcular_hash_conteudo
+
+    colunas = {row[1] for row in conn.execute(text("PRAGMA table_info(lancamentos)"))}
+    if "hash_conteudo" not in colunas:
+        conn.execute(text("ALTER TABLE lancamentos ADD COLUMN hash_conteudo VARCHAR(40)"))
+
+    linhas = conn.execute(text(
+        "SELECT id, data, tipo, item, valor FROM lancamentos WHERE hash_conteudo IS NULL"
+    )).all()
+    if linhas:
+        conn.execute(
+            text("UPDATE lancamentos SET hash_conteudo = :hash WHERE id = :id"),
+            [{"id": id_, "hash": calcular_hash_conteudo(data, tipo, item, valor)}
+             for id_, data, tipo, item, valor in linhas]
+        )
+
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_lancamentos_hash_conteudo "
+        "ON lancamentos (hash_conteudo)"
+    ))
+
+
+def _m004_busca_texto(conn):
+    """Índice FTS5 lancamentos_fts sobre o item, com triggers de sincronização"""
+    from backend.busca_texto import criar_indice_texto
+    criar_indice_texto(conn)
+
+
+def _m005_indice_paginacao(conn):
+    """Índice (data, id) para a paginação por cursor de /api/lancamentos"""
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_lancamentos_data_id "
+        "ON lancamentos (data, id)"
+    ))
+
+
+def _m006_itens_fornecedores_unicos(conn):
+    """Junta os itens/fornecedores de mesmo nome e cria o índice único em nome"""
+    repetidos = conn.execute(text(
+        "SELECT nome, MIN(id), SUM(COALESCE(vezes_usado, 0)), MAX(ultima_vez) "
+        "FROM itens_fornecedores GROUP BY nome HAVING COUNT(*) > 1"
+    )).all()
+    if repetidos:
+        # Fica o registro mais antigo, com o uso somado; a classificação é a
+        # dele ou, se vazia, a do repetido usado mais recentemente
+        conn.execute(
+            text(
+                "UPDATE itens_fornecedores SET vezes_usado = :vezes, ultima_vez = :ultima_vez, "
+                "classificacao_id = COALESCE(classificacao_id, ("
+                "SELECT r.classificacao_id FROM itens_fornecedores r "
+                "WHERE r.nome = :nome AND r.classificacao_id IS NOT NULL "
+                "ORDER BY r.ultima_vez DESC, r.id DESC LIMIT 1)) "
+                "WHERE id = :id"
+            ),
+            [{"nome": nome, "id": id_, "vezes": vezes, "ultima_vez": ultima_vez}
+             for nome, id_, vezes, ultima_vez in repetidos]
+        )
+        conn.execute(text(
+            "DELETE FROM itens_fornecedores WHERE id NOT IN "
+            "(SELECT MIN(id) FROM itens_fornecedores GROUP BY nome)"
+        ))
+
+    conn.execute(text(
+        "CREATE UNIQUE INDEX IF NOT EXISTS ux_itens_fornecedores_nome "
+        "ON itens_fornecedores (nome)"
+    ))
+
+
+# Colunas em reais convertidas para centavos inteiros pela migração 007
+COLUNAS_CENTAVOS = {
+    "lancamentos": ["valor"],
+    "saldos_diarios": [
+        "saldo_inicial", "total_entradas", "total_saidas", "saldo_do_dia", "saldo_final",
+        "fluxo_operacional", "fluxo_financeiro", "fluxo_investimento",
+    ],
+    "resumos_mensais": [
+        "total_entradas", "total_saidas", "saldo_inicial", "saldo_final",
+        "custo_fixo", "custo_variavel", "despesa_fixa", "despesa_variavel", "impostos",
+        "fluxo_operacional", "fluxo_financeiro", "fluxo_investimento",
+    ],
+}
+
+
+def _m007_valores_em_centavos(conn):
+    """
+    Valores em reais (FLOAT) passam a centavos inteiros (INTEGER)
+
+    O SQLite não altera o tipo de uma coluna: cada tabela é recriada com o
+    mesmo DDL trocando FLOAT por INTEGER nas colunas de dinheiro, os dados
+    são copiados com ROUND(valor * 100) e os índices e triggers (inclusive
+    os da busca textual) são recriados. Os ids não mudam. Por fim os saldos
+    diários são refeitos a partir dos lançamentos já em centavos.
+    """
+    from backend.resumos import reconstruir_saldos_diarios
+
+    for tabela, colunas_dinheiro in COLUNAS_CENTAVOS.items():
+        colunas = {row[1]: row[2].upper() for row in conn.exec_driver_sql(f"PRAGMA table_info({tabela})")}
+        if all(colunas.get(coluna) == "INTEGER" for coluna in colunas_dinheiro):
+            continue
+
+        ddl = conn.exec_driver_sql(
+            "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (tabela,)
+        ).scalar()
+        dependentes = [sql for (sql,) in conn.exec_driver_sql(
+            "SELECT sql FROM sqlite_master WHERE type IN ('index', 'trigger') "
+            "AND tbl_name = ? AND sql IS NOT NULL", (tabela,)
+        )]
+
+        nova = f"{tabela}_centavos"
+        ddl = re.sub(rf"^CREATE TABLE \"?{tabela}\"?", f"CREATE TABLE {nova}", ddl)
+        for coluna in colunas_dinheiro:
+            ddl = re.sub(rf"\b{coluna} FLOAT\b", f"{coluna} INTEGER", ddl)
+        conn.exec_driver_sql(ddl)
+
+        selecao = [
+            f"CAST(ROUND({coluna} * 100) AS INTEGER)" if coluna in colunas_dinheiro else coluna
+            for coluna in colunas
+        ]
+        conn.exec_driver_sql(
+            f"INSERT INTO {nova} ({', '.join(colunas)}) SELECT {', '.join(selecao)} FROM {tabela}"
+        )
+        conn.exec_driver_sql(f"DROP TABLE {tabela}")
+        conn.exec_driver_sql(f"ALTER TABLE {nova} RENAME TO {tabela}")
+        for sql in dependentes:
+            conn.exec_driver_sql(sql)
+
+    reconstruir_saldos_diarios(conn)
+    conn.exec_driver_sql("ANALYZE lancamentos")
+
+
+def _m008_documentos_nfe(conn):
+    """
+    nfe_documentos com metadados indexados, duplicatas e XML compactado
+
+    A primeira versão da tabela (gravada pela sincronização de NFe) guardava
+    os dados extraídos em JSON e o XML em texto. Ela é renomeada, a nova
+    estrutura é criada (nfe_documentos, nfe_duplicatas, nfe_xml) e cada
+    documento é regravado por gravar_documentos, a partir do JSON e do XML.
+    """
+    import json
+    from sqlalchemy.orm import Session
+    from backend.database import DocumentoNFe, DuplicataNFe, XmlNFe
+    from backend.documentos_nfe import gravar_documentos
+
+    colunas = {row[1] for row in conn.exec_driver_sql("PRAGMA table_info(nfe_documentos)")}
+    if "dados" not in colunas:
+        return
+
+    # As tabelas novas (vazias, de create_all) referenciam nfe_documentos:
+    # são recriadas depois da troca para não seguirem o RENAME
+    conn.exec_driver_sql("DROP TABLE IF EXISTS nfe_xml")
+    conn.exec_driver_sql("DROP TABLE IF EXISTS nfe_duplicatas")
+    for (indice,) in conn.exec_driver_sql(
+        "SELECT name FROM sqlite_master WHERE type = 'index' "
+        "AND tbl_name = 'nfe_documentos' AND sql IS NOT NULL"
+    ).all():
+        conn.exec_driver_sql(f"DROP INDEX {indice}")
+    conn.exec_driver_sql("ALTER TABLE nfe_documentos RENAME TO nfe_documentos_antigo")
+    for tabela in (DocumentoNFe.__table__, DuplicataNFe.__table__, XmlNFe.__table__):
+        tabela.create(conn)
+
+    documentos = []
+    for dados, xml in conn.exec_driver_sql(
+        "SELECT dados, xml FROM nfe_documentos_antigo ORDER BY nsu"
+    ):
+        documento = json.loads(dados or "{}")
+        documento["xml"] = xml
+        documentos.append(documento)
+
+    sessao = Session(bind=conn)
+    try:
+        gravar_documentos(sessao, documentos)
+    finally:
+        sessao.close()
+    conn.exec_driver_sql("DROP TABLE nfe_documentos_antigo")
+
+
+def _m009_indice_contas_pendentes(conn):
+    """Índice (situacao, data, id): contas pendentes sem percorrer lancamentos inteira"""
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_lancamentos_situacao_data "
+        "ON lancamentos (situacao, data, id)"
+    ))
+    conn.execute(text("ANALYZE lancamentos"))
+
+
+def _m010_resumos_mensais(conn):
+    """
+    Refaz resumos_mensais a partir dos lançamentos existentes
+
+    O AtualizadorResumos aplica diferenças sobre os resumos gravados, mas
+    bancos antigos têm resumos desatualizados (escritas pela web não os
+    atualizavam) e sem o saldo encadeado entre os meses.
+    """
+    from backend.resumos import reconstruir_resumos_mensais
+    reconstruir_resumos_mensais(conn)
+
+
+# (versão, descrição, função) - nunca altere uma migração já publicada,
+# adicione uma nova no final da lista
+MIGRACOES = [
+    (1, "Índices compostos em lancamentos", _m001_indices_lancamentos),
+    (2, "Carga inicial de saldos_diarios", _m002_saldos_diarios),
+    (3, "Hash de conteúdo em lancamentos", _m003_hash_conteudo),
+    (4, "Busca textual (FTS5) no item dos lançamentos", _m004_busca_texto),
+    (5, "Índice para paginação por cursor", _m005_indice_paginacao),
+    (6, "Nome único em itens_fornecedores", _m006_itens_fornecedores_unicos),
+    (7, "Valores em centavos inteiros", _m007_valores_em_centavos),
+    (8, "Documentos NFe com metadados indexados", _m008_documentos_nfe),
+    (9, "Índice para contas pendentes em ordem de data", _m009_indice_contas_pendentes),
+    (10, "Reconstrução de resumos_mensais", _m010_resumos_mensais),
+]
+
+
+def versoes_aplicadas(conn):
+    """Retorna o conjunto de versões já aplicadas"""
+    conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS schema_versao ("
+        "versao INTEGER PRIMARY KEY, "
+        "descricao VARCHAR(200), "
+        "aplicada_em DATETIME)"
+    ))
+    return {row[0] for row in conn.execute(text("SELECT versao FROM schema_versao"))}
+
+
+def aplicar_migracoes(engine):
+    """
+    Aplica, em ordem, as migrações ainda não registradas
+
+    Cada migração roda na sua própria transação junto com o registro da versão.
+
+    Returns:
+        Lista das versões aplicadas nesta execução
+    """
+    with engine.begin() as conn:
+        aplicadas = versoes_aplicadas(conn)
+
+    novas = []
+    for versao, descricao, migracao in MIGRACOES:
+        if versao in aplicadas:
+            continue
+        with engine.begin() as conn:
+            migracao(conn)
+            conn.execute(
+                text("INSERT INTO schema_versao (versao, descricao, aplicada_em) VALUES (:v, :d, :a)"),
+                {"v": versao, "d": descricao, "a": datetime.utcnow()}
+            )
+        print(f"  🛠️ Migração {versao:03d} aplicada: {descricao}")
+        novas.append(versao)
+
+    return novas
+
+
+# ============== VERIFICAÇÃO DE PLANOS ==============
+
+# Linha de plano que percorre lancamentos inteira (com ou sem índice);
+# lancamentos_fts e buscas por índice (SEARCH) não contam
+VARREDURA_LANCAMENTOS = re.compile(r"^SCAN lancamentos\b")
+
+# Formatos das consultas quentes de main.py que nunca devem voltar a
+# fazer varredura completa em lancamentos
+CONSULTAS_QUENTES = {
+    "lancamentos do mês": (
+        "SELECT * FROM lancamentos WHERE ano = :ano AND mes = :mes ORDER BY data, id",
+        {"ano": 2025, "mes": 1},
+    ),
+    "fluxo de caixa do mês": (
+        "SELECT * FROM lancamentos WHERE mes = :mes AND ano = :ano ORDER BY dia",
+        {"ano": 2025, "mes": 1},
+    ),
+    "agregado mensal": (
+        "SELECT mes, tipo, sum(valor), count(id) FROM lancamentos "
+        "WHERE ano = :ano AND situacao != 'OBSOLETO' GROUP BY mes, tipo",
+        {"ano": 2025},
+    ),
+    "top despesas do mês": (
+        "SELECT classificacao_nome, sum(valor) FROM lancamentos "
+        "WHERE tipo = 'SAIDA' AND mes = :mes AND ano = :ano GROUP BY classificacao_nome",
+        {"ano": 2025, "mes": 1},
+    ),
+    "contas pendentes": (
+        "SELECT * FROM lancamentos WHERE situacao = 'NAO_BAIXADA' ORDER BY data, id",
+        {},
+    ),
+    "lançamentos do dia": (
+        "SELECT sum(valor) FROM lancamentos "
+        "WHERE tipo = 'ENTRADA' AND data = :data AND situacao = 'BAIXADA'",
+        {"data": "2025-01-02"},
+    ),
+    "intervalo de datas": (
+        "SELECT * FROM lancamentos WHERE data >= :inicio AND data <= :fim ORDER BY data, id",
+        {"inicio": "2025-01-01", "fim": "2025-01-31"},
+    ),
+    "filtro por classificação": (
+        "SELECT * FROM lancamentos WHERE classificacao_nome = :nome AND ano = :ano",
+        {"nome": "MATÉRIA-PRIMA", "ano": 2025},
+    ),
+    "duplicata na importação": (
+        "SELECT id FROM lancamentos WHERE hash_conteudo = :hash",
+        {"hash": "0" * 40},
+    ),
+    "página seguinte (cursor)": (
+        "SELECT * FROM lancamentos WHERE (data, id) > (:data, :id) ORDER BY data, id LIMIT 501",
+        {"data": "2025-06-01", "id": 0},
+    ),
+    "filtro por item": (
+        "SELECT * FROM lancamentos WHERE id IN "
+        "(SELECT rowid FROM lancamentos_fts WHERE item LIKE :padrao) ORDER BY data, id",
+        {"padrao": "%FORNECEDOR%"},
+    ),
+}
+
+
+def verificar_planos_consulta(engine, consultas=None):
+    """
+    Roda EXPLAIN QUERY PLAN nas consultas quentes
+
+    Returns:
+        Dict {nome: [linhas do plano]} apenas das consultas que percorrem
+        lancamentos inteira (SCAN, mesmo que por um índice de cobertura)
+    """
+    consultas = consultas or CONSULTAS_QUENTES
+    regressoes = {}
+
+    with engine.connect() as conn:
+        for nome, (sql, params) in consultas.items():
+            plano = [row[3] for row in conn.execute(text(f"EXPLAIN QUERY PLAN {sql}"), params)]
+            if any(VARREDURA_LANCAMENTOS.match(linha) for linha in plano):
+                regressoes[nome] = plano
+
+    return regressoes
+
+
+def banco_verificacao(linhas=20000, seed=42):
+    """
+    Banco SQLite temporário com `linhas` lançamentos aleatórios e todas as
+    migrações aplicadas (índices, FTS5 e ANALYZE), para conferir os planos
+    sem tocar no banco de dados real
+
+    Returns:
+        (caminho, engine)
+    """
+    import os
+    import random
+    import tempfile
+    from datetime import date, timedelta
+    from sqlalchemy import create_engine, insert
+    from backend.database import Base, Lancamento
+
+    fd, caminho = tempfile.mkstemp(suffix=".db", prefix="finco_planos_")
+    os.close(fd)
+    engine = create_engine(f"sqlite:///{caminho}")
+    Base.metadata.create_all(bind=engine)
+
+    rnd = random.Random(seed)
+    inicio = date(2023, 1, 1)
+    lote = []
+    for _ in range(linhas):
+        data_lanc = inicio + timedelta(days=rnd.randint(0, 3 * 365))
+        tipo = "ENTRADA" if rnd.random() < 0.1 else "SAIDA"
+        lote.append({
+            "data": data_lanc,
+            "dia": data_lanc.day,
+            "mes": data_lanc.month,
+            "ano": data_lanc.year,
+            "tipo": tipo,
+            "categoria": "OPERACIONAL",
+            "classificacao_nome": f"CLASSIF {rnd.randint(1, 70)}",
+            "item": f"FORNECEDOR {rnd.randint(1, 2000)}",
+            "valor": round(rnd.uniform(10, 5000), 2),
+            "situacao": rnd.choice(["BAIXADA"] * 8 + ["NAO_BAIXADA"] * 2 + ["OBSOLETO"]),
+        })
+    with engine.begin() as conn:
+        conn.execute(insert(Lancamento), lote)
+
+    aplicar_migracoes(engine)
+    return caminho, engine
+
+
+if __name__ == "__main__":
+    if "--verificar" in sys.argv:
+        import os
+
+        caminho, engine = banco_verificacao()
+        try:
+            regressoes = verificar_planos_consulta(engine)
+        finally:
+            engine.dispose()
+            os.unlink(caminho)
+        for nome in CONSULTAS_QUENTES:
+            print(f"  {'❌' if nome in regressoes else '✅'} {nome}")
+            for linha in regressoes.get(nome, []):
+                print(f"       {linha}")
+        sys.exit(1 if regressoes else 0)
+
+    from backend.database import criar_tabelas
+
+    criar_tabelas()
+    print("✅ Migrações aplicadas!")
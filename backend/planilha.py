@@ -0,0 +1,260 @@
+"""
+Sistema Financeiro Finco - Leitura das Abas Mensais
+Extrai os lançamentos de uma aba do Excel com operações vetorizadas do pandas
+
+Cada aba tem dois blocos lado a lado abaixo da linha de cabeçalho (DIA):
+ENTRADAS nas colunas 1-6 e SAÍDAS nas colunas 7-12, ambos no formato
+DIA | CATEGORIA | CLASSIFICAÇÃO | ITEM | VALOR | SITUAÇÃO.
+Cada bloco é tratado como uma fatia de colunas e limpo de uma vez; as
+classificações vêm do registro em memória (ver classificacoes_service).
+"""
+import calendar
+from datetime import date, datetime
+
+import numpy as np
+import openpyxl
+import pandas as pd
+from sqlalchemy import func, insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from backend.database import ItemFornecedor, Lancamento, calcular_hash_conteudo
+
+# Abas mensais da planilha de controle
+MESES_ABAS = ['JANEIRO', 'FEVEREIRO', 'MARÇO', 'ABRIL', 'MAIO', 'JUNHO',
+              'JULHO', 'AGOSTO', 'SETEMBRO', 'OUTUBRO', 'NOVEMBRO', 'DEZEMBRO']
+
+# Colunas usadas (A-M): a coluna A fica vazia, os blocos vão de B a M
+COLUNAS_USADAS = 13
+
+COLUNAS_BLOCO = ["dia", "categoria", "classificacao_nome", "item", "valor", "situacao"]
+
+# (tipo, primeira coluna do bloco)
+BLOCOS = [("ENTRADA", 1), ("SAIDA", 7)]
+
+COLUNAS_LANCAMENTO = [
+    "data", "dia", "mes", "ano", "tipo", "categoria",
+    "classificacao_id", "classificacao_nome", "item", "valor", "situacao", "hash_conteudo",
+]
+
+
+class LeitorPlanilha:
+    """
+    Abre a pasta de trabalho uma única vez e lê as abas sob demanda
+
+    .xlsx usa o modo somente leitura do openpyxl, que percorre as linhas
+    da aba em fluxo sem montar a planilha inteira na memória; .xls (formato
+    antigo) cai no pandas. Só as COLUNAS_USADAS são lidas.
+
+    Uso:
+        with LeitorPlanilha(arquivo, nome_arquivo) as leitor:
+            for aba in leitor.abas_mensais():
+                df = leitor.ler(aba)
+    """
+
+    def __init__(self, arquivo, nome_arquivo=""):
+        self.xls = str(nome_arquivo).lower().endswith(".xls")
+        if self.xls:
+            self._livro = pd.ExcelFile(arquivo)
+            self.abas = list(self._livro.sheet_names)
+        else:
+            self._livro = openpyxl.load_workbook(arquivo, read_only=True, data_only=True)
+            self.abas = list(self._livro.sheetnames)
+
+    def abas_mensais(self):
+        """Abas de MESES_ABAS que existem na pasta de trabalho, em ordem de mês"""
+        return [aba for aba in MESES_ABAS if aba in self.abas]
+
+    def ler(self, aba):
+        """DataFrame da aba (equivalente a read_excel com header=None)"""
+        if self.xls:
+            return pd.read_excel(
+                self._livro, sheet_name=aba, header=None,
+                usecols=lambda coluna: coluna < COLUNAS_USADAS
+            )
+        linhas = self._livro[aba].iter_rows(max_col=COLUNAS_USADAS, values_only=True)
+        return pd.DataFrame(linhas)
+
+    def fechar(self):
+        self._livro.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.fechar()
+
+
+def linha_cabecalho(df):
+    """Posição da primeira linha que contém 'DIA' (None se não houver)"""
+    celulas = df.to_numpy(dtype=str)
+    tem_dia = (np.char.find(celulas, "DIA") >= 0).any(axis=1)
+    if not tem_dia.any():
+        return None
+    return int(tem_dia.argmax())
+
+
+def _blocos(corpo):
+    """Empilha os blocos ENTRADA e SAIDA num único DataFrame com as COLUNAS_BLOCO"""
+    blocos = []
+    for tipo, inicio in BLOCOS:
+        # O bloco precisa ao menos da coluna de valor
+        if corpo.shape[1] <= inicio + 4:
+            continue
+        bloco = corpo.iloc[:, inicio:inicio + 6]
+        bloco = bloco.set_axis(COLUNAS_BLOCO[:bloco.shape[1]], axis=1)
+        blocos.append(bloco.assign(tipo=tipo))
+    if not blocos:
+        return None
+    return pd.concat(blocos)
+
+
+def extrair_lancamentos(df, mes_num, ano, classificacoes):
+    """
+    Extrai os lançamentos de uma aba mensal
+
+    Args:
+        df: DataFrame da aba lido com header=None
+        mes_num: Mês da aba (1-12)
+        ano: Ano dos lançamentos
+        classificacoes: Dicionário nome -> id (ver RegistroClassificacoes.mapa_ids)
+
+    Returns:
+        DataFrame com COLUNAS_LANCAMENTO (vazio se não houver lançamentos),
+        ou None se a aba não tiver linha de cabeçalho
+    """
+    cabecalho = linha_cabecalho(df)
+    if cabecalho is None:
+        return None
+
+    lancamentos = _blocos(df.iloc[cabecalho + 1:])
+    if lancamentos is None:
+        return pd.DataFrame(columns=COLUNAS_LANCAMENTO)
+
+    valor = pd.to_numeric(lancamentos["valor"], errors="coerce")
+    dia = pd.to_numeric(lancamentos["dia"], errors="coerce")
+    lancamentos = lancamentos[(valor > 0) & dia.notna()]
+    if lancamentos.empty:
+        return pd.DataFrame(columns=COLUNAS_LANCAMENTO)
+
+    # Mesma ordem da planilha: linha a linha, entrada antes da saída
+    lancamentos = lancamentos.sort_index(kind="stable").reset_index(drop=True)
+    lancamentos["valor"] = pd.to_numeric(lancamentos["valor"]).astype(float)
+    lancamentos["dia"] = pd.to_numeric(lancamentos["dia"]).astype(int)
+    lancamentos["mes"] = mes_num
+    lancamentos["ano"] = ano
+
+    # Dias inexistentes no mês (ex.: 31/02) são descartados
+    ultimo_dia = calendar.monthrange(ano, mes_num)[1]
+    lancamentos = lancamentos[lancamentos["dia"].between(1, ultimo_dia)]
+    lancamentos["data"] = lancamentos["dia"].map({d: date(ano, mes_num, d) for d in range(1, ultimo_dia + 1)})
+
+    # Textos: str(valor).strip(), células vazias viram None
+    if "situacao" not in lancamentos:
+        lancamentos["situacao"] = None
+    textos = ["categoria", "classificacao_nome", "item", "situacao"]
+    limpos = lancamentos[textos].astype("string").apply(lambda coluna: coluna.str.strip())
+    vazios = limpos.isna() | (limpos == "")
+
+    lancamentos["item"] = limpos["item"].astype(object).where(limpos["item"].notna(), None)
+    lancamentos["categoria"] = limpos["categoria"].mask(vazios["categoria"], "OPERACIONAL").astype(object)
+    lancamentos["classificacao_nome"] = (
+        limpos["classificacao_nome"].astype(object).where(~vazios["classificacao_nome"], None)
+    )
+    lancamentos["situacao"] = (
+        limpos["situacao"].mask(vazios["situacao"], "BAIXADA")
+        .str.replace(" ", "_", regex=False).str.replace("Ã", "A", regex=False).str.upper()
+        .astype(object)
+    )
+
+    classificacao_id = lancamentos["classificacao_nome"].map(classificacoes).astype("Int64")
+    lancamentos["classificacao_id"] = classificacao_id.astype(object).where(classificacao_id.notna(), None)
+    lancamentos["hash_conteudo"] = [
+        calcular_hash_conteudo(*chave) for chave in zip(
+            lancamentos["data"], lancamentos["tipo"], lancamentos["item"], lancamentos["valor"]
+        )
+    ]
+    return lancamentos[COLUNAS_LANCAMENTO].reset_index(drop=True)
+
+
+def para_registros(lancamentos):
+    """Converte o DataFrame de extrair_lancamentos em dicts prontos para inserir_lancamentos"""
+    return lancamentos.to_dict("records")
+
+
+def inserir_lancamentos(db, registros):
+    """
+    Insere os lançamentos em INSERTs de várias linhas (VALUES (...), (...))
+
+    Com RETURNING o SQLAlchemy agrupa as linhas em lotes ("insertmanyvalues");
+    um comando por linha (executemany) faria o trigger do índice FTS (ver
+    busca_texto) gravar um segmento novo a cada lançamento.
+
+    Returns:
+        Lista dos ids inseridos
+    """
+    if not registros:
+        return []
+    return db.execute(insert(Lancamento).returning(Lancamento.id), registros).scalars().all()
+
+
+def usos_itens(lancamentos):
+    """
+    Uso dos itens/fornecedores num DataFrame de extrair_lancamentos
+
+    Cada nome conta uma vez por lançamento; a classificação é a última não
+    vazia da planilha.
+
+    Returns:
+        Lista de (nome, vezes, classificacao_id), para gravar_usos_itens e
+        para o índice de autocomplete (ver IndiceAutocomplete.registrar_usos)
+    """
+    itens = lancamentos["item"].dropna().astype(str).str.upper()
+    itens = itens[~itens.isin(["", "0", "NAN"])]
+    if itens.empty:
+        return []
+
+    vezes_por_nome = itens.value_counts(sort=False).to_dict()
+    classificacao_por_nome = {
+        nome: classificacao_id
+        for nome, classificacao_id in zip(itens, lancamentos["classificacao_id"].loc[itens.index])
+        if classificacao_id is not None
+    }
+    return [
+        (nome, vezes, classificacao_por_nome.get(nome))
+        for nome, vezes in vezes_por_nome.items()
+    ]
+
+
+def gravar_usos_itens(db, usos):
+    """
+    Soma os usos em itens_fornecedores com um único comando
+    INSERT ... ON CONFLICT(nome) DO UPDATE (executado para todos os nomes)
+
+    Nomes novos são criados; nos existentes vezes_usado é somado, ultima_vez
+    passa a ser agora e a classificação só muda se o uso trouxer uma.
+
+    Args:
+        usos: Iterável de (nome, vezes, classificacao_id); nomes repetidos
+            são somados, valendo a última classificação não vazia
+    """
+    por_nome = {}
+    for nome, vezes, classificacao_id in usos:
+        vezes_anteriores, classificacao_anterior = por_nome.get(nome, (0, None))
+        por_nome[nome] = (vezes_anteriores + vezes, classificacao_id or classificacao_anterior)
+    if not por_nome:
+        return
+
+    agora = datetime.utcnow()
+    comando = sqlite_insert(ItemFornecedor)
+    comando = comando.on_conflict_do_update(
+        index_elements=[ItemFornecedor.nome],
+        set_={
+            "vezes_usado": func.coalesce(ItemFornecedor.vezes_usado, 0) + comando.excluded.vezes_usado,
+            "ultima_vez": comando.excluded.ultima_vez,
+            "classificacao_id": func.coalesce(comando.excluded.classificacao_id, ItemFornecedor.classificacao_id),
+        }
+    )
+    db.execute(comando, [
+        {"nome": nome, "vezes_usado": vezes, "classificacao_id": classificacao_id, "ultima_vez": agora}
+        for nome, (vezes, classificacao_id) in por_nome.items()
+    ])
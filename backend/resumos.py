@@ -0,0 +1,353 @@
+"""
+Sistema Financeiro Finco - Manutenção Incremental dos Resumos
+Atualiza as tabelas resumos_mensais e saldos_diarios a partir da diferença de cada escrita
+
+Em vez de recalcular o ano inteiro (calcular_resumos_mensais no importador),
+cada escrita registra a contribuição do lançamento antes e depois da
+alteração; a diferença é aplicada no resumo do mês e no saldo do dia
+afetados, e o saldo encadeado (saldo_inicial/saldo_final) é deslocado nos
+meses e dias seguintes do ano. Tudo acontece na mesma sessão, e portanto
+na mesma transação, da escrita.
+"""
+from collections import defaultdict
+from datetime import date, datetime
+from decimal import Decimal
+from types import SimpleNamespace
+
+from sqlalchemy import text, update, delete, insert, select
+
+from backend.classificacoes_service import registro_classificacoes
+from backend.database import ResumoMensal, SaldoDiario, em_reais
+
+# Colunas de ResumoMensal alimentadas por lançamento
+CAMPOS_RESUMO = [
+    "total_entradas", "total_saidas",
+    "custo_fixo", "custo_variavel", "despesa_fixa", "despesa_variavel", "impostos",
+    "fluxo_operacional", "fluxo_financeiro", "fluxo_investimento",
+]
+
+# Tipo de classificação -> coluna do resumo (apenas para SAIDA)
+CAMPO_POR_TIPO_CLASSIFICACAO = {
+    "CUSTO_FIXO": "custo_fixo",
+    "CUSTO_VARIAVEL": "custo_variavel",
+    "DESPESA_FIXA": "despesa_fixa",
+    "DESPESA_VARIAVEL": "despesa_variavel",
+    "IMPOSTO": "impostos",
+}
+
+# Categoria -> coluna de fluxo
+CAMPO_POR_CATEGORIA = {
+    "OPERACIONAL": "fluxo_operacional",
+    "FINANCEIRO": "fluxo_financeiro",
+    "INVESTIMENTO": "fluxo_investimento",
+}
+
+# Colunas de SaldoDiario alimentadas por lançamento
+CAMPOS_SALDO_DIARIO = [
+    "total_entradas", "total_saidas", "saldo_do_dia",
+    "fluxo_operacional", "fluxo_financeiro", "fluxo_investimento",
+]
+
+
+class AtualizadorResumos:
+    """
+    Acumula as contribuições de lançamentos e aplica nos resumos mensais
+
+    Uso:
+        resumos = AtualizadorResumos(db)
+        resumos.remover(lancamento)    # estado antes da alteração
+        ... altera o lançamento ...
+        resumos.adicionar(lancamento)  # estado depois da alteração
+        resumos.aplicar()
+        db.commit()
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self.deltas = defaultdict(lambda: defaultdict(Decimal))  # (ano, mes) -> campo -> delta
+        self.deltas_dia = defaultdict(lambda: defaultdict(Decimal))  # data -> campo -> delta
+
+    def _tipo_classificacao(self, classificacao_id):
+        """Tipo (CUSTO_FIXO, IMPOSTO...) da classificação, pelo registro em memória"""
+        info = registro_classificacoes.por_id(self.db, classificacao_id)
+        return info.tipo if info else None
+
+    def _registrar(self, lancamento, sinal):
+        """Soma (sinal=1) ou subtrai (sinal=-1) a contribuição do lançamento"""
+        if lancamento is None or not lancamento.valor:
+            return
+
+        delta = self.deltas[(lancamento.ano, lancamento.mes)]
+        valor = em_reais(lancamento.valor) * sinal
+
+        if lancamento.tipo == "ENTRADA":
+            delta["total_entradas"] += valor
+        elif lancamento.tipo == "SAIDA":
+            delta["total_saidas"] += valor
+            campo_tipo = CAMPO_POR_TIPO_CLASSIFICACAO.get(self._tipo_classificacao(lancamento.classificacao_id))
+            if campo_tipo:
+                delta[campo_tipo] += valor
+
+        campo_fluxo = CAMPO_POR_CATEGORIA.get(lancamento.categoria)
+        if campo_fluxo:
+            delta[campo_fluxo] += valor if lancamento.tipo == "ENTRADA" else -valor
+
+        delta_dia = self.deltas_dia[lancamento.data]
+        if lancamento.tipo == "ENTRADA":
+            delta_dia["total_entradas"] += valor
+            delta_dia["saldo_do_dia"] += valor
+        elif lancamento.tipo == "SAIDA":
+            delta_dia["total_saidas"] += valor
+            delta_dia["saldo_do_dia"] -= valor
+        if campo_fluxo:
+            delta_dia[campo_fluxo] += valor if lancamento.tipo == "ENTRADA" else -valor
+
+    def adicionar(self, lancamento):
+        """Registra um lançamento novo (ou o estado depois de uma alteração)"""
+        self._registrar(lancamento, 1)
+
+    def remover(self, lancamento):
+        """Registra um lançamento excluído (ou o estado antes de uma alteração)"""
+        self._registrar(lancamento, -1)
+
+    def adicionar_registros(self, registros):
+        """Registra lançamentos inseridos em lote (dicts com as colunas de Lancamento)"""
+        for registro in registros:
+            self._registrar(SimpleNamespace(**registro), 1)
+
+    def descartar_ano(self, ano):
+        """Remove os resumos do ano (usado quando todos os lançamentos do ano são apagados)"""
+        self.db.query(ResumoMensal).filter(ResumoMensal.ano == ano).delete()
+        self.db.query(SaldoDiario).filter(SaldoDiario.ano == ano).delete()
+        for chave in [c for c in self.deltas if c[0] == ano]:
+            del self.deltas[chave]
+        for chave in [d for d in self.deltas_dia if d.year == ano]:
+            del self.deltas_dia[chave]
+
+    def aplicar(self):
+        """Aplica os deltas acumulados nos resumos mensais, nos saldos diários e no saldo encadeado"""
+        anos = defaultdict(dict)
+        for (ano, mes), delta in self.deltas.items():
+            if any(delta.values()):
+                anos[ano][mes] = delta
+
+        for ano, deltas_mes in anos.items():
+            self._aplicar_ano(ano, deltas_mes)
+
+        anos_dia = defaultdict(dict)
+        for data_dia, delta in self.deltas_dia.items():
+            if any(delta.values()):
+                anos_dia[data_dia.year][data_dia] = delta
+
+        for ano, deltas_dia in anos_dia.items():
+            self._aplicar_dias(ano, deltas_dia)
+
+        self.deltas.clear()
+        self.deltas_dia.clear()
+
+    def _aplicar_ano(self, ano, deltas_mes):
+        """Aplica os deltas de um ano, deslocando o saldo dos meses seguintes"""
+        resumos = {
+            r.mes: r for r in self.db.query(ResumoMensal).filter(ResumoMensal.ano == ano).all()
+        }
+
+        deslocamento = 0
+        saldo_anterior = 0
+
+        for mes in range(1, 13):
+            delta = deltas_mes.get(mes)
+            resumo = resumos.get(mes)
+
+            if resumo is None:
+                if not delta:
+                    continue
+                resumo = ResumoMensal(
+                    mes=mes,
+                    ano=ano,
+                    saldo_inicial=saldo_anterior,
+                    saldo_final=saldo_anterior,
+                    **{campo: 0 for campo in CAMPOS_RESUMO}
+                )
+                self.db.add(resumo)
+            elif deslocamento:
+                resumo.saldo_inicial = (resumo.saldo_inicial or 0) + deslocamento
+                resumo.saldo_final = (resumo.saldo_final or 0) + deslocamento
+
+            if delta:
+                for campo, valor in delta.items():
+                    setattr(resumo, campo, (getattr(resumo, campo) or 0) + valor)
+
+                liquido = delta.get("total_entradas", 0) - delta.get("total_saidas", 0)
+                resumo.saldo_final = (resumo.saldo_final or 0) + liquido
+                deslocamento += liquido
+
+            saldo_anterior = resumo.saldo_final or 0
+
+    def _aplicar_dias(self, ano, deltas_dia):
+        """
+        Aplica os deltas diários de um ano em saldos_diarios
+
+        Carrega os dias do ano (no máximo 366 linhas), refaz o saldo encadeado
+        a partir do primeiro dia alterado e grava só as linhas que mudaram:
+        um UPDATE em lote, um INSERT em lote e um DELETE.
+        """
+        primeiro = min(deltas_dia)
+        colunas = [getattr(SaldoDiario, campo) for campo in CAMPOS_SALDO_DIARIO]
+        existentes = {
+            row.data: row for row in self.db.execute(
+                select(SaldoDiario.id, SaldoDiario.data, SaldoDiario.saldo_inicial,
+                       SaldoDiario.saldo_final, *colunas)
+                .where(SaldoDiario.data >= date(ano, 1, 1), SaldoDiario.data <= date(ano, 12, 31))
+                .order_by(SaldoDiario.data)
+            )
+        }
+
+        anteriores = [d for d in existentes if d < primeiro]
+        saldo_anterior = (existentes[anteriores[-1]].saldo_final or 0) if anteriores else 0
+
+        agora = datetime.utcnow()
+        atualizar, inserir, excluir = [], [], []
+
+        for data_dia in sorted(set(d for d in existentes if d >= primeiro) | set(deltas_dia)):
+            row = existentes.get(data_dia)
+            delta = deltas_dia.get(data_dia, {})
+
+            valores = {
+                campo: ((getattr(row, campo) or 0) if row else 0) + delta.get(campo, 0)
+                for campo in CAMPOS_SALDO_DIARIO
+            }
+
+            # Dia sem movimento restante: remove a linha
+            if not valores["total_entradas"] and not valores["total_saidas"]:
+                if row:
+                    excluir.append(row.id)
+                continue
+
+            valores["saldo_inicial"] = saldo_anterior
+            valores["saldo_final"] = saldo_anterior + valores["saldo_do_dia"]
+            saldo_anterior = valores["saldo_final"]
+
+            if row is None:
+                inserir.append(dict(
+                    valores, data=data_dia, dia=data_dia.day, mes=data_dia.month,
+                    ano=data_dia.year, atualizado_em=agora
+                ))
+            elif delta or (row.saldo_inicial or 0) != valores["saldo_inicial"]:
+                atualizar.append(dict(valores, id=row.id, atualizado_em=agora))
+
+        if atualizar:
+            self.db.execute(update(SaldoDiario), atualizar)
+        if inserir:
+            self.db.execute(insert(SaldoDiario), inserir)
+        if excluir:
+            self.db.execute(
+                delete(SaldoDiario).where(SaldoDiario.id.in_(excluir))
+                .execution_options(synchronize_session=False)
+            )
+
+
+def reconstruir_saldos_diarios(conn, ano=None):
+    """
+    Reconstrói saldos_diarios a partir de lancamentos com um único INSERT ... SELECT
+
+    Usado na migração inicial e no importador de linha de comando, que
+    gravam lançamentos sem passar pelo AtualizadorResumos.
+
+    Args:
+        conn: Conexão ou sessão SQLAlchemy
+        ano: Reconstrói apenas um ano (None = todos)
+    """
+    filtro = "WHERE ano = :ano" if ano else ""
+    params = {"ano": ano} if ano else {}
+
+    conn.execute(text(f"DELETE FROM saldos_diarios {filtro}"), params)
+    conn.execute(text(f"""
+        INSERT INTO saldos_diarios (
+            data, dia, mes, ano,
+            total_entradas, total_saidas, saldo_do_dia,
+            fluxo_operacional, fluxo_financeiro, fluxo_investimento,
+            saldo_inicial, saldo_final, atualizado_em
+        )
+        SELECT
+            data, dia, mes, ano,
+            entradas, saidas, entradas - saidas,
+            fluxo_op, fluxo_fin, fluxo_inv,
+            SUM(entradas - saidas) OVER ano_corrente - (entradas - saidas),
+            SUM(entradas - saidas) OVER ano_corrente,
+            :agora
+        FROM (
+            SELECT
+                data, MIN(dia) AS dia, MIN(mes) AS mes, MIN(ano) AS ano,
+                SUM(CASE WHEN tipo = 'ENTRADA' THEN valor ELSE 0 END) AS entradas,
+                SUM(CASE WHEN tipo = 'SAIDA' THEN valor ELSE 0 END) AS saidas,
+                SUM(CASE WHEN categoria = 'OPERACIONAL' THEN
+                    CASE WHEN tipo = 'ENTRADA' THEN valor ELSE -valor END ELSE 0 END) AS fluxo_op,
+                SUM(CASE WHEN categoria = 'FINANCEIRO' THEN
+                    CASE WHEN tipo = 'ENTRADA' THEN valor ELSE -valor END ELSE 0 END) AS fluxo_fin,
+                SUM(CASE WHEN categoria = 'INVESTIMENTO' THEN
+                    CASE WHEN tipo = 'ENTRADA' THEN valor ELSE -valor END ELSE 0 END) AS fluxo_inv
+            FROM lancamentos
+            {filtro}
+            GROUP BY data
+            HAVING entradas != 0 OR saidas != 0
+        )
+        WINDOW ano_corrente AS (PARTITION BY ano ORDER BY data ROWS UNBOUNDED PRECEDING)
+    """), {**params, "agora": datetime.utcnow()})
+
+
+def reconstruir_resumos_mensais(conn, ano=None):
+    """
+    Reconstrói resumos_mensais a partir de lancamentos com um único INSERT ... SELECT
+
+    O saldo encadeado (saldo_inicial/saldo_final) recomeça em zero a cada
+    ano, como em AtualizadorResumos._aplicar_ano.
+
+    Args:
+        conn: Conexão ou sessão SQLAlchemy
+        ano: Reconstrói apenas um ano (None = todos)
+    """
+    filtro = "WHERE ano = :ano" if ano else ""
+    filtro_lancamentos = "WHERE l.ano = :ano" if ano else ""
+    params = {"ano": ano} if ano else {}
+
+    def saida_do_tipo(tipo):
+        return f"SUM(CASE WHEN l.tipo = 'SAIDA' AND c.tipo = '{tipo}' THEN l.valor ELSE 0 END)"
+
+    def fluxo(categoria):
+        return (f"SUM(CASE WHEN l.categoria = '{categoria}' THEN "
+                f"CASE WHEN l.tipo = 'ENTRADA' THEN l.valor ELSE -l.valor END ELSE 0 END)")
+
+    conn.execute(text(f"DELETE FROM resumos_mensais {filtro}"), params)
+    conn.execute(text(f"""
+        INSERT INTO resumos_mensais (
+            mes, ano, total_entradas, total_saidas, saldo_inicial, saldo_final,
+            custo_fixo, custo_variavel, despesa_fixa, despesa_variavel, impostos,
+            fluxo_operacional, fluxo_financeiro, fluxo_investimento, atualizado_em
+        )
+        SELECT
+            mes, ano, entradas, saidas,
+            SUM(entradas - saidas) OVER ano_corrente - (entradas - saidas),
+            SUM(entradas - saidas) OVER ano_corrente,
+            custo_fixo, custo_variavel, despesa_fixa, despesa_variavel, impostos,
+            fluxo_op, fluxo_fin, fluxo_inv,
+            :agora
+        FROM (
+            SELECT
+                l.mes, l.ano,
+                SUM(CASE WHEN l.tipo = 'ENTRADA' THEN l.valor ELSE 0 END) AS entradas,
+                SUM(CASE WHEN l.tipo = 'SAIDA' THEN l.valor ELSE 0 END) AS saidas,
+                {saida_do_tipo('CUSTO_FIXO')} AS custo_fixo,
+                {saida_do_tipo('CUSTO_VARIAVEL')} AS custo_variavel,
+                {saida_do_tipo('DESPESA_FIXA')} AS despesa_fixa,
+                {saida_do_tipo('DESPESA_VARIAVEL')} AS despesa_variavel,
+                {saida_do_tipo('IMPOSTO')} AS impostos,
+                {fluxo('OPERACIONAL')} AS fluxo_op,
+                {fluxo('FINANCEIRO')} AS fluxo_fin,
+                {fluxo('INVESTIMENTO')} AS fluxo_inv
+            FROM lancamentos l
+            LEFT JOIN classificacoes c ON c.id = l.classificacao_id
+            {filtro_lancamentos}
+            GROUP BY l.ano, l.mes
+        )
+        WINDOW ano_corrente AS (PARTITION BY ano ORDER BY mes ROWS UNBOUNDED PRECEDING)
+    """), {**params, "agora": datetime.utcnow()})
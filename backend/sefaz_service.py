@@ -1,15 +1,22 @@
 """
 Sistema Financeiro Finco - Integração SEFAZ
 Consulta NFe destinadas ao CNPJ via Distribuição DFe
+
+As chamadas saem por um ClienteSefaz único no processo: o certificado
+PKCS#12 é decifrado uma vez e as conexões TLS (com certificado de cliente)
+ficam abertas entre as consultas, então paginar vários lotes de NSU não
+refaz o handshake a cada chamada.
 """
 
 import os
 import base64
 import gzip
-import tempfile
+import hashlib
+import threading
 from datetime import datetime
 from typing import List, Dict, Optional
-import xml.etree.ElementTree as ET
+
+from lxml import etree
 
 # Configurações
 CNPJ_FINCO = "21630948000109"
@@ -26,6 +33,70 @@ NS_NFE = "http://www.portalfiscal.inf.br/nfe"
 NS_DIST = "http://www.portalfiscal.inf.br/nfe/wsdl/NFeDistribuicaoDFe"
 NS_SOAP = "http://www.w3.org/2003/05/soap-envelope"
 
+# Headers das requisições SOAP
+HEADERS_SOAP = {
+    "Content-Type": "application/soap+xml; charset=utf-8",
+    "SOAPAction": "http://www.portalfiscal.inf.br/nfe/wsdl/NFeDistribuicaoDFe/nfeDistDFeInteresse"
+}
+
+# Timeout de cada chamada (segundos)
+TIMEOUT_SEFAZ = 60
+
+# Conexões mantidas abertas com a SEFAZ (as threads do pool "rede" de executores_service)
+CONEXOES_SEFAZ = 8
+
+
+class ClienteSefaz:
+    """
+    Sessão HTTP com a SEFAZ: SSLContext com o certificado de cliente + keep-alive
+
+    Uso:
+        response = obter_cliente(pkcs12_data, senha).post(url, envelope)
+    """
+
+    def __init__(self, pkcs12_data: bytes, senha: str):
+        import requests
+        from requests_pkcs12 import Pkcs12Adapter
+
+        self.sessao = requests.Session()
+        self.sessao.headers.update(HEADERS_SOAP)
+        self.sessao.mount("https://", Pkcs12Adapter(
+            pkcs12_data=pkcs12_data,
+            pkcs12_password=senha,
+            pool_connections=len(SEFAZ_URLS),
+            pool_maxsize=CONEXOES_SEFAZ,
+        ))
+
+    def post(self, url: str, envelope: str):
+        """Envia o envelope SOAP reaproveitando uma conexão aberta"""
+        return self.sessao.post(url, data=envelope.encode('utf-8'), timeout=TIMEOUT_SEFAZ)
+
+    def fechar(self):
+        self.sessao.close()
+
+
+_cliente = None
+_cliente_chave = None
+_cliente_lock = threading.Lock()
+
+
+def obter_cliente(pkcs12_data: bytes, senha: str) -> ClienteSefaz:
+    """
+    ClienteSefaz do processo, criado na primeira consulta
+
+    Só é recriado se o certificado ou a senha mudarem.
+    """
+    global _cliente, _cliente_chave
+
+    chave = (hashlib.sha256(pkcs12_data).digest(), senha)
+    with _cliente_lock:
+        if _cliente is None or _cliente_chave != chave:
+            if _cliente is not None:
+                _cliente.fechar()
+            _cliente = ClienteSefaz(pkcs12_data, senha)
+            _cliente_chave = chave
+        return _cliente
+
 
 class SefazService:
     """Serviço de integração com SEFAZ para consulta de NFe"""
@@ -45,43 +116,37 @@ class SefazService:
         # Tentar obter certificado do Base64 primeiro
         self.certificado_base64 = os.getenv("CERTIFICADO_BASE64", "")
         self.certificado_path = None
-        self._temp_cert_file = None
+        self._certificado_bytes = None
         
         if self.certificado_base64:
-            # Decodificar Base64 e salvar em arquivo temporário
+            # Decodificar Base64 em memória (sem arquivo temporário)
             self._preparar_certificado_base64()
         else:
             # Fallback para arquivo direto
             self.certificado_path = certificado_path or os.getenv("CERTIFICADO_PATH", "/etc/secrets/certificado.pfx")
     
     def _preparar_certificado_base64(self):
-        """Decodifica o certificado Base64 e salva em arquivo temporário"""
+        """Decodifica o certificado Base64"""
         try:
-            # Decodificar Base64
-            cert_bytes = base64.b64decode(self.certificado_base64)
-            
-            # Criar arquivo temporário
-            self._temp_cert_file = tempfile.NamedTemporaryFile(
-                mode='wb', 
-                suffix='.pfx', 
-                delete=False
-            )
-            self._temp_cert_file.write(cert_bytes)
-            self._temp_cert_file.close()
-            
-            self.certificado_path = self._temp_cert_file.name
-            
+            self._certificado_bytes = base64.b64decode(self.certificado_base64)
         except Exception as e:
             print(f"Erro ao preparar certificado Base64: {e}")
-            self.certificado_path = None
+            self._certificado_bytes = None
     
     def _certificado_configurado(self) -> bool:
         """Verifica se o certificado está configurado corretamente"""
         if self.certificado_base64:
-            return bool(self.certificado_path and os.path.exists(self.certificado_path))
+            return bool(self._certificado_bytes)
         else:
             return bool(self.certificado_path and os.path.exists(self.certificado_path))
     
+    def _cliente(self) -> ClienteSefaz:
+        """ClienteSefaz do processo para o certificado configurado"""
+        if self._certificado_bytes is None:
+            with open(self.certificado_path, 'rb') as f:
+                self._certificado_bytes = f.read()
+        return obter_cliente(self._certificado_bytes, self.certificado_senha)
+    
     def get_status(self) -> Dict:
         """Retorna status da configuração"""
         return {
@@ -187,7 +252,7 @@ class SefazService:
             }
         
         # Verificar se certificado existe
-        if not self.certificado_path or not os.path.exists(self.certificado_path):
+        if not self._certificado_configurado():
             return {
                 "success": False,
                 "error": "Certificado não configurado. Configure CERTIFICADO_BASE64 no Render."
@@ -203,21 +268,8 @@ class SefazService:
             # Criar envelope SOAP
             envelope = self._criar_envelope_dist_nsu(ultimo_nsu)
             
-            # Headers da requisição
-            headers = {
-                "Content-Type": "application/soap+xml; charset=utf-8",
-                "SOAPAction": "http://www.portalfiscal.inf.br/nfe/wsdl/NFeDistribuicaoDFe/nfeDistDFeInteresse"
-            }
-            
-            # Fazer requisição com certificado
-            response = requests_pkcs12.post(
-                self.url,
-                data=envelope.encode('utf-8'),
-                headers=headers,
-                pkcs12_filename=self.certificado_path,
-                pkcs12_password=self.certificado_senha,
-                timeout=60
-            )
+            # Fazer requisição com certificado (sessão compartilhada)
+            response = self._cliente().post(self.url, envelope)
             
             if response.status_code != 200:
                 return {
@@ -252,7 +304,7 @@ class SefazService:
                 "error": "Biblioteca requests_pkcs12 não instalada"
             }
         
-        if not self.certificado_path or not os.path.exists(self.certificado_path):
+        if not self._certificado_configurado():
             return {
                 "success": False,
                 "error": "Certificado não configurado. Configure CERTIFICADO_BASE64 no Render."
@@ -261,19 +313,7 @@ class SefazService:
         try:
             envelope = self._criar_envelope_cons_chave(chave_nfe)
             
-            headers = {
-                "Content-Type": "application/soap+xml; charset=utf-8",
-                "SOAPAction": "http://www.portalfiscal.inf.br/nfe/wsdl/NFeDistribuicaoDFe/nfeDistDFeInteresse"
-            }
-            
-            response = requests_pkcs12.post(
-                self.url,
-                data=envelope.encode('utf-8'),
-                headers=headers,
-                pkcs12_filename=self.certificado_path,
-                pkcs12_password=self.certificado_senha,
-                timeout=60
-            )
+            response = self._cliente().post(self.url, envelope)
             
             if response.status_code != 200:
                 return {
@@ -300,42 +340,22 @@ class SefazService:
             Dict com dados parseados
         """
         try:
-            # Remover BOM se existir
-            if xml_response.startswith('\ufeff'):
-                xml_response = xml_response[1:]
-            
-            root = ET.fromstring(xml_response)
+            root = _ler_xml(xml_response)
             
-            # Buscar retorno
-            # O retorno pode estar em diferentes namespaces
-            ret_dist = None
-            for elem in root.iter():
-                if 'retDistDFeInt' in elem.tag:
-                    ret_dist = elem
-                    break
-            
-            if ret_dist is None:
+            # O retorno vem dentro do envelope SOAP (nfeDistDFeInteresseResult)
+            encontrados = XPATH_RET_DIST(root)
+            if not encontrados:
                 return {
                     "success": False,
                     "error": "Resposta inválida da SEFAZ"
                 }
+            ret_dist = encontrados[0]
             
             # Extrair status
-            cStat = None
-            xMotivo = None
-            ultNSU = None
-            maxNSU = None
-            
-            for elem in ret_dist.iter():
-                tag = elem.tag.split('}')[-1] if '}' in elem.tag else elem.tag
-                if tag == 'cStat':
-                    cStat = elem.text
-                elif tag == 'xMotivo':
-                    xMotivo = elem.text
-                elif tag == 'ultNSU':
-                    ultNSU = elem.text
-                elif tag == 'maxNSU':
-                    maxNSU = elem.text
+            cStat = ret_dist.findtext(f"{{{NS_NFE}}}cStat")
+            xMotivo = ret_dist.findtext(f"{{{NS_NFE}}}xMotivo")
+            ultNSU = ret_dist.findtext(f"{{{NS_NFE}}}ultNSU")
+            maxNSU = ret_dist.findtext(f"{{{NS_NFE}}}maxNSU")
             
             # Status 138 = Documento localizado
             # Status 137 = Nenhum documento localizado
@@ -350,25 +370,22 @@ class SefazService:
             # Extrair documentos
             documentos = []
             
-            for elem in ret_dist.iter():
-                tag = elem.tag.split('}')[-1] if '}' in elem.tag else elem.tag
-                if tag == 'docZip':
-                    # Documento está compactado em base64+gzip
-                    nsu = elem.get('NSU', '')
-                    schema = elem.get('schema', '')
+            for elem in XPATH_DOC_ZIP(ret_dist):
+                # Documento está compactado em base64+gzip
+                nsu = elem.get('NSU', '')
+                schema = elem.get('schema', '')
+                
+                try:
+                    # Decodificar base64 e descompactar gzip
+                    xml_doc = gzip.decompress(base64.b64decode(elem.text))
                     
-                    try:
-                        # Decodificar base64 e descompactar gzip
-                        compressed = base64.b64decode(elem.text)
-                        xml_doc = gzip.decompress(compressed).decode('utf-8')
-                        
-                        # Parsear documento
-                        doc_info = self._extrair_dados_nfe(xml_doc, nsu, schema)
-                        if doc_info:
-                            documentos.append(doc_info)
-                    except Exception as e:
-                        print(f"Erro ao processar documento NSU {nsu}: {e}")
-                        continue
+                    # Parsear documento
+                    doc_info = extrair_dados_nfe(xml_doc, nsu, schema)
+                    if doc_info:
+                        documentos.append(doc_info)
+                except Exception as e:
+                    print(f"Erro ao processar documento NSU {nsu}: {e}")
+                    continue
             
             return {
                 "success": True,
@@ -387,99 +404,194 @@ class SefazService:
             }
     
     def _extrair_dados_nfe(self, xml_doc: str, nsu: str, schema: str) -> Optional[Dict]:
-        """
-        Extrai dados relevantes de um XML de NFe
+        """Extrai dados relevantes de um XML de NFe (ver extrair_dados_nfe)"""
+        return extrair_dados_nfe(xml_doc, nsu, schema)
+
+
+# ============== LEITURA DOS DOCUMENTOS ==============
+#
+# Os XML são lidos pelo lxml (libxml2). O tipo do documento sai da tag raiz
+# e cada tipo tem uma única expressão XPath, compilada uma vez, que desce só
+# pelo eixo child até os campos usados: os itens (det), impostos e a
+# assinatura são pulados sem visitar os descendentes. Os nós devolvidos são
+# mapeados para o dicionário por (tag do pai, tag).
+
+NS = {"n": NS_NFE}
+
+XPATH_RET_DIST = etree.XPath("//n:retDistDFeInt", namespaces=NS)
+XPATH_DOC_ZIP = etree.XPath("n:loteDistDFeInt/n:docZip", namespaces=NS)
+XPATH_INF_NFE = etree.XPath("n:NFe/n:infNFe | n:infNFe", namespaces=NS)
+XPATH_INF_EVENTO = etree.XPath("n:evento/n:infEvento | n:infEvento", namespaces=NS)
+XPATH_CHAVE_PROTOCOLO = etree.XPath("n:protNFe/n:infProt/n:chNFe/text()", namespaces=NS)
+
+
+def _tag(local):
+    return f"{{{NS_NFE}}}{local}"
+
+
+def _campos(caminhos):
+    """{'pai/filho': campo} -> (XPath compilado, {(tag do pai, tag): campo})"""
+    xpath = etree.XPath(" | ".join(f"n:{c.replace('/', '/n:')}" for c in caminhos), namespaces=NS)
+    mapa = {}
+    for caminho, campo in caminhos.items():
+        partes = caminho.split("/")
+        pai = partes[-2] if len(partes) > 1 else None
+        mapa[(_tag(pai) if pai else None, _tag(partes[-1]))] = campo
+    return xpath, mapa
+
+
+# A partir de infNFe (NFe e nfeProc)
+XPATH_NFE, CAMPOS_NFE = _campos({
+    "ide/nNF": "numero_nf",
+    "ide/serie": "serie",
+    "ide/dhEmi": "data_emissao",
+    "ide/dEmi": "data_emissao",  # layout 2.00
+    "ide/tpNF": "tipo_operacao",
+    "emit/CNPJ": "cnpj_emitente",
+    "emit/CPF": "cnpj_emitente",
+    "emit/xNome": "nome_emitente",
+    "emit/xFant": "fantasia_emitente",
+    "dest/CNPJ": "cnpj_destinatario",
+    "dest/CPF": "cnpj_destinatario",
+    "dest/xNome": "nome_destinatario",
+    "total/ICMSTot/vNF": "valor_total",
+    "cobr/dup": "duplicata",
+})
+
+# A partir de resNFe (resumo entregue ao destinatário)
+XPATH_RESUMO, CAMPOS_RESUMO = _campos({
+    "chNFe": "chave",
+    "CNPJ": "cnpj_emitente",
+    "CPF": "cnpj_emitente",
+    "xNome": "nome_emitente",
+    "dhEmi": "data_emissao",
+    "tpNF": "tipo_operacao",
+    "vNF": "valor_total",
+})
+
+# A partir de infEvento (procEventoNFe) ou resEvento
+XPATH_EVENTO, CAMPOS_EVENTO = _campos({
+    "chNFe": "chave",
+    "tpEvento": "tipo_evento",
+    "xEvento": "descricao_evento",
+    "detEvento/descEvento": "descricao_evento",
+})
+
+TAG_DUP = _tag("dup")
+TAG_N_DUP = _tag("nDup")
+TAG_D_VENC = _tag("dVenc")
+TAG_V_DUP = _tag("vDup")
+
+TIPOS_RAIZ = {
+    _tag("nfeProc"): "NFe",
+    _tag("NFe"): "NFe",
+    _tag("resNFe"): "Resumo",
+    _tag("procEventoNFe"): "Evento",
+    _tag("resEvento"): "Evento",
+    _tag("evento"): "Evento",
+}
+
+_parsers = threading.local()
+
+
+def _ler_xml(xml):
+    """Árvore lxml de `xml` (bytes ou str), sem entidades externas nem rede"""
+    parser = getattr(_parsers, "parser", None)
+    if parser is None:
+        parser = _parsers.parser = etree.XMLParser(resolve_entities=False, no_network=True, huge_tree=True)
+    if isinstance(xml, str):
+        # O lxml não aceita str com declaração de encoding
+        xml = xml.lstrip('\ufeff').encode('utf-8')
+    return etree.fromstring(xml, parser)
+
+
+def _ler_campos(elemento, xpath, mapa, dados):
+    """Preenche `dados` com os nós de `xpath` (duplicatas vão para dados['duplicatas'])"""
+    for no in xpath(elemento):
+        if no.tag == TAG_DUP:
+            dados["duplicatas"].append({
+                "numero": no.findtext(TAG_N_DUP),
+                "vencimento": no.findtext(TAG_D_VENC),
+                "valor": float(no.findtext(TAG_V_DUP) or 0),
+            })
+            continue
+        # Campos sem pai no caminho valem para qualquer elemento de contexto
+        campo = mapa.get((no.getparent().tag, no.tag)) or mapa.get((None, no.tag))
+        if campo and no.text:
+            dados.setdefault(campo, no.text)
+
+
+def extrair_dados_nfe(xml_doc, nsu: str, schema: str) -> Optional[Dict]:
+    """
+    Extrai dados relevantes de um XML de NFe, resumo ou evento
+    
+    Args:
+        xml_doc: XML do documento (bytes ou str)
+        nsu: NSU do documento
+        schema: Schema do documento
         
-        Args:
-            xml_doc: XML do documento
-            nsu: NSU do documento
-            schema: Schema do documento
-            
-        Returns:
-            Dict com dados ou None
-        """
-        try:
-            root = ET.fromstring(xml_doc)
-            
-            # Identificar tipo de documento
-            is_nfe = 'procNFe' in xml_doc or 'NFe' in xml_doc
-            is_resumo = 'resNFe' in xml_doc
-            is_evento = 'procEventoNFe' in xml_doc
-            
-            dados = {
-                "nsu": nsu,
-                "schema": schema,
-                "xml": xml_doc,
-                "tipo_documento": "NFe" if is_nfe else ("Resumo" if is_resumo else "Evento")
-            }
-            
-            # Extrair dados comuns
-            for elem in root.iter():
-                tag = elem.tag.split('}')[-1] if '}' in elem.tag else elem.tag
-                
-                # Dados da NFe
-                if tag == 'chNFe':
-                    dados['chave'] = elem.text
-                elif tag == 'nNF':
-                    dados['numero_nf'] = elem.text
-                elif tag == 'serie':
-                    dados['serie'] = elem.text
-                elif tag == 'dhEmi':
-                    dados['data_emissao'] = elem.text[:10] if elem.text else None
-                elif tag == 'vNF':
-                    dados['valor_total'] = float(elem.text) if elem.text else 0
-                elif tag == 'tpNF':
-                    # 0 = Entrada, 1 = Saída
-                    dados['tipo_operacao'] = 'ENTRADA' if elem.text == '0' else 'SAIDA'
-                
-                # Dados do emitente
-                elif tag == 'emit':
-                    for child in elem.iter():
-                        child_tag = child.tag.split('}')[-1] if '}' in child.tag else child.tag
-                        if child_tag == 'CNPJ':
-                            dados['cnpj_emitente'] = child.text
-                        elif child_tag == 'xNome':
-                            dados['nome_emitente'] = child.text
-                        elif child_tag == 'xFant':
-                            dados['fantasia_emitente'] = child.text
-                
-                # Dados do destinatário
-                elif tag == 'dest':
-                    for child in elem.iter():
-                        child_tag = child.tag.split('}')[-1] if '}' in child.tag else child.tag
-                        if child_tag == 'CNPJ':
-                            dados['cnpj_destinatario'] = child.text
-                        elif child_tag == 'xNome':
-                            dados['nome_destinatario'] = child.text
-                
-                # Dados de cobrança (vencimento)
-                elif tag == 'dup':
-                    for child in elem.iter():
-                        child_tag = child.tag.split('}')[-1] if '}' in child.tag else child.tag
-                        if child_tag == 'dVenc':
-                            dados['data_vencimento'] = child.text
-                        elif child_tag == 'vDup':
-                            dados['valor_duplicata'] = float(child.text) if child.text else 0
-            
-            # Determinar se é compra ou venda para a Finco
-            cnpj_emit = dados.get('cnpj_emitente', '')
-            cnpj_dest = dados.get('cnpj_destinatario', '')
-            
-            if cnpj_emit == CNPJ_FINCO:
-                dados['tipo_lancamento'] = 'ENTRADA'  # Finco vendeu = vai receber
-                dados['fornecedor_cliente'] = dados.get('nome_destinatario', dados.get('fantasia_emitente', ''))
-            elif cnpj_dest == CNPJ_FINCO:
-                dados['tipo_lancamento'] = 'SAIDA'  # Finco comprou = vai pagar
-                dados['fornecedor_cliente'] = dados.get('nome_emitente', dados.get('fantasia_emitente', ''))
-            else:
-                dados['tipo_lancamento'] = 'INDEFINIDO'
-                dados['fornecedor_cliente'] = dados.get('nome_emitente', '')
-            
-            return dados
-            
-        except Exception as e:
-            print(f"Erro ao extrair dados NFe: {e}")
-            return None
+    Returns:
+        Dict com dados ou None
+    """
+    try:
+        root = _ler_xml(xml_doc)
+        tipo = TIPOS_RAIZ.get(root.tag, "Evento")
+        
+        dados = {
+            "nsu": nsu,
+            "schema": schema,
+            "xml": xml_doc.decode('utf-8') if isinstance(xml_doc, bytes) else xml_doc,
+            "tipo_documento": tipo,
+            "duplicatas": [],
+        }
+        
+        if tipo == "NFe":
+            inf_nfe = XPATH_INF_NFE(root)
+            if inf_nfe:
+                # Id = "NFe" + chave de acesso (ou a chave do protocolo de autorização)
+                chave = (inf_nfe[0].get("Id") or "")[3:] or "".join(XPATH_CHAVE_PROTOCOLO(root))
+                if chave:
+                    dados["chave"] = chave
+                _ler_campos(inf_nfe[0], XPATH_NFE, CAMPOS_NFE, dados)
+        elif tipo == "Resumo":
+            _ler_campos(root, XPATH_RESUMO, CAMPOS_RESUMO, dados)
+        else:
+            inf_evento = XPATH_INF_EVENTO(root)
+            _ler_campos(inf_evento[0] if inf_evento else root, XPATH_EVENTO, CAMPOS_EVENTO, dados)
+        
+        if "data_emissao" in dados:
+            dados["data_emissao"] = dados["data_emissao"][:10]
+        if "valor_total" in dados:
+            dados["valor_total"] = float(dados["valor_total"])
+        if "tipo_operacao" in dados:
+            # 0 = Entrada, 1 = Saída
+            dados["tipo_operacao"] = 'ENTRADA' if dados["tipo_operacao"] == '0' else 'SAIDA'
+        
+        # Primeira parcela com vencimento (campos anteriores à lista de duplicatas)
+        parcela = next((dup for dup in dados["duplicatas"] if dup["vencimento"]), None)
+        if parcela:
+            dados["data_vencimento"] = parcela["vencimento"]
+            dados["valor_duplicata"] = parcela["valor"]
+        
+        # Determinar se é compra ou venda para a Finco
+        cnpj_emit = dados.get('cnpj_emitente', '')
+        cnpj_dest = dados.get('cnpj_destinatario', '')
+        
+        if cnpj_emit == CNPJ_FINCO:
+            dados['tipo_lancamento'] = 'ENTRADA'  # Finco vendeu = vai receber
+            dados['fornecedor_cliente'] = dados.get('nome_destinatario', dados.get('fantasia_emitente', ''))
+        elif cnpj_dest == CNPJ_FINCO:
+            dados['tipo_lancamento'] = 'SAIDA'  # Finco comprou = vai pagar
+            dados['fornecedor_cliente'] = dados.get('nome_emitente', dados.get('fantasia_emitente', ''))
+        else:
+            dados['tipo_lancamento'] = 'INDEFINIDO'
+            dados['fornecedor_cliente'] = dados.get('nome_emitente', '')
+        
+        return dados
+        
+    except Exception as e:
+        print(f"Erro ao extrair dados NFe: {e}")
+        return None
 
 
 def processar_xml_upload(xml_content: str) -> Dict:
@@ -492,8 +604,7 @@ def processar_xml_upload(xml_content: str) -> Dict:
     Returns:
         Dict com dados extraídos
     """
-    service = SefazService()
-    return service._extrair_dados_nfe(xml_content, "", "upload")
+    return extrair_dados_nfe(xml_content, "", "upload")
 
 
 def processar_multiplos_xml(xml_files: List[str]) -> List[Dict]:
@@ -507,10 +618,9 @@ def processar_multiplos_xml(xml_files: List[str]) -> List[Dict]:
         Lista de dicts com dados extraídos
     """
     resultados = []
-    service = SefazService()
     
     for i, xml_content in enumerate(xml_files):
-        dados = service._extrair_dados_nfe(xml_content, f"upload_{i}", "upload")
+        dados = extrair_dados_nfe(xml_content, f"upload_{i}", "upload")
         if dados:
             resultados.append(dados)
     
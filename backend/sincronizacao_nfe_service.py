@@ -0,0 +1,270 @@
+"""
+Sistema Financeiro Finco - Sincronização de NFe
+Baixa em segundo plano todos os documentos da Distribuição DFe
+
+A SEFAZ entrega até 50 documentos por consulta, a partir do último NSU
+informado. O job consulta em sequência, gravando os documentos e o novo
+cursor (nfe_sincronizacao) a cada lote, até ultNSU == maxNSU: recuperar um
+mês de notas é um único job, e uma interrupção continua de onde parou.
+
+Depois de cStat 137 (nenhum documento) ou de alcançar o maxNSU, a SEFAZ
+exige 1 hora até a próxima consulta; consultar antes disso gera cStat 656
+(consumo indevido). O cursor guarda esse horário e o job não consulta
+antes dele.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from backend.database import SessionLocal, SincronizacaoNFe
+from backend.documentos_nfe import gravar_documentos
+
+# Espera exigida pela SEFAZ após cStat 137 / ultNSU == maxNSU (e após 656)
+INTERVALO_SEFAZ = timedelta(hours=1)
+
+# Pausa entre consultas seguidas do mesmo job (segundos)
+PAUSA_ENTRE_CONSULTAS = 1
+
+# Intervalo entre verificações enquanto um job está em andamento (segundos)
+INTERVALO_VERIFICACAO = 60
+
+# Limite de consultas por job (50 documentos cada)
+MAXIMO_CONSULTAS = 500
+
+STATUS_FINALIZADOS = ("concluido", "adiado", "erro", "cancelado")
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="nfe-sincronizacao")
+_job = None
+_job_lock = threading.Lock()
+
+
+class JobSincronizacao:
+    """Estado de uma sincronização"""
+
+    def __init__(self):
+        self.status = "pendente"  # pendente, processando, concluido, adiado, erro, cancelado
+        self.consultas = 0
+        self.documentos_novos = 0
+        self.ult_nsu = None
+        self.max_nsu = None
+        self.mensagem = None
+        self.criado_em = datetime.now()
+        self.iniciado_em = None
+        self.finalizado_em = None
+        self._cancelar = threading.Event()
+
+    def para_dict(self):
+        return {
+            "status": self.status,
+            "consultas": self.consultas,
+            "documentos_novos": self.documentos_novos,
+            "ult_nsu": self.ult_nsu,
+            "max_nsu": self.max_nsu,
+            "mensagem": self.mensagem,
+            "criado_em": self.criado_em.isoformat(),
+            "iniciado_em": self.iniciado_em.isoformat() if self.iniciado_em else None,
+            "finalizado_em": self.finalizado_em.isoformat() if self.finalizado_em else None,
+        }
+
+
+# ============== CURSOR ==============
+
+def obter_cursor(db):
+    """Linha do cursor (criada com NSU 0 na primeira sincronização)"""
+    cursor = db.query(SincronizacaoNFe).first()
+    if cursor is None:
+        cursor = SincronizacaoNFe(ult_nsu="0", documentos_recebidos=0)
+        db.add(cursor)
+        db.flush()
+    return cursor
+
+
+def cursor_para_dict(cursor):
+    return {
+        "ult_nsu": cursor.ult_nsu,
+        "max_nsu": cursor.max_nsu,
+        "ultimo_cstat": cursor.ultimo_cstat,
+        "ultimo_motivo": cursor.ultimo_motivo,
+        "ultima_consulta": cursor.ultima_consulta.isoformat() if cursor.ultima_consulta else None,
+        "proxima_consulta": cursor.proxima_consulta.isoformat() if cursor.proxima_consulta else None,
+        "documentos_recebidos": cursor.documentos_recebidos,
+    }
+
+
+# ============== SINCRONIZAÇÃO ==============
+
+def _nsu(valor):
+    return int(valor or 0)
+
+
+def executar_sincronizacao(job):
+    """
+    Roda a sincronização (na thread do pool)
+
+    Cada lote é gravado junto com o cursor numa transação própria: um erro
+    no meio do caminho mantém tudo o que já foi baixado.
+    """
+    from backend.sefaz_service import SefazService
+
+    job.status = "processando"
+    job.iniciado_em = datetime.now()
+    db = SessionLocal()
+
+    try:
+        cursor = obter_cursor(db)
+        db.commit()
+        job.ult_nsu = cursor.ult_nsu
+        job.max_nsu = cursor.max_nsu
+
+        if cursor.proxima_consulta and datetime.now() < cursor.proxima_consulta:
+            job.status = "adiado"
+            job.mensagem = (
+                f"A SEFAZ só permite nova consulta a partir de "
+                f"{cursor.proxima_consulta.strftime('%d/%m/%Y %H:%M')}."
+            )
+            return
+
+        service = SefazService()
+
+        while job.consultas < MAXIMO_CONSULTAS:
+            if job._cancelar.is_set():
+                job.status = "cancelado"
+                job.mensagem = f"Sincronização cancelada no NSU {cursor.ult_nsu}."
+                return
+
+            resultado = service.consultar_nfe(cursor.ult_nsu)
+            job.consultas += 1
+            cstat = resultado.get("cStat")
+            cursor.ultima_consulta = datetime.now()
+            cursor.ultimo_cstat = cstat
+            cursor.ultimo_motivo = (resultado.get("xMotivo") or resultado.get("error") or "")[:255]
+
+            if not resultado.get("success"):
+                if cstat == "656":
+                    cursor.proxima_consulta = cursor.ultima_consulta + INTERVALO_SEFAZ
+                db.commit()
+                job.status = "erro"
+                job.mensagem = resultado.get("error", "Erro na consulta à SEFAZ")
+                print(f"❌ Sincronização NFe: {job.mensagem}")
+                return
+
+            _, novos = gravar_documentos(db, resultado.get("documentos", []))
+            if resultado.get("ultNSU"):
+                cursor.ult_nsu = resultado["ultNSU"]
+            if resultado.get("maxNSU"):
+                cursor.max_nsu = resultado["maxNSU"]
+            cursor.documentos_recebidos += novos
+
+            fim = cstat == "137" or _nsu(cursor.ult_nsu) >= _nsu(cursor.max_nsu)
+            if fim:
+                cursor.proxima_consulta = cursor.ultima_consulta + INTERVALO_SEFAZ
+            db.commit()
+
+            job.documentos_novos += novos
+            job.ult_nsu = cursor.ult_nsu
+            job.max_nsu = cursor.max_nsu
+
+            if fim:
+                break
+            job._cancelar.wait(PAUSA_ENTRE_CONSULTAS)
+
+        job.status = "concluido"
+        job.mensagem = (
+            f"Sincronização concluída! {job.documentos_novos} documento(s) novo(s) "
+            f"em {job.consultas} consulta(s); NSU {job.ult_nsu} de {job.max_nsu}."
+        )
+        print(f"✅ {job.mensagem}")
+
+    except Exception as e:
+        db.rollback()
+        job.status = "erro"
+        job.mensagem = f"Erro na sincronização: {str(e)}"
+        print(f"❌ {job.mensagem}")
+
+    finally:
+        db.close()
+        job.finalizado_em = datetime.now()
+
+
+# ============== JOB ==============
+
+def iniciar_sincronizacao():
+    """
+    Enfileira uma sincronização, ou retorna a que já está em andamento
+
+    Returns:
+        (job, criado): criado é False quando já havia um job em andamento
+    """
+    global _job
+
+    with _job_lock:
+        if _job is not None and _job.status not in STATUS_FINALIZADOS:
+            return _job, False
+        _job = JobSincronizacao()
+        _executor.submit(executar_sincronizacao, _job)
+        return _job, True
+
+
+def obter_job():
+    """Última sincronização iniciada neste processo (None se nenhuma)"""
+    return _job
+
+
+def status_sincronizacao():
+    """Cursor gravado no banco e o job atual"""
+    db = SessionLocal()
+    try:
+        cursor = db.query(SincronizacaoNFe).first()
+        return {
+            "cursor": cursor_para_dict(cursor) if cursor else None,
+            "job": _job.para_dict() if _job else None,
+        }
+    finally:
+        db.close()
+
+
+def segundos_ate_proxima_sincronizacao():
+    """
+    Quanto esperar até a próxima sincronização automática (0 = já pode)
+
+    Respeita a próxima consulta gravada no cursor e, depois de um job com
+    erro, espera INTERVALO_SEFAZ antes de tentar de novo.
+    """
+    agora = datetime.now()
+    liberada_em = agora
+    job = _job
+    if job is not None:
+        if job.status not in STATUS_FINALIZADOS:
+            return INTERVALO_VERIFICACAO
+        if job.status == "erro" and job.finalizado_em:
+            liberada_em = job.finalizado_em + INTERVALO_SEFAZ
+
+    db = SessionLocal()
+    try:
+        cursor = db.query(SincronizacaoNFe).first()
+        if cursor is not None and cursor.proxima_consulta:
+            liberada_em = max(liberada_em, cursor.proxima_consulta)
+    finally:
+        db.close()
+    return max(0, (liberada_em - agora).total_seconds())
+
+
+def cancelar_sincronizacao():
+    """
+    Solicita o cancelamento do job atual (para após o lote em andamento)
+
+    Returns:
+        O job, ou None se não houver job em andamento
+    """
+    job = _job
+    if job is None or job.status in STATUS_FINALIZADOS:
+        return None
+    job._cancelar.set()
+    return job
+
+
+def encerrar():
+    """Cancela a sincronização em andamento e encerra o pool (desligamento do servidor)"""
+    if _job is not None:
+        _job._cancelar.set()
+    _executor.shutdown(wait=False, cancel_futures=True)
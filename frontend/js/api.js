@@ -82,9 +82,14 @@ async function apiPut(endpoint, dados) {
     }
 }
 
-async function apiPatch(endpoint) {
+async function apiPatch(endpoint, dados = null) {
     try {
-        const response = await fetch(`${API_URL}${endpoint}`, { method: 'PATCH' });
+        const opcoes = { method: 'PATCH' };
+        if (dados !== null) {
+            opcoes.headers = { 'Content-Type': 'application/json' };
+            opcoes.body = JSON.stringify(dados);
+        }
+        const response = await fetch(`${API_URL}${endpoint}`, opcoes);
         if (!response.ok) throw new Error('Erro ao atualizar registro');
         return await response.json();
     } catch (error) {
@@ -122,11 +127,27 @@ async function getTopDespesas(mes = null, limite = 10) {
     return await apiGet(url);
 }
 
+// ============================================
+// FUNÇÕES DE AGREGADOS
+// ============================================
+
+// agrupamento: mensal, diario, classificacao, tipo-classificacao, categoria, tipo, situacao, item
+async function getAgregados(agrupamento, filtros = {}) {
+    const params = new URLSearchParams();
+
+    Object.entries(filtros).forEach(([chave, valor]) => {
+        if (valor !== null && valor !== undefined && valor !== '') params.append(chave, valor);
+    });
+
+    const queryString = params.toString();
+    return await apiGet(`/agregados/${agrupamento}${queryString ? '?' + queryString : ''}`);
+}
+
 // ============================================
 // FUNÇÕES DE LANÇAMENTOS
 // ============================================
 
-async function getLancamentos(filtros = {}) {
+function parametrosLancamentos(filtros = {}) {
     const params = new URLSearchParams();
     
     if (filtros.tipo) params.append('tipo', filtros.tipo);
@@ -141,10 +162,36 @@ async function getLancamentos(filtros = {}) {
     if (filtros.data_fim) params.append('data_fim', filtros.data_fim);
     if (filtros.limit) params.append('limit', filtros.limit);
     
-    const queryString = params.toString();
+    return params;
+}
+
+async function getLancamentos(filtros = {}) {
+    const queryString = parametrosLancamentos(filtros).toString();
     return await apiGet(`/lancamentos${queryString ? '?' + queryString : ''}`);
 }
 
+// Página de lançamentos por cursor: sem cursor busca a primeira (com o total)
+async function getPaginaLancamentos(filtros = {}, cursor = null) {
+    const params = parametrosLancamentos(filtros);
+    if (cursor) {
+        params.append('cursor', cursor);
+    } else {
+        params.append('contar', 'true');
+    }
+    
+    const response = await fetch(`${API_URL}/lancamentos?${params.toString()}`);
+    if (!response.ok) {
+        throw new Error(`Erro ${response.status}: ${response.statusText}`);
+    }
+    
+    const total = response.headers.get('X-Total-Count');
+    return {
+        lancamentos: await response.json(),
+        proximoCursor: response.headers.get('X-Next-Cursor'),
+        total: total !== null ? parseInt(total) : null
+    };
+}
+
 async function getLancamento(id) {
     return await apiGet(`/lancamentos/${id}`);
 }
@@ -165,6 +212,25 @@ async function baixarLancamento(id) {
     return await apiPatch(`/lancamentos/${id}/baixar`);
 }
 
+// Operações em lote: uma requisição e um commit para todos os lançamentos.
+// Retornam { processados, erros, resultados: [{ indice, id, sucesso, erro }] }
+
+async function criarLancamentosLote(lancamentos) {
+    return await apiPost('/lancamentos/lote', { lancamentos });
+}
+
+async function atualizarLancamentosLote(lancamentos) {
+    return await apiPut('/lancamentos/lote', { lancamentos });
+}
+
+async function excluirLancamentosLote(ids) {
+    return await apiPost('/lancamentos/lote/excluir', { ids });
+}
+
+async function baixarLancamentosLote(ids, situacao = 'BAIXADA') {
+    return await apiPatch('/lancamentos/lote/baixar', { ids, situacao });
+}
+
 // ============================================
 // FUNÇÕES DE CLASSIFICAÇÕES
 // ============================================
@@ -210,6 +276,18 @@ async function getFluxoCaixa(mes = null, ano = 2025) {
     return await apiGet(url);
 }
 
+// ============================================
+// FUNÇÕES DE IMPORTAÇÃO
+// ============================================
+
+async function getImportacao(jobId) {
+    return await apiGet(`/importar/${jobId}`);
+}
+
+async function cancelarImportacao(jobId) {
+    return await apiPost(`/importar/${jobId}/cancelar`, {});
+}
+
 // ============================================
 // FUNÇÕES DE RESUMOS
 // ============================================
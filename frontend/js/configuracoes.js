@@ -288,11 +288,14 @@ async function alterarSenha() {
 // IMPORTAR PLANILHA
 // ============================================
 
+let importacaoAtual = null;
+
 async function importarPlanilha() {
     const arquivoInput = document.getElementById('arquivo-importar');
     const ano = document.getElementById('ano-importar').value;
     const modo = document.getElementById('modo-importar').value;
     const btnImportar = document.getElementById('btn-importar');
+    const btnCancelar = document.getElementById('btn-cancelar-importacao');
     const resultadoDiv = document.getElementById('resultado-importacao');
     const msgSpan = document.getElementById('msg-importacao');
     
@@ -326,27 +329,57 @@ async function importarPlanilha() {
             body: formData
         });
         
-        const resultado = await response.json();
+        let job = await response.json();
+        if (!response.ok) {
+            throw new Error(job.detail || 'Erro na importação');
+        }
+        
+        // Acompanhar o job até terminar
+        importacaoAtual = job.job_id;
+        btnCancelar.style.display = 'inline-block';
+        
+        while (job.status === 'pendente' || job.status === 'processando') {
+            btnImportar.textContent = job.status === 'pendente'
+                ? 'Na fila...'
+                : `Importando ${job.aba_atual || ''} (${job.abas_processadas}/${job.total_abas})...`;
+            await new Promise(resolve => setTimeout(resolve, 1000));
+            job = await getImportacao(job.job_id);
+        }
         
-        if (resultado.sucesso) {
+        if (job.status === 'concluido') {
             msgSpan.innerHTML = `
                 <strong>Importação concluída com sucesso!</strong><br>
-                Novos: ${resultado.lancamentos_novos}<br>
-                Atualizados: ${resultado.lancamentos_atualizados}<br>
-                Ignorados (já existiam): ${resultado.lancamentos_ignorados}<br>
-                Meses processados: ${resultado.meses_processados.join(', ') || 'Nenhum'}
+                Novos: ${job.lancamentos_novos}<br>
+                Atualizados: ${job.lancamentos_atualizados}<br>
+                Ignorados (já existiam): ${job.lancamentos_ignorados}<br>
+                Meses processados: ${job.meses_processados.join(', ') || 'Nenhum'}
             `;
             resultadoDiv.style.display = 'block';
             mostrarAlerta('Importação concluída com sucesso!', 'sucesso');
+        } else if (job.status === 'cancelado') {
+            mostrarAlerta(job.mensagem, 'erro');
         } else {
-            throw new Error(resultado.detail || 'Erro na importação');
+            throw new Error(job.mensagem || 'Erro na importação');
         }
         
     } catch (error) {
         console.error('Erro ao importar:', error);
         mostrarAlerta('Erro ao importar: ' + error.message, 'erro');
     } finally {
+        importacaoAtual = null;
+        btnCancelar.style.display = 'none';
         btnImportar.disabled = false;
         btnImportar.textContent = 'Importar Planilha';
     }
 }
+
+async function cancelarImportacaoAtual() {
+    if (!importacaoAtual) return;
+    if (!confirm('Cancelar a importação? Nada do que foi processado será gravado.')) return;
+    
+    try {
+        await cancelarImportacao(importacaoAtual);
+    } catch (error) {
+        mostrarAlerta('Erro ao cancelar: ' + error.message, 'erro');
+    }
+}
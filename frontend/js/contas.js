@@ -197,7 +197,7 @@ function renderizarTabelaContas(contas) {
     
     if (contas.length === 0) {
         tbody.innerHTML = `
-            <tr><td colspan="7" class="text-center text-muted">Nenhuma conta encontrada para este filtro</td></tr>
+            <tr><td colspan="8" class="text-center text-muted">Nenhuma conta encontrada para este filtro</td></tr>
         `;
         return;
     }
@@ -231,6 +231,7 @@ function renderizarTabelaContas(contas) {
         
         return `
         <tr>
+            <td><input type="checkbox" class="check-conta" data-id="${c.id}"></td>
             <td>${formatarData(c.data)}</td>
             <td><span class="badge ${statusClass}">${statusText}</span></td>
             <td><span class="badge ${tipoClass}">${tipoLabel}</span></td>
@@ -264,3 +265,40 @@ async function baixarConta(id) {
         alert('Erro ao baixar conta');
     }
 }
+
+// ============================================
+// BAIXAR CONTAS SELECIONADAS
+// ============================================
+
+function toggleTodasContas() {
+    const checkTodas = document.getElementById('check-todas-contas').checked;
+    document.querySelectorAll('.check-conta').forEach(check => {
+        check.checked = checkTodas;
+    });
+}
+
+async function baixarSelecionadas() {
+    const ids = Array.from(document.querySelectorAll('.check-conta:checked')).map(c => parseInt(c.dataset.id));
+    
+    if (ids.length === 0) {
+        alert('Selecione pelo menos uma conta para baixar.');
+        return;
+    }
+    
+    if (!confirm(`Deseja marcar ${ids.length} conta${ids.length !== 1 ? 's' : ''} como baixada${ids.length !== 1 ? 's' : ''}/paga${ids.length !== 1 ? 's' : ''}?`)) {
+        return;
+    }
+    
+    try {
+        const resultado = await baixarLancamentosLote(ids);
+        if (resultado.erros > 0) {
+            alert(`${resultado.processados} conta(s) baixada(s), ${resultado.erros} não encontrada(s).`);
+        }
+        document.getElementById('check-todas-contas').checked = false;
+        carregarResumoContas();
+        carregarContas();
+    } catch (error) {
+        console.error('Erro ao baixar contas:', error);
+        alert('Erro ao baixar contas');
+    }
+}
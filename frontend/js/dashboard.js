@@ -268,22 +268,11 @@ async function carregarGraficoEntradasSaidas() {
     const ano = getAnoSelecionado();
     
     try {
-        const lancamentos = await getLancamentos({ ano: ano, limit: 10000 });
-        const lancamentosAtivos = lancamentos.filter(l => l.situacao !== 'OBSOLETO');
-        
-        // Agrupar por mês
-        const entradasPorMes = Array(12).fill(0);
-        const saidasPorMes = Array(12).fill(0);
-        
-        lancamentosAtivos.forEach(l => {
-            const mes = l.mes - 1;
-            if (l.tipo === 'ENTRADA') {
-                entradasPorMes[mes] += l.valor;
-            } else {
-                saidasPorMes[mes] += l.valor;
-            }
-        });
-        
+        // Totais por mês já agregados no servidor
+        const mensal = await getAgregados('mensal', { ano: ano });
+        const entradasPorMes = mensal.entradas;
+        const saidasPorMes = mensal.saidas;
+
         // Destruir gráfico anterior se existir
         if (graficoEntradasSaidas) {
             graficoEntradasSaidas.destroy();
@@ -357,28 +346,13 @@ async function carregarGraficoDespesasTipo() {
     const tiposPermitidos = ['CUSTO_FIXO', 'CUSTO_VARIAVEL', 'DESPESA_FIXA', 'DESPESA_VARIAVEL', 'IMPOSTO'];
     
     try {
-        const classificacoes = await getClassificacoes();
-        const lancamentos = await getLancamentos({ ano: ano, tipo: 'SAIDA', limit: 10000 });
-        const lancamentosAtivos = lancamentos.filter(l => l.situacao !== 'OBSOLETO');
-        
-        // Agrupar por tipo de classificação
-        const tiposMap = {};
-        
-        lancamentosAtivos.forEach(l => {
-            const classif = classificacoes.find(c => c.nome === l.classificacao_nome);
-            const tipo = classif ? classif.tipo : 'Outros';
-            
-            // Ignorar tipos não permitidos
-            if (!tiposPermitidos.includes(tipo)) return;
-            
-            if (!tiposMap[tipo]) {
-                tiposMap[tipo] = 0;
-            }
-            tiposMap[tipo] += l.valor;
-        });
-        
-        const labels = Object.keys(tiposMap);
-        const valores = Object.values(tiposMap);
+        const agregado = await getAgregados('tipo-classificacao', { ano: ano, tipo: 'SAIDA' });
+
+        // Ignorar tipos não permitidos
+        const grupos = agregado.grupos.filter(g => tiposPermitidos.includes(g.tipo_classificacao));
+
+        const labels = grupos.map(g => g.tipo_classificacao);
+        const valores = grupos.map(g => g.total);
         
         // Destruir gráfico anterior se existir
         if (graficoDespesasTipo) {
@@ -432,27 +406,11 @@ async function carregarGraficoTopGastos() {
     const ano = getAnoSelecionado();
     
     try {
-        const lancamentos = await getLancamentos({ ano: ano, tipo: 'SAIDA', limit: 10000 });
-        const lancamentosAtivos = lancamentos.filter(l => l.situacao !== 'OBSOLETO');
-        
-        // Agrupar por classificação
-        const gastosMap = {};
-        
-        lancamentosAtivos.forEach(l => {
-            const classif = l.classificacao_nome || 'Sem classificação';
-            if (!gastosMap[classif]) {
-                gastosMap[classif] = 0;
-            }
-            gastosMap[classif] += l.valor;
-        });
-        
-        // Ordenar e pegar top 10
-        const sorted = Object.entries(gastosMap)
-            .sort((a, b) => b[1] - a[1])
-            .slice(0, 10);
-        
-        const labels = sorted.map(s => s[0]);
-        const valores = sorted.map(s => s[1]);
+        // Top 10 classificações, já ordenadas pelo servidor
+        const agregado = await getAgregados('classificacao', { ano: ano, tipo: 'SAIDA', limite: 10 });
+
+        const labels = agregado.grupos.map(g => g.classificacao);
+        const valores = agregado.grupos.map(g => g.total);
         
         // Destruir gráfico anterior se existir
         if (graficoTopGastos) {
@@ -516,25 +474,10 @@ async function carregarTopFornecedores() {
     const ano = getAnoSelecionado();
     
     try {
-        const lancamentos = await getLancamentos({ ano: ano, tipo: 'SAIDA', limit: 10000 });
-        const lancamentosAtivos = lancamentos.filter(l => l.situacao !== 'OBSOLETO' && l.item);
-        
-        // Agrupar por fornecedor (item)
-        const fornecedoresMap = {};
-        
-        lancamentosAtivos.forEach(l => {
-            const fornecedor = l.item;
-            if (!fornecedoresMap[fornecedor]) {
-                fornecedoresMap[fornecedor] = 0;
-            }
-            fornecedoresMap[fornecedor] += l.valor;
-        });
-        
-        // Ordenar e pegar top 10
-        const sorted = Object.entries(fornecedoresMap)
-            .sort((a, b) => b[1] - a[1])
-            .slice(0, 10);
-        
+        // Top 10 fornecedores (item), já ordenados pelo servidor
+        const agregado = await getAgregados('item', { ano: ano, tipo: 'SAIDA', limite: 10 });
+        const sorted = agregado.grupos.map(g => [g.item, g.total]);
+
         if (sorted.length === 0) {
             container.innerHTML = '<div class="contas-vazio">Nenhum fornecedor encontrado</div>';
             return;
@@ -565,25 +508,10 @@ async function carregarTopClientes() {
     const ano = getAnoSelecionado();
     
     try {
-        const lancamentos = await getLancamentos({ ano: ano, tipo: 'ENTRADA', limit: 10000 });
-        const lancamentosAtivos = lancamentos.filter(l => l.situacao !== 'OBSOLETO' && l.item);
-        
-        // Agrupar por cliente (item)
-        const clientesMap = {};
-        
-        lancamentosAtivos.forEach(l => {
-            const cliente = l.item;
-            if (!clientesMap[cliente]) {
-                clientesMap[cliente] = 0;
-            }
-            clientesMap[cliente] += l.valor;
-        });
-        
-        // Ordenar e pegar top 10
-        const sorted = Object.entries(clientesMap)
-            .sort((a, b) => b[1] - a[1])
-            .slice(0, 10);
-        
+        // Top 10 clientes (item), já ordenados pelo servidor
+        const agregado = await getAgregados('item', { ano: ano, tipo: 'ENTRADA', limite: 10 });
+        const sorted = agregado.grupos.map(g => [g.item, g.total]);
+
         if (sorted.length === 0) {
             container.innerHTML = '<div class="contas-vazio">Nenhum cliente encontrado</div>';
             return;
@@ -618,40 +546,23 @@ async function carregarResumoTipos() {
         const mesAtual = new Date().getMonth() + 1;
         const anoAtual = new Date().getFullYear();
         
-        const lancamentos = await getLancamentos({ 
-            ano: anoAtual, 
-            mes: mesAtual, 
-            tipo: 'SAIDA', 
-            limit: 5000 
-        });
-        
-        const lancamentosAtivos = lancamentos.filter(l => l.situacao !== 'OBSOLETO');
-        
-        // Agrupar por categoria
-        const categoriasMap = {};
-        let total = 0;
-        
-        lancamentosAtivos.forEach(l => {
-            const categoria = l.categoria || 'Outros';
-            
-            // Ignorar categorias não permitidas
-            if (!categoriasPermitidas.includes(categoria)) return;
-            
-            if (!categoriasMap[categoria]) {
-                categoriasMap[categoria] = 0;
-            }
-            categoriasMap[categoria] += l.valor;
-            total += l.valor;
+        const agregado = await getAgregados('categoria', {
+            ano: anoAtual,
+            mes: mesAtual,
+            tipo: 'SAIDA'
         });
-        
-        if (Object.keys(categoriasMap).length === 0) {
+
+        // Ignorar categorias não permitidas (grupos já vêm ordenados por valor)
+        const sorted = agregado.grupos
+            .filter(g => categoriasPermitidas.includes(g.categoria))
+            .map(g => [g.categoria, g.total]);
+        const total = sorted.reduce((soma, [, valor]) => soma + valor, 0);
+
+        if (sorted.length === 0) {
             tbody.innerHTML = '<tr><td colspan="3" class="text-center text-muted">Nenhum dado disponível</td></tr>';
             return;
         }
-        
-        // Ordenar por valor
-        const sorted = Object.entries(categoriasMap).sort((a, b) => b[1] - a[1]);
-        
+
         tbody.innerHTML = sorted.map(([categoria, valor]) => {
             const percentual = total > 0 ? ((valor / total) * 100).toFixed(1) : 0;
             return `
@@ -12,6 +12,7 @@ let documentosEncontrados = [];
 
 document.addEventListener('DOMContentLoaded', () => {
     verificarStatus();
+    verificarSincronizacao();
     carregarClassificacoes();
     configurarDragDrop();
 });
@@ -135,6 +136,89 @@ async function consultarSefaz() {
     }
 }
 
+// ============================================
+// SINCRONIZAÇÃO (TODOS OS LOTES ATÉ O MAXNSU)
+// ============================================
+
+function mostrarSincronizacao(status) {
+    const el = document.getElementById('sincronizacao-status');
+    const cursor = status.cursor;
+    
+    if (!cursor) {
+        el.textContent = 'Nenhuma sincronização realizada ainda.';
+        return;
+    }
+    
+    const proxima = cursor.proxima_consulta
+        ? new Date(cursor.proxima_consulta).toLocaleString('pt-BR')
+        : 'agora';
+    el.textContent = `NSU sincronizado: ${cursor.ult_nsu} de ${cursor.max_nsu || '-'} | ` +
+        `${cursor.documentos_recebidos} documento(s) recebido(s) | Próxima consulta: ${proxima}`;
+}
+
+async function verificarSincronizacao() {
+    try {
+        const response = await fetch(`${API_URL}/nfe/sincronizacao`);
+        const status = await response.json();
+        mostrarSincronizacao(status);
+        
+        // Continuar a busca manual a partir do último NSU sincronizado
+        if (status.cursor) {
+            document.getElementById('ultimo-nsu').value = status.cursor.ult_nsu;
+        }
+        return status;
+    } catch (error) {
+        console.error('Erro ao verificar sincronização:', error);
+    }
+}
+
+async function sincronizarSefaz() {
+    const btn = document.getElementById('btn-sincronizar');
+    
+    btn.disabled = true;
+    btn.textContent = '⏳ Sincronizando...';
+    
+    try {
+        const response = await fetch(`${API_URL}/nfe/sincronizar`, { method: 'POST' });
+        let job = await response.json();
+        if (!response.ok) {
+            throw new Error(job.detail || 'Erro na sincronização');
+        }
+        
+        // Acompanhar o job até terminar
+        while (job.status === 'pendente' || job.status === 'processando') {
+            await new Promise(resolve => setTimeout(resolve, 2000));
+            const status = await verificarSincronizacao();
+            job = status.job;
+        }
+        
+        if (job.status === 'concluido') {
+            addLog(job.mensagem, 'sucesso');
+            await carregarDocumentosSincronizados();
+        } else if (job.status === 'adiado' || job.status === 'cancelado') {
+            addLog(job.mensagem, 'alerta');
+        } else {
+            addLog(`Erro: ${job.mensagem}`, 'erro');
+        }
+        
+    } catch (error) {
+        console.error('Erro na sincronização:', error);
+        addLog(`Erro na sincronização: ${error.message}`, 'erro');
+    } finally {
+        btn.disabled = false;
+        btn.textContent = '🔄 Sincronizar tudo';
+    }
+}
+
+async function carregarDocumentosSincronizados() {
+    const response = await fetch(`${API_URL}/nfe/documentos?limite=500`);
+    const resultado = await response.json();
+    
+    // Eventos (ciência, cancelamento...) não viram lançamentos
+    documentosEncontrados = resultado.documentos.filter(doc => !(doc.schema || '').includes('Evento'));
+    renderizarDocumentos();
+}
+
 // ============================================
 // UPLOAD DE XML
 // ============================================
@@ -240,6 +324,7 @@ function renderizarDocumentos() {
                 <button class="btn btn-sm" onclick="verDetalhes(${index})" title="Ver detalhes">
                     👁️
                 </button>
+                ${doc.chave ? `<button class="btn btn-sm" onclick="abrirXml('${doc.chave}')" title="Ver XML">📄</button>` : ''}
             </td>
         </tr>
         `;
@@ -270,6 +355,7 @@ CNPJ DESTINATÁRIO: ${doc.cnpj_destinatario || '-'}
 DATA EMISSÃO: ${doc.data_emissao || '-'}
 DATA VENCIMENTO: ${doc.data_vencimento || '-'}
 VALOR TOTAL: ${formatarMoeda(doc.valor_total || 0)}
+${(doc.duplicatas || []).map(dup => `  DUPLICATA ${dup.numero || '-'}: ${formatarData(dup.vencimento)} - ${formatarMoeda(dup.valor || 0)}`).join('\n')}
 
 TIPO LANÇAMENTO: ${doc.tipo_lancamento || '-'}
 FORNECEDOR/CLIENTE: ${doc.fornecedor_cliente || '-'}
@@ -278,6 +364,11 @@ FORNECEDOR/CLIENTE: ${doc.fornecedor_cliente || '-'}
     alert(detalhes);
 }
 
+function abrirXml(chave) {
+    // O XML não vem na listagem: é baixado só quando pedido
+    window.open(`${API_URL}/nfe/documentos/${chave}/xml`, '_blank');
+}
+
 // ============================================
 // IMPORTAR SELECIONADOS
 // ============================================
@@ -311,8 +402,10 @@ async function importarSelecionados() {
             headers: {
                 'Content-Type': 'application/json'
             },
+            // Notas com chave são lidas do armazenamento local no servidor
             body: JSON.stringify({
-                documentos: docsParaImportar,
+                chaves: docsParaImportar.filter(doc => doc.chave).map(doc => doc.chave),
+                documentos: docsParaImportar.filter(doc => !doc.chave),
                 categoria: categoria,
                 classificacao: classificacao || null
             })
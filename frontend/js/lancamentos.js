@@ -5,6 +5,11 @@
 let classificacoesCache = [];
 let timeoutAutocomplete = null;
 
+// Paginação por cursor da tabela
+let lancamentosCarregados = [];
+let proximoCursor = null;
+let totalLancamentos = null;
+
 // ============================================
 // INICIALIZAÇÃO
 // ============================================
@@ -60,8 +65,11 @@ async function carregarLancamentos() {
     const filtros = obterFiltros();
     
     try {
-        const lancamentos = await getLancamentos(filtros);
-        renderizarTabela(lancamentos);
+        const pagina = await getPaginaLancamentos(filtros);
+        lancamentosCarregados = pagina.lancamentos;
+        proximoCursor = pagina.proximoCursor;
+        totalLancamentos = pagina.total;
+        renderizarTabela(lancamentosCarregados);
     } catch (error) {
         console.error('Erro ao carregar lançamentos:', error);
         document.getElementById('tabela-lancamentos').innerHTML = `
@@ -70,6 +78,20 @@ async function carregarLancamentos() {
     }
 }
 
+async function carregarMaisLancamentos() {
+    if (!proximoCursor) return;
+    
+    try {
+        const pagina = await getPaginaLancamentos(obterFiltros(), proximoCursor);
+        lancamentosCarregados = lancamentosCarregados.concat(pagina.lancamentos);
+        proximoCursor = pagina.proximoCursor;
+        renderizarTabela(lancamentosCarregados);
+    } catch (error) {
+        console.error('Erro ao carregar mais lançamentos:', error);
+        mostrarAlerta('Erro ao carregar mais lançamentos', 'erro');
+    }
+}
+
 function obterFiltros() {
     return {
         tipo: document.getElementById('filtro-tipo').value,
@@ -108,7 +130,10 @@ function renderizarTabela(lancamentos) {
     const tbody = document.getElementById('tabela-lancamentos');
     const contador = document.getElementById('contador-lancamentos');
     
-    contador.textContent = `${lancamentos.length} registros`;
+    contador.textContent = totalLancamentos !== null && totalLancamentos > lancamentos.length
+        ? `${lancamentos.length} de ${totalLancamentos} registros`
+        : `${lancamentos.length} registros`;
+    document.getElementById('btn-carregar-mais').style.display = proximoCursor ? '' : 'none';
     
     // Calcular previsão
     calcularPrevisao(lancamentos);
@@ -21,19 +21,23 @@ async function carregarRelatorios() {
     const ano = document.getElementById('filtro-ano').value;
     
     try {
-        // Buscar todos os lançamentos do ano
-        const lancamentos = await getLancamentos({ ano: ano, limit: 10000 });
-        const lancamentosAtivos = lancamentos.filter(l => l.situacao !== 'OBSOLETO');
-        const classificacoes = await getClassificacoes();
+        // Buscar os totais do ano já agregados no servidor
+        const [mensal, porTipo, fornecedores, clientes, classificacoes] = await Promise.all([
+            getAgregados('mensal', { ano: ano }),
+            getAgregados('tipo-classificacao', { ano: ano, tipo: 'SAIDA' }),
+            getAgregados('item', { ano: ano, tipo: 'SAIDA', limite: 10 }),
+            getAgregados('item', { ano: ano, tipo: 'ENTRADA', limite: 10 }),
+            getAgregados('classificacao', { ano: ano, tipo: 'SAIDA', limite: 10 })
+        ]);
         
         // Carregar todas as seções
-        carregarResumoAnual(lancamentosAtivos);
-        carregarEvolucaoMensal(lancamentosAtivos);
-        carregarGraficoEvolucao(lancamentosAtivos);
-        carregarEvolucaoPorTipo(lancamentosAtivos, classificacoes);
-        carregarTopFornecedores(lancamentosAtivos);
-        carregarTopClientes(lancamentosAtivos);
-        carregarTopClassificacoes(lancamentosAtivos, classificacoes);
+        carregarResumoAnual(mensal);
+        carregarEvolucaoMensal(mensal);
+        carregarGraficoEvolucao(mensal);
+        carregarEvolucaoPorTipo(porTipo);
+        carregarTopFornecedores(fornecedores);
+        carregarTopClientes(clientes);
+        carregarTopClassificacoes(classificacoes);
         
     } catch (error) {
         console.error('Erro ao carregar relatórios:', error);
@@ -44,19 +48,13 @@ async function carregarRelatorios() {
 // RESUMO ANUAL
 // ============================================
 
-function carregarResumoAnual(lancamentos) {
-    const totalEntradas = lancamentos
-        .filter(l => l.tipo === 'ENTRADA')
-        .reduce((sum, l) => sum + l.valor, 0);
-    
-    const totalSaidas = lancamentos
-        .filter(l => l.tipo === 'SAIDA')
-        .reduce((sum, l) => sum + l.valor, 0);
-    
+function carregarResumoAnual(mensal) {
+    const totalEntradas = mensal.total_entradas;
+    const totalSaidas = mensal.total_saidas;
     const resultado = totalEntradas - totalSaidas;
     
     // Calcular média mensal (meses com movimentação)
-    const mesesComMovimentacao = new Set(lancamentos.map(l => l.mes)).size;
+    const mesesComMovimentacao = mensal.meses_com_movimentacao;
     const mediaMensal = mesesComMovimentacao > 0 ? resultado / mesesComMovimentacao : 0;
     
     document.getElementById('total-entradas-ano').textContent = formatarMoeda(totalEntradas);
@@ -75,41 +73,17 @@ function carregarResumoAnual(lancamentos) {
 // EVOLUÇÃO MENSAL - TABELA
 // ============================================
 
-function carregarEvolucaoMensal(lancamentos) {
+function carregarEvolucaoMensal(mensal) {
     const tbody = document.getElementById('tabela-evolucao-mensal');
     const tfoot = document.getElementById('tabela-evolucao-total');
     
-    // Agrupar por mês
-    const dadosMensais = [];
-    let acumulado = 0;
-    let totalEntradas = 0;
-    let totalSaidas = 0;
-    
-    for (let mes = 1; mes <= 12; mes++) {
-        const lancsMes = lancamentos.filter(l => l.mes === mes);
-        
-        const entradas = lancsMes
-            .filter(l => l.tipo === 'ENTRADA')
-            .reduce((sum, l) => sum + l.valor, 0);
-        
-        const saidas = lancsMes
-            .filter(l => l.tipo === 'SAIDA')
-            .reduce((sum, l) => sum + l.valor, 0);
-        
-        const resultado = entradas - saidas;
-        acumulado += resultado;
-        
-        totalEntradas += entradas;
-        totalSaidas += saidas;
-        
-        dadosMensais.push({
-            mes: MESES_COMPLETOS[mes - 1],
-            entradas,
-            saidas,
-            resultado,
-            acumulado
-        });
-    }
+    const dadosMensais = mensal.meses.map((mes, i) => ({
+        mes: MESES_COMPLETOS[mes - 1],
+        entradas: mensal.entradas[i],
+        saidas: mensal.saidas[i],
+        resultado: mensal.resultado[i],
+        acumulado: mensal.acumulado[i]
+    }));
     
     tbody.innerHTML = dadosMensais.map(d => `
         <tr>
@@ -121,6 +95,8 @@ function carregarEvolucaoMensal(lancamentos) {
         </tr>
     `).join('');
     
+    const totalEntradas = mensal.total_entradas;
+    const totalSaidas = mensal.total_saidas;
     const resultadoTotal = totalEntradas - totalSaidas;
     tfoot.innerHTML = `
         <tr style="font-weight: bold; background: var(--cor-fundo);">
@@ -137,27 +113,13 @@ function carregarEvolucaoMensal(lancamentos) {
 // EVOLUÇÃO MENSAL - GRÁFICO
 // ============================================
 
-function carregarGraficoEvolucao(lancamentos) {
+function carregarGraficoEvolucao(mensal) {
     const ctx = document.getElementById('grafico-evolucao-mensal');
     if (!ctx) return;
     
-    // Agrupar por mês
-    const entradasPorMes = Array(12).fill(0);
-    const saidasPorMes = Array(12).fill(0);
-    const resultadoPorMes = Array(12).fill(0);
-    
-    lancamentos.forEach(l => {
-        const mes = l.mes - 1;
-        if (l.tipo === 'ENTRADA') {
-            entradasPorMes[mes] += l.valor;
-        } else {
-            saidasPorMes[mes] += l.valor;
-        }
-    });
-    
-    for (let i = 0; i < 12; i++) {
-        resultadoPorMes[i] = entradasPorMes[i] - saidasPorMes[i];
-    }
+    const entradasPorMes = mensal.entradas;
+    const saidasPorMes = mensal.saidas;
+    const resultadoPorMes = mensal.resultado;
     
     // Destruir gráfico anterior se existir
     if (graficoEvolucao) {
@@ -228,48 +190,22 @@ function carregarGraficoEvolucao(lancamentos) {
 // EVOLUÇÃO POR TIPO DE DESPESA
 // ============================================
 
-function carregarEvolucaoPorTipo(lancamentos, classificacoes) {
+function carregarEvolucaoPorTipo(porTipo) {
     const tbody = document.getElementById('tabela-evolucao-tipo');
     
     // Tipos permitidos
     const tiposPermitidos = ['CUSTO_FIXO', 'CUSTO_VARIAVEL', 'DESPESA_FIXA', 'DESPESA_VARIAVEL', 'IMPOSTO'];
     
-    // Filtrar apenas saídas
-    const saidas = lancamentos.filter(l => l.tipo === 'SAIDA');
-    
-    // Agrupar por tipo e mês
-    const tiposMap = {};
-    
-    saidas.forEach(l => {
-        const classif = classificacoes.find(c => c.nome === l.classificacao_nome);
-        const tipo = classif ? classif.tipo : 'Outros';
-        
-        // Ignorar tipos não permitidos
-        if (!tiposPermitidos.includes(tipo)) return;
-        
-        const mes = l.mes - 1;
-        
-        if (!tiposMap[tipo]) {
-            tiposMap[tipo] = Array(12).fill(0);
-        }
-        tiposMap[tipo][mes] += l.valor;
-    });
+    // Grupos já vêm ordenados por total
+    const tiposComTotal = porTipo.grupos
+        .filter(g => tiposPermitidos.includes(g.tipo_classificacao))
+        .map(g => ({ tipo: g.tipo_classificacao, valores: g.meses, total: g.total }));
     
-    if (Object.keys(tiposMap).length === 0) {
+    if (tiposComTotal.length === 0) {
         tbody.innerHTML = '<tr><td colspan="14" class="text-center text-muted">Nenhum dado disponível</td></tr>';
         return;
     }
     
-    // Calcular totais
-    const tiposComTotal = Object.entries(tiposMap).map(([tipo, valores]) => ({
-        tipo,
-        valores,
-        total: valores.reduce((a, b) => a + b, 0)
-    }));
-    
-    // Ordenar por total
-    tiposComTotal.sort((a, b) => b.total - a.total);
-    
     tbody.innerHTML = tiposComTotal.map(item => `
         <tr>
             <td><strong>${item.tipo}</strong></td>
@@ -283,27 +219,11 @@ function carregarEvolucaoPorTipo(lancamentos, classificacoes) {
 // TOP FORNECEDORES
 // ============================================
 
-function carregarTopFornecedores(lancamentos) {
+function carregarTopFornecedores(fornecedores) {
     const tbody = document.getElementById('tabela-top-fornecedores');
     
-    const saidas = lancamentos.filter(l => l.tipo === 'SAIDA' && l.item);
-    
-    // Agrupar por fornecedor
-    const fornecedoresMap = {};
-    let totalGeral = 0;
-    
-    saidas.forEach(l => {
-        if (!fornecedoresMap[l.item]) {
-            fornecedoresMap[l.item] = 0;
-        }
-        fornecedoresMap[l.item] += l.valor;
-        totalGeral += l.valor;
-    });
-    
-    // Ordenar e pegar top 10
-    const sorted = Object.entries(fornecedoresMap)
-        .sort((a, b) => b[1] - a[1])
-        .slice(0, 10);
+    const totalGeral = fornecedores.total_geral;
+    const sorted = fornecedores.grupos;
     
     if (sorted.length === 0) {
         tbody.innerHTML = '<tr><td colspan="4" class="text-center text-muted">Nenhum dado disponível</td></tr>';
@@ -311,12 +231,12 @@ function carregarTopFornecedores(lancamentos) {
     }
     
     tbody.innerHTML = sorted.map((item, index) => {
-        const percentual = totalGeral > 0 ? ((item[1] / totalGeral) * 100).toFixed(1) : 0;
+        const percentual = totalGeral > 0 ? ((item.total / totalGeral) * 100).toFixed(1) : 0;
         return `
             <tr>
                 <td>${index + 1}º</td>
-                <td>${item[0]}</td>
-                <td class="text-right valor-negativo">${formatarMoeda(item[1])}</td>
+                <td>${item.item}</td>
+                <td class="text-right valor-negativo">${formatarMoeda(item.total)}</td>
                 <td class="text-right">${percentual}%</td>
             </tr>
         `;
@@ -327,27 +247,11 @@ function carregarTopFornecedores(lancamentos) {
 // TOP CLIENTES
 // ============================================
 
-function carregarTopClientes(lancamentos) {
+function carregarTopClientes(clientes) {
     const tbody = document.getElementById('tabela-top-clientes');
     
-    const entradas = lancamentos.filter(l => l.tipo === 'ENTRADA' && l.item);
-    
-    // Agrupar por cliente
-    const clientesMap = {};
-    let totalGeral = 0;
-    
-    entradas.forEach(l => {
-        if (!clientesMap[l.item]) {
-            clientesMap[l.item] = 0;
-        }
-        clientesMap[l.item] += l.valor;
-        totalGeral += l.valor;
-    });
-    
-    // Ordenar e pegar top 10
-    const sorted = Object.entries(clientesMap)
-        .sort((a, b) => b[1] - a[1])
-        .slice(0, 10);
+    const totalGeral = clientes.total_geral;
+    const sorted = clientes.grupos;
     
     if (sorted.length === 0) {
         tbody.innerHTML = '<tr><td colspan="4" class="text-center text-muted">Nenhum dado disponível</td></tr>';
@@ -355,12 +259,12 @@ function carregarTopClientes(lancamentos) {
     }
     
     tbody.innerHTML = sorted.map((item, index) => {
-        const percentual = totalGeral > 0 ? ((item[1] / totalGeral) * 100).toFixed(1) : 0;
+        const percentual = totalGeral > 0 ? ((item.total / totalGeral) * 100).toFixed(1) : 0;
         return `
             <tr>
                 <td>${index + 1}º</td>
-                <td>${item[0]}</td>
-                <td class="text-right valor-positivo">${formatarMoeda(item[1])}</td>
+                <td>${item.item}</td>
+                <td class="text-right valor-positivo">${formatarMoeda(item.total)}</td>
                 <td class="text-right">${percentual}%</td>
             </tr>
         `;
@@ -371,32 +275,11 @@ function carregarTopClientes(lancamentos) {
 // TOP CLASSIFICAÇÕES
 // ============================================
 
-function carregarTopClassificacoes(lancamentos, classificacoes) {
+function carregarTopClassificacoes(classificacoes) {
     const tbody = document.getElementById('tabela-top-classificacoes');
     
-    const saidas = lancamentos.filter(l => l.tipo === 'SAIDA');
-    
-    // Agrupar por classificação
-    const classificacoesMap = {};
-    let totalGeral = 0;
-    
-    saidas.forEach(l => {
-        const classifNome = l.classificacao_nome || 'Sem classificação';
-        if (!classificacoesMap[classifNome]) {
-            const classif = classificacoes.find(c => c.nome === classifNome);
-            classificacoesMap[classifNome] = {
-                valor: 0,
-                tipo: classif ? classif.tipo : '-'
-            };
-        }
-        classificacoesMap[classifNome].valor += l.valor;
-        totalGeral += l.valor;
-    });
-    
-    // Ordenar e pegar top 10
-    const sorted = Object.entries(classificacoesMap)
-        .sort((a, b) => b[1].valor - a[1].valor)
-        .slice(0, 10);
+    const totalGeral = classificacoes.total_geral;
+    const sorted = classificacoes.grupos;
     
     if (sorted.length === 0) {
         tbody.innerHTML = '<tr><td colspan="5" class="text-center text-muted">Nenhum dado disponível</td></tr>';
@@ -404,13 +287,13 @@ function carregarTopClassificacoes(lancamentos, classificacoes) {
     }
     
     tbody.innerHTML = sorted.map((item, index) => {
-        const percentual = totalGeral > 0 ? ((item[1].valor / totalGeral) * 100).toFixed(1) : 0;
+        const percentual = totalGeral > 0 ? ((item.total / totalGeral) * 100).toFixed(1) : 0;
         return `
             <tr>
                 <td>${index + 1}º</td>
-                <td>${item[0]}</td>
-                <td><span class="badge badge-operacional">${item[1].tipo}</span></td>
-                <td class="text-right valor-negativo">${formatarMoeda(item[1].valor)}</td>
+                <td>${item.classificacao}</td>
+                <td><span class="badge badge-operacional">${item.tipo_classificacao || '-'}</span></td>
+                <td class="text-right valor-negativo">${formatarMoeda(item.total)}</td>
                 <td class="text-right">${percentual}%</td>
             </tr>
         `;